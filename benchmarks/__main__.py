@@ -0,0 +1,58 @@
+import argparse
+import datetime
+import json
+import platform
+import sys
+
+from benchmarks import bench_exec, bench_render, bench_store
+from benchmarks.common import peak_rss_kb, run_isolated
+
+SUITES = {"store": bench_store, "exec": bench_exec, "render": bench_render}
+
+
+def run_child(suite, case):
+    result = SUITES[suite].run(case)
+    print(json.dumps(dict(case, suite=suite, **result, peak_rss_kb=peak_rss_kb())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark storage, execution and rendering.")
+    parser.add_argument("suites", nargs="*", metavar="SUITE", help="store, exec or render (default: all)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast smoke run")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--child", nargs=2, metavar=("SUITE", "CASE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite: {', '.join(sorted(unknown))}")
+
+    if args.child:
+        run_child(args.child[0], json.loads(args.child[1]))
+        return 0
+
+    results = []
+    for suite in args.suites or sorted(SUITES):
+        for case in SUITES[suite].cases(args.quick):
+            result = run_isolated(suite, case)
+            print(f"{result['case']}: {'error: ' + result['error'] if 'error' in result else 'ok'}", file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
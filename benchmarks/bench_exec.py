@@ -0,0 +1,99 @@
+import os
+import shutil
+
+from benchmarks.common import Timer
+from cmdies.directexec import DIRECT_ENVIRONMENTS
+from cmdies.runner import CommandRun, ENVIRONMENTS
+from cmdies.sessions import SessionPool, SESSION_ENVIRONMENTS
+
+SPAWN_RUNS = 50
+QUICK_SPAWN_RUNS = 10
+STREAM_LINES = 200000
+QUICK_STREAM_LINES = 20000
+
+# Workloads written for each shell; missing shells are replaced by Bash. The
+# spawn workload starts an external program, which the direct mode runs
+# without the shell and the process mode through it.
+SPAWN_COMMANDS = {
+    "CMD": "hostname",
+    "PowerShell": "hostname",
+    "Bash": "uname",
+}
+STREAM_COMMANDS = {
+    "CMD": "for /L %i in (1,1,{lines}) do @echo %i",
+    "PowerShell": "1..{lines}",
+    "Bash": "seq 1 {lines}",
+}
+
+
+def available(env):
+    if env == "CMD":
+        return os.name == "nt"
+    if env == "PowerShell":
+        return shutil.which("powershell") is not None
+    return shutil.which("bash") is not None
+
+
+def cases(quick=False):
+    result = []
+    for env in ENVIRONMENTS:
+        shell = env if available(env) else "Bash"
+        modes = ["process"]
+        if shell in SESSION_ENVIRONMENTS:
+            modes.append("session")
+        if shell in DIRECT_ENVIRONMENTS:
+            modes.append("direct")
+        for mode in modes:
+            base = {"env": env, "shell": shell, "stand_in": shell != env, "mode": mode}
+            result.append(dict(
+                base, case=f"exec-{env}-{mode}-spawn", workload="spawn",
+                runs=QUICK_SPAWN_RUNS if quick else SPAWN_RUNS
+            ))
+            result.append(dict(
+                base, case=f"exec-{env}-{mode}-stream", workload="stream",
+                lines=QUICK_STREAM_LINES if quick else STREAM_LINES
+            ))
+    return result
+
+
+def run(case):
+    shell = case["shell"]
+    sessions = None
+    result = {}
+    if case["mode"] == "session":
+        sessions = SessionPool()
+        with Timer() as warm:
+            sessions.release(sessions.acquire(shell))
+        result["session_start_seconds"] = warm.seconds
+
+    received = [0]
+    direct_exec = "auto" if case["mode"] == "direct" else "never"
+
+    def on_output(text):
+        received[0] += len(text)
+
+    try:
+        if case["workload"] == "spawn":
+            runs = case["runs"]
+            with Timer() as timer:
+                for _ in range(runs):
+                    exit_code = CommandRun(
+                        SPAWN_COMMANDS[shell], shell, on_output, sessions=sessions, direct_exec=direct_exec
+                    ).run()
+                    assert exit_code == 0, exit_code
+            result.update(seconds=timer.seconds, runs_per_second=runs / timer.seconds)
+        else:
+            lines = case["lines"]
+            command = STREAM_COMMANDS[shell].format(lines=lines)
+            with Timer() as timer:
+                exit_code = CommandRun(command, shell, on_output, sessions=sessions, direct_exec=direct_exec).run()
+            assert exit_code == 0, exit_code
+            result.update(
+                seconds=timer.seconds, lines_per_second=lines / timer.seconds,
+                mb_per_second=received[0] / timer.seconds / 1e6
+            )
+    finally:
+        if sessions is not None:
+            sessions.close()
+    result["output_chars"] = received[0]
+    return result
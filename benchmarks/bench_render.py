@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+
+from benchmarks.common import Timer
+
+SIZES_MB = [1, 10, 100]
+QUICK_SIZES_MB = [1, 10]
+LINE = "x" * 79 + "\n"
+STALL_PROBE_MS = 5
+
+
+def cases(quick=False):
+    return [{"case": f"render-{size}MB", "megabytes": size} for size in (QUICK_SIZES_MB if quick else SIZES_MB)]
+
+
+def run(case):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+    from PyQt5.QtWidgets import QApplication
+    from cmdies.gui import APP_STYLESHEET, OutputView
+
+    class Producer(QObject):
+        # Emits one signal per line from another thread, like CommandWorker
+        output = pyqtSignal(object)
+        finished = pyqtSignal()
+
+        def run(self, lines):
+            runs = [(LINE, None)]
+            for _ in range(lines):
+                self.output.emit(runs)
+            self.finished.emit()
+
+    app = QApplication.instance() or QApplication([])
+    app.setStyleSheet(APP_STYLESHEET)
+    view = OutputView()
+    view.resize(860, 480)
+    view.show()
+    app.processEvents()
+
+    lines = case["megabytes"] * 1000 * 1000 // len(LINE)
+    producer = Producer()
+    producer.output.connect(view.append_runs)
+
+    # Longest gap between ticks of a short timer: how long the UI stopped responding
+    stalls = {"last": None, "max": 0.0}
+
+    def probe():
+        now = time.perf_counter()
+        if stalls["last"] is not None:
+            stalls["max"] = max(stalls["max"], now - stalls["last"])
+        stalls["last"] = now
+
+    probe_timer = QTimer()
+    probe_timer.setInterval(STALL_PROBE_MS)
+    probe_timer.timeout.connect(probe)
+
+    def finished():
+        view.flush()
+        view.repaint()
+        app.quit()
+
+    producer.finished.connect(finished)
+    thread = threading.Thread(target=producer.run, args=(lines,), daemon=True)
+    with Timer() as timer:
+        probe_timer.start()
+        thread.start()
+        app.exec_()
+    probe_timer.stop()
+    thread.join()
+
+    transcript = os.path.getsize(view.transcript_path) if view.transcript_path else 0
+    view.clear_output()
+    return {
+        "lines": lines,
+        "seconds": timer.seconds,
+        "mb_per_second": lines * len(LINE) / timer.seconds / 1e6,
+        "max_stall_ms": stalls["max"] * 1000,
+        "transcript_bytes": transcript,
+    }
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+
+from benchmarks.common import Timer
+from cmdies.runner import ENVIRONMENTS
+from cmdies.store import CommandStore, split_options
+
+SIZES = [1000, 100000, 1000000]
+QUICK_SIZES = [1000, 10000]
+
+
+def cases(quick=False):
+    return [{"case": f"store-{size}", "size": size} for size in (QUICK_SIZES if quick else SIZES)]
+
+
+def synthetic_library(size):
+    commands = {}
+    for i in range(size):
+        data = {"command": f"git -C ~/src/project-{i % 97} log --oneline -n {i % 50 + 1}", "env": ENVIRONMENTS[i % 3]}
+        if i % 10 == 0:
+            data["cache_ttl"] = 60
+        commands[f"cmd-{i:07d}"] = data
+    return commands
+
+
+def run(case):
+    size = case["size"]
+    commands = synthetic_library(size)
+    directory = tempfile.mkdtemp(prefix="cmdies-bench-")
+    try:
+        db_path = os.path.join(directory, "commandes.db")
+        legacy_path = os.path.join(directory, "commandes.txt")
+
+        # Bulk save: one write-behind transaction holding every entry
+        store = CommandStore(db_path)
+        with Timer() as save:
+            store.put_many(commands)
+            store.flush()
+
+        # Single edit on a full library, the common interactive case
+        with Timer() as put_one:
+            store.put("cmd-extra", {"command": "echo extra", "env": "Bash"})
+            store.flush()
+        store.close()
+
+        store = CommandStore(db_path)
+        with Timer() as load:
+            loaded = store.load()
+        store.close()
+        assert len(loaded) == size + 1
+
+        # First start after upgrading from the text file
+        with open(legacy_path, "w", encoding="utf-8") as f:
+            for name, data in commands.items():
+                f.write(f"{name}:{split_options(data)[0]}|{data['env']}\n")
+        os.remove(db_path)
+        store = CommandStore(db_path, legacy_path=legacy_path)
+        with Timer() as legacy_import:
+            store.load()
+        store.close()
+        db_bytes = os.path.getsize(db_path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "save_seconds": save.seconds,
+        "put_one_seconds": put_one.seconds,
+        "load_seconds": load.seconds,
+        "legacy_import_seconds": legacy_import.seconds,
+        "db_bytes": db_bytes,
+    }
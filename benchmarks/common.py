@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KiB elsewhere
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+
+
+def run_isolated(suite, case):
+    # Each case runs in a fresh interpreter, so its peak memory is its own
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks", "--child", suite, json.dumps(case)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        error = proc.stderr.strip().splitlines()
+        return dict(case, suite=suite, error=error[-1] if error else f"exit code {proc.returncode}")
+    return json.loads(lines[-1])
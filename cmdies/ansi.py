@@ -0,0 +1,135 @@
+import re
+
+# Escape sequences: CSI (SGR and cursor/erase codes), OSC (titles, hyperlinks)
+# ended by BEL or ST, charset selection and other two-character sequences
+ESCAPE = re.compile(r"\x1b(?:\[([0-?]*)[ -/]*([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|[()][0-9A-Za-z]|[=>@-Z\\^_])")
+MAX_PENDING = 4096  # Longest unfinished sequence held back for the next chunk
+
+# Standard and bright colors, tuned for the dark result area
+PALETTE = [
+    "#000000", "#cd3131", "#0dbc79", "#e5e510", "#2472c8", "#bc3fbc", "#11a8cd", "#e5e5e5",
+    "#666666", "#f14c4c", "#23d18b", "#f5f543", "#3b8eea", "#d670d6", "#29b8db", "#ffffff",
+]
+CUBE_LEVELS = [0, 95, 135, 175, 215, 255]
+INVERSE_FOREGROUND = "#1e1e1e"
+INVERSE_BACKGROUND = "#ffffff"
+
+
+def color_256(number):
+    if number < 16:
+        return PALETTE[number]
+    if number < 232:
+        number -= 16
+        levels = (CUBE_LEVELS[number // 36], CUBE_LEVELS[number // 6 % 6], CUBE_LEVELS[number % 6])
+        return "#%02x%02x%02x" % levels
+    gray = 8 + (number - 232) * 10
+    return "#%02x%02x%02x" % (gray, gray, gray)
+
+
+def strip_ansi(text):
+    return ESCAPE.sub("", text).replace("\x1b", "")
+
+
+class AnsiParser:
+    # Turns streamed terminal output into runs of (text, style) with the escape
+    # sequences removed. style is None for default text, otherwise a hashable
+    # (foreground, background, bold, italic, underline) tuple with "#rrggbb"
+    # colors or None. SGR state carries over between chunks, and a sequence cut
+    # by a chunk boundary is completed by the next chunk.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.foreground = None
+        self.background = None
+        self.bold = False
+        self.italic = False
+        self.underline = False
+        self.inverse = False
+        self.style = None
+        self._pending = ""
+
+    def feed(self, text):
+        if self._pending:
+            text = self._pending + text
+            self._pending = ""
+        if "\x1b" not in text:
+            return [(text, self.style)] if text else []
+
+        runs = []
+        position = 0
+        for match in ESCAPE.finditer(text):
+            if match.start() > position:
+                runs.append((text[position:match.start()].replace("\x1b", ""), self.style))
+            position = match.end()
+            if match.group(2) == "m":
+                self._apply(match.group(1))
+        tail = text[position:]
+        escape = tail.rfind("\x1b")
+        osc = tail.rfind("\x1b]")
+        if osc >= 0 and "\x07" not in tail[osc:]:
+            # An OSC is held back whole until its BEL or ST arrives
+            escape = osc
+        if escape >= 0 and "\n" not in tail[escape:] and len(tail) - escape < MAX_PENDING:
+            self._pending = tail[escape:]
+            tail = tail[:escape]
+        if tail:
+            runs.append((tail.replace("\x1b", ""), self.style))
+        return [run for run in runs if run[0]]
+
+    def _apply(self, params):
+        codes = [int(code) if code.isdigit() else 0 for code in params.replace(":", ";").split(";")]
+        index = 0
+        while index < len(codes):
+            code = codes[index]
+            if code == 0:
+                self.foreground = self.background = None
+                self.bold = self.italic = self.underline = self.inverse = False
+            elif code == 1:
+                self.bold = True
+            elif code == 3:
+                self.italic = True
+            elif code == 4:
+                self.underline = True
+            elif code == 7:
+                self.inverse = True
+            elif code == 22:
+                self.bold = False
+            elif code == 23:
+                self.italic = False
+            elif code == 24:
+                self.underline = False
+            elif code == 27:
+                self.inverse = False
+            elif 30 <= code <= 37:
+                self.foreground = PALETTE[code - 30]
+            elif 90 <= code <= 97:
+                self.foreground = PALETTE[code - 90 + 8]
+            elif 40 <= code <= 47:
+                self.background = PALETTE[code - 40]
+            elif 100 <= code <= 107:
+                self.background = PALETTE[code - 100 + 8]
+            elif code == 39:
+                self.foreground = None
+            elif code == 49:
+                self.background = None
+            elif code in (38, 48):
+                # 38;5;n for the 256-color palette, 38;2;r;g;b for true color
+                color, used = None, len(codes) - index - 1
+                mode = codes[index + 1] if index + 1 < len(codes) else None
+                if mode == 5 and index + 2 < len(codes):
+                    color, used = color_256(min(codes[index + 2], 255)), 2
+                elif mode == 2 and index + 4 < len(codes):
+                    color, used = "#%02x%02x%02x" % tuple(min(value, 255) for value in codes[index + 2:index + 5]), 4
+                if code == 38:
+                    self.foreground = color
+                else:
+                    self.background = color
+                index += used
+            index += 1
+
+        foreground, background = self.foreground, self.background
+        if self.inverse:
+            foreground, background = background or INVERSE_FOREGROUND, foreground or INVERSE_BACKGROUND
+        style = (foreground, background, self.bold, self.italic, self.underline)
+        self.style = None if style == (None, None, False, False, False) else style
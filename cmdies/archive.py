@@ -0,0 +1,194 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+CHUNK_SIZE = 256 * 1024  # Raw bytes per compressed chunk, cut at a line end where possible
+COMPRESS_LEVEL = 1  # Compression runs on the reader thread while output streams in
+MAX_AGE_DAYS = 30
+MAX_BYTES = 2 * 1024 * 1024 * 1024  # Total size of the archive directory
+CACHED_CHUNKS = 8  # Decompressed chunks kept per open archive
+
+# File layout: compressed chunks, a JSON index, then the index offset and MAGIC
+MAGIC = b"CMDOUT01"
+FOOTER = struct.Struct("<Q8s")
+SUFFIX = ".cmdout"
+
+
+class ArchiveError(Exception):
+    pass
+
+
+class OutputWriter:
+    # Appends one run's output; text is buffered up to CHUNK_SIZE and each chunk
+    # is compressed on its own so it can later be read without its neighbours
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path + ".tmp", "wb")
+        self._buffer = bytearray()
+        self._chunks = []  # [offset, compressed size, raw size, newlines, starts mid-line]
+        self._offset = 0
+        self._lines = 0
+        self._size = 0
+        self._mid_line = False
+
+    def write(self, text):
+        self._buffer += text.encode("utf-8", "replace")
+        while len(self._buffer) >= CHUNK_SIZE:
+            end = self._buffer.rfind(b"\n", 0, CHUNK_SIZE) + 1
+            self._write_chunk(end or CHUNK_SIZE)
+
+    def _write_chunk(self, end):
+        raw = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        data = zlib.compress(raw, COMPRESS_LEVEL)
+        newlines = raw.count(b"\n")
+        self._file.write(data)
+        self._chunks.append([self._offset, len(data), len(raw), newlines, self._mid_line])
+        self._offset += len(data)
+        self._lines += newlines
+        self._size += len(raw)
+        self._mid_line = not raw.endswith(b"\n")
+
+    def close(self):
+        if self._buffer:
+            self._write_chunk(len(self._buffer))
+        lines = self._lines + (1 if self._mid_line else 0)
+        index = json.dumps({"chunks": self._chunks, "lines": lines, "bytes": self._size}).encode("utf-8")
+        self._file.write(index)
+        self._file.write(FOOTER.pack(self._offset, MAGIC))
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.path + ".tmp")
+        except OSError:
+            pass
+
+
+class ArchivedOutput:
+    # Read-only view of one archived run. The file is memory-mapped and only the
+    # chunks covering the requested lines are decompressed.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # chunk number -> decompressed bytes
+        try:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            index_offset, magic = FOOTER.unpack(self._map[-FOOTER.size:])
+            if magic != MAGIC:
+                raise ValueError("not an output archive")
+            index = json.loads(self._map[index_offset:len(self._map) - FOOTER.size])
+        except (OSError, ValueError, struct.error) as e:
+            raise ArchiveError(f"Cannot read archived output {path}: {e}")
+        self.chunks = index["chunks"]
+        self.line_count = index["lines"]
+        self.size = index["bytes"]
+        # Line number at which each chunk starts (or continues a line)
+        self._first_lines = []
+        line = 0
+        for chunk in self.chunks:
+            self._first_lines.append(line)
+            line += chunk[3]
+
+    def _chunk(self, number):
+        with self._lock:
+            data = self._cache.get(number)
+            if data is not None:
+                self._cache.move_to_end(number)
+                return data
+            offset, length = self.chunks[number][:2]
+            data = zlib.decompress(self._map[offset:offset + length])
+            self._cache[number] = data
+            if len(self._cache) > CACHED_CHUNKS:
+                self._cache.popitem(last=False)
+            return data
+
+    def read_lines(self, start, count):
+        start = max(0, min(start, self.line_count))
+        end = min(start + count, self.line_count)
+        if start >= end:
+            return []
+        # Back up to a chunk that starts on a line boundary, then read forward
+        # until the last requested line is complete
+        first = bisect.bisect_right(self._first_lines, start) - 1
+        while first > 0 and self.chunks[first][4]:
+            first -= 1
+        last = bisect.bisect_right(self._first_lines, end - 1) - 1
+        while last + 1 < len(self.chunks) and self.chunks[last + 1][4]:
+            last += 1
+        # Chunks are joined before decoding: a forced cut may split a character
+        data = b"".join(self._chunk(number) for number in range(first, last + 1))
+        lines = data.decode("utf-8", "replace").split("\n")
+        skip = start - self._first_lines[first]
+        return lines[skip:skip + end - start]
+
+    def read_text(self):
+        return b"".join(self._chunk(number) for number in range(len(self.chunks))).decode("utf-8", "replace")
+
+    def close(self):
+        self._map.close()
+
+
+class OutputArchive:
+    # Directory of archived run outputs, one file per run, pruned by age and
+    # total size whenever a run is added
+    def __init__(self, directory, max_age_days=MAX_AGE_DAYS, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_age = max_age_days * 24 * 3600
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            print(f"Error while opening the output archive: {e}")
+
+    def path(self, output_id):
+        return os.path.join(self.directory, output_id + SUFFIX)
+
+    def create(self):
+        # Returns (output_id, writer), or (None, None) when the directory is unusable
+        output_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        try:
+            return output_id, OutputWriter(self.path(output_id))
+        except OSError as e:
+            print(f"Error while archiving output: {e}")
+            return None, None
+
+    def open(self, output_id):
+        return ArchivedOutput(self.path(output_id))
+
+    def exists(self, output_id):
+        return bool(output_id) and os.path.exists(self.path(output_id))
+
+    def prune(self):
+        with self._lock:
+            try:
+                entries = []
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(SUFFIX):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError as e:
+                print(f"Error while pruning the output archive: {e}")
+                return
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            cutoff = time.time() - self.max_age
+            for mtime, size, path in entries:
+                if mtime >= cutoff and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
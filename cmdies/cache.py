@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+MEMORY_BUDGET = 16 * 1024 * 1024  # Bytes of output kept in memory
+DISK_BUDGET = 256 * 1024 * 1024  # Bytes of output kept on disk
+MAX_ENTRY_SIZE = 4 * 1024 * 1024  # Larger outputs are not cached
+
+CachedResult = namedtuple("CachedResult", ["output", "exit_code", "created"])
+
+
+def cache_key(command, env, encoding=None, errors="replace"):
+    # Output decoded another way is a different entry
+    return hashlib.sha256(f"{env}\0{command}\0{encoding or ''}\0{errors}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    # Two-level LRU cache of command output keyed by command text, environment and
+    # output decoding.
+    # Entries carry their creation time; freshness is checked against the TTL
+    # the caller passes, so changing a command's TTL applies to existing entries.
+    def __init__(self, directory, memory_budget=MEMORY_BUDGET, disk_budget=DISK_BUDGET):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (CachedResult, size)
+        self._memory_bytes = 0
+        self._disk = OrderedDict()  # key -> size, least recently used first
+        self._disk_bytes = 0
+        try:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for entry in os.scandir(directory):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+        except OSError as e:
+            print(f"Error while opening the result cache: {e}")
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, command, env, ttl, encoding=None, errors="replace"):
+        key = cache_key(command, env, encoding, errors)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0].created <= ttl:
+                    self._memory.move_to_end(key)
+                    return entry[0]
+                self._drop(key)
+                return None
+            if key not in self._disk:
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                result = CachedResult(data["output"], data["exit_code"], data["created"])
+            except (OSError, ValueError, KeyError):
+                self._drop(key)
+                return None
+            if now - result.created > ttl:
+                self._drop(key)
+                return None
+            self._touch_disk(key)
+            self._remember(key, result, self._disk[key])
+            return result
+
+    def put(self, command, env, output, exit_code, encoding=None, errors="replace"):
+        size = len(output.encode("utf-8"))
+        if size > MAX_ENTRY_SIZE:
+            return
+        key = cache_key(command, env, encoding, errors)
+        result = CachedResult(output, exit_code, time.time())
+        with self._lock:
+            self._remember(key, result, size)
+            path = self._path(key)
+            try:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(result._asdict(), f)
+                os.replace(tmp_path, path)
+                disk_size = os.path.getsize(path)
+            except OSError as e:
+                print(f"Error while writing the result cache: {e}")
+                return
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = disk_size
+            self._disk_bytes += disk_size
+            while self._disk_bytes > self.disk_budget and len(self._disk) > 1:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                self._remove_file(old_key)
+
+    def invalidate(self, command, env, encoding=None, errors="replace"):
+        with self._lock:
+            self._drop(cache_key(command, env, encoding, errors))
+
+    def _remember(self, key, result, size):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        self._memory[key] = (result, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_budget and len(self._memory) > 1:
+            _, (_, old_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_size
+
+    def _touch_disk(self, key):
+        self._disk.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _drop(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+        if key in self._disk:
+            self._disk_bytes -= self._disk.pop(key)
+            self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
@@ -0,0 +1,402 @@
+import argparse
+import sys
+import time
+
+from cmdies.config import COMMAND_DB, COMMAND_FILE, HISTORY_DB, OUTPUT_ARCHIVE_DIR, RESULT_CACHE_DIR
+
+STARTED_AT = time.perf_counter()  # Reference point for --trace-startup
+LIBRARY_POLL_SECONDS = 5  # How often 'schedule --run' looks for library edits
+
+# Everything here runs without PyQt5; the GUI module is imported only when the
+# window is requested.
+
+
+def open_store():
+    from cmdies.store import CommandStore
+    return CommandStore(COMMAND_DB, legacy_path=COMMAND_FILE)
+
+
+def write_output(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def via_daemon(payload, args):
+    # Returns the daemon's messages, or None to fall back to in-process work
+    if args.no_daemon:
+        return None
+    from cmdies.daemon import request, DaemonUnavailable
+    messages = []
+
+    def on_message(message):
+        if "output" in message:
+            write_output(message["output"])
+        else:
+            messages.append(message)
+
+    try:
+        request(payload, on_message)
+    except DaemonUnavailable:
+        return None
+    return messages
+
+
+def cmd_list(args):
+    messages = via_daemon({"op": "list"}, args)
+    if messages is not None:
+        commands = messages[-1].get("commands", {})
+    else:
+        store = open_store()
+        commands = store.load()
+        store.close()
+    for name in sorted(commands):
+        data = commands[name]
+        print(f"{name}\t{data['env']}\t{data['command']}" if args.verbose else name)
+    return 0
+
+
+def cmd_search(args):
+    messages = via_daemon({"op": "search", "query": args.query, "limit": args.limit}, args)
+    if messages is not None:
+        names = messages[-1].get("names", [])
+    else:
+        from cmdies.frecency import FrecencyRanking
+        from cmdies.history import HistoryStore
+        from cmdies.search import CommandIndex
+        store = open_store()
+        history = HistoryStore(HISTORY_DB)
+        names = CommandIndex(store.load(), FrecencyRanking(history.frecency())).search(args.query, args.limit)
+        history.close()
+        store.close()
+    for name in names:
+        print(name)
+    return 0 if names else 1
+
+
+def parse_params(params):
+    # KEY=VALUE pairs from --param
+    values = {}
+    for param in params:
+        key, sep, value = param.partition("=")
+        if not sep:
+            raise ValueError(f"Expected KEY=VALUE, got '{param}'")
+        values[key.strip()] = value
+    return values
+
+
+def cmd_run(args):
+    try:
+        params = parse_params(args.param)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    # Matrix runs always run in-process, on a local job pool
+    messages = None if args.matrix else via_daemon({"op": "run", "name": args.name, "params": params}, args)
+    if messages is not None:
+        result = messages[-1] if messages else {"error": "The daemon closed the connection."}
+        if "error" in result:
+            print(result["error"], file=sys.stderr)
+            return 2
+        return result["exit_code"]
+
+    from cmdies.archive import OutputArchive
+    from cmdies.cache import ResultCache
+    from cmdies.history import HistoryStore
+    from cmdies.runner import run_saved_command
+    store = open_store()
+    commands = store.load()
+    store.close()
+    if args.name not in commands:
+        from cmdies.search import CommandIndex
+        print(f"Command '{args.name}' not found.", file=sys.stderr)
+        suggestions = CommandIndex(commands).search(args.name, 5)
+        if suggestions:
+            print("Did you mean: " + ", ".join(suggestions), file=sys.stderr)
+        return 2
+    from cmdies.templates import TemplateError, fill
+    from cmdies.workflow import WORKFLOW_ENV, WorkflowError, run_workflow
+    history = HistoryStore(HISTORY_DB)
+    history.touch(args.name)
+    archive = OutputArchive(OUTPUT_ARCHIVE_DIR)
+    try:
+        if commands[args.name]["env"] == WORKFLOW_ENV:
+            return run_workflow(commands[args.name], commands, write_output, history, archive)
+        if args.matrix:
+            return run_matrix(args, commands[args.name], params, history, archive)
+        data = fill(commands[args.name], params)
+        return run_saved_command(
+            data, write_output, cache=ResultCache(RESULT_CACHE_DIR), history=history, name=args.name, archive=archive
+        )
+    except (TemplateError, WorkflowError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        history.close()
+
+
+def run_matrix(args, data, params, history, archive):
+    # One run of the template per matrix row, at most --jobs at a time. Each run's
+    # output goes to the archive; a results table is printed at the end.
+    from cmdies.runner import CommandRun, JobPool, command_options
+    from cmdies.templates import TemplateError, export_results, fill, item_label, parse_matrix, placeholders
+    try:
+        if args.matrix == "-":
+            text = sys.stdin.read()
+        else:
+            with open(args.matrix, encoding="utf-8", newline="") as f:
+                text = f.read()
+    except OSError as e:
+        print(f"Error while reading the matrix: {e}", file=sys.stderr)
+        return 2
+    rows = parse_matrix(text, [name for name, _ in placeholders(data["command"])])
+    if not rows:
+        raise TemplateError("The matrix has no rows.")
+    jobs = []
+    for row in rows:
+        values = {**params, **{key: value for key, value in row.items() if value}}
+        job_data = fill(data, values)
+        run = CommandRun(job_data["command"], job_data["env"], archive=archive, **command_options(job_data))
+        jobs.append((item_label(row), values, run))
+
+    pool = JobPool(args.jobs)
+    futures = [pool.submit(run) for _, _, run in jobs]
+    try:
+        for (label, _, run), future in zip(jobs, futures):
+            future.result()
+            history.record(args.name, run)
+            print(f"{'ok' if run.exit_code == 0 else 'FAILED':7} {label}", file=sys.stderr)
+    except KeyboardInterrupt:
+        # The children are in their own process groups and did not get the Ctrl+C
+        pool.shutdown()
+        for _, _, run in jobs:
+            run.stop()
+        raise
+    pool.shutdown(wait=True)
+
+    results = []
+    print(f"{'item':40} {'status':>10} {'exit':>6} {'time s':>9}")
+    for label, values, run in jobs:
+        status = "timed out" if run.timed_out else "stopped" if run.stopped else "ok" if run.exit_code == 0 else "failed"
+        print(f"{label[:40]:40} {status:>10} {run.exit_code:>6} {run.elapsed():>9.3f}")
+        results.append({
+            **values, "status": status, "exit_code": run.exit_code, "duration": round(run.elapsed(), 3),
+            "command": run.command, "output_id": run.output_id,
+        })
+    failed = sum(1 for _, _, run in jobs if run.exit_code != 0)
+    print(f"{len(jobs) - failed}/{len(jobs)} succeeded")
+    if args.export:
+        export_results(args.export, results)
+        print(f"Exported {len(results)} rows to {args.export}")
+    return 1 if failed else 0
+
+
+def format_optional(value, fmt):
+    return "-" if value is None else format(value, fmt)
+
+
+def cmd_stats(args):
+    from cmdies.history import HistoryStore
+    history = HistoryStore(HISTORY_DB)
+    try:
+        if args.export:
+            count = history.export(args.export, args.summary)
+            print(f"Exported {count} rows to {args.export}")
+            return 0
+        stats = history.stats()
+    finally:
+        history.close()
+    print(f"{'command':30} {'runs':>6} {'p50 s':>9} {'p95 s':>9} {'fail %':>7} {'cpu s':>9} {'rss MB':>8}")
+    for entry in stats:
+        rss = entry["peak_rss_kb"]
+        print(
+            f"{entry['name'][:30]:30} {entry['runs']:>6} {entry['p50']:>9.3f} {entry['p95']:>9.3f} "
+            f"{entry['failure_rate'] * 100:>7.1f} {format_optional(entry['mean_cpu_time'], '.3f'):>9} "
+            f"{format_optional(None if rss is None else rss / 1024, '.1f'):>8}"
+        )
+    return 0
+
+
+def cmd_import_history(args):
+    from cmdies.shellhistory import HistoryCounter, default_history_files, guess_env, propose
+    files = [(path, args.env or guess_env(path)) for path in args.files] or default_history_files()
+    if not files:
+        print("No Bash or PSReadLine history found; pass the history files to read.", file=sys.stderr)
+        return 1
+    counter = HistoryCounter()
+    for path, env in files:
+        try:
+            counter.add_file(path, env)
+        except OSError as e:
+            print(f"Error while reading {path}: {e}", file=sys.stderr)
+            return 1
+    store = open_store()
+    try:
+        proposals = propose(counter, store.load(), args.limit)
+        print(f"{counter.lines} history entries, {len(counter.entries)} distinct commands counted")
+        print(f"{'name':30} {'uses':>6} {'env':10} command")
+        for name, data, count, _ in proposals:
+            print(f"{name[:30]:30} {count:>6} {data['env']:10} {data['command'].splitlines()[0][:80]}")
+        if args.save:
+            store.put_many({name: data for name, data, _, _ in proposals})
+            print(f"Saved {len(proposals)} commands")
+        elif proposals:
+            print("Run again with --save to add them to the library.")
+    finally:
+        store.close()
+    return 0
+
+
+class ScheduleLog:
+    # Prints when scheduled runs start and end; the scheduler also reports
+    # reschedules and coalesced occurrences, which are left out
+    def __init__(self):
+        self.seen = {}
+
+    def __call__(self, job):
+        from cmdies.schedule import last_result
+        state = (job.running, job.runs)
+        if self.seen.get(job.name, (False, job.runs)) == state:
+            return
+        self.seen[job.name] = state
+        action = "started " if job.running else "finished"
+        detail = "" if job.running else f": {last_result(job)}"
+        print(f"{time.strftime('%H:%M:%S')} {action} {job.name}{detail}", flush=True)
+
+
+def cmd_schedule(args):
+    from cmdies.history import HistoryStore
+    from cmdies.schedule import Scheduler, format_delay, run_scheduled
+    store = open_store()
+    commands = store.load()
+    history = HistoryStore(HISTORY_DB)
+    scheduler = Scheduler(None, history=history)
+    scheduler.update(commands)
+    jobs = scheduler.jobs_by_next_run()
+    if not args.run:
+        store.close()
+        history.close()
+        now = time.time()
+        print(f"{'command':30} {'schedule':20} next run")
+        for job in jobs:
+            if job.schedule is None:
+                next_run = f"invalid: {job.last_error}"
+            else:
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(job.next_run))
+                next_run = f"in {format_delay(job.next_run - now)} ({when})"
+            print(f"{job.name[:30]:30} {job.data['schedule'][:20]:20} {next_run}")
+        return 0
+
+    # Runs the scheduled commands in the foreground, for machines without the
+    # window. Another instance already running them keeps doing so; this one
+    # takes over when it stops.
+    from cmdies.archive import OutputArchive
+    archive = OutputArchive(OUTPUT_ARCHIVE_DIR)
+    scheduler = Scheduler(
+        lambda job, on_run: run_scheduled(job, commands, history, archive, on_run=on_run), on_change=ScheduleLog(),
+        max_running=args.jobs, history=history
+    )
+    scheduler.update(commands)
+    scheduler.start()
+    print(f"Running {len(jobs)} scheduled commands, at most {args.jobs} at once. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(LIBRARY_POLL_SECONDS)
+            if store.has_external_changes():
+                changed, deleted = store.changes_since()
+                commands.update(changed)
+                for name in deleted:
+                    commands.pop(name, None)
+                scheduler.update(commands)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        store.close()
+        history.close()
+    return 0
+
+
+def cmd_daemon(args):
+    from cmdies import daemon
+    if args.stop:
+        try:
+            daemon.request({"op": "stop"}, lambda message: None)
+        except daemon.DaemonUnavailable:
+            print("No daemon is running.", file=sys.stderr)
+            return 1
+        return 0
+    return daemon.serve()
+
+
+def cmd_gui(args):
+    from cmdies.gui import main as gui_main
+    return gui_main([sys.argv[0]] + args.qt_args, STARTED_AT, args.trace_startup)
+
+
+def positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{text}'")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: '{text}'")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="iknowmycmdies", description="Manage and run saved shell commands.")
+    parser.add_argument("--no-daemon", action="store_true", help="do not delegate to a running daemon")
+    commands = parser.add_subparsers(dest="action")
+
+    run_parser = commands.add_parser("run", help="run a saved command and print its output")
+    run_parser.add_argument("name")
+    run_parser.add_argument("-p", "--param", action="append", default=[], metavar="KEY=VALUE",
+                            help="fill in a {{KEY}} placeholder of a command template")
+    run_parser.add_argument("--matrix", metavar="FILE",
+                            help="run the template once per line of a list or CSV file (- for stdin)")
+    run_parser.add_argument("-j", "--jobs", type=positive_int, default=4, help="parallel runs of a matrix (default: 4)")
+    run_parser.add_argument("--export", metavar="FILE", help="write the matrix results to a .csv or .json file")
+    run_parser.set_defaults(func=cmd_run)
+
+    list_parser = commands.add_parser("list", help="list saved commands")
+    list_parser.add_argument("-v", "--verbose", action="store_true", help="show environment and command text")
+    list_parser.set_defaults(func=cmd_list)
+
+    search_parser = commands.add_parser("search", help="search saved commands")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-n", "--limit", type=int, default=10)
+    search_parser.set_defaults(func=cmd_search)
+
+    stats_parser = commands.add_parser("stats", help="show p50/p95 duration and failure rate per command")
+    stats_parser.add_argument("--export", metavar="FILE", help="write the run history to a .csv or .json file")
+    stats_parser.add_argument("--summary", action="store_true", help="export the per-command stats instead of every run")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    import_parser = commands.add_parser("import-history", help="propose the most used shell history commands for saving")
+    import_parser.add_argument("files", nargs="*", help="history files (default: ~/.bash_history and PSReadLine)")
+    import_parser.add_argument("-n", "--limit", type=int, default=50, help="number of commands to propose")
+    import_parser.add_argument("--env", choices=["Bash", "PowerShell", "CMD"], help="environment of the given files")
+    import_parser.add_argument("--save", action="store_true", help="add the proposed commands to the library")
+    import_parser.set_defaults(func=cmd_import_history)
+
+    schedule_parser = commands.add_parser("schedule", help="list scheduled commands and their next runs")
+    schedule_parser.add_argument("--run", action="store_true", help="run them in the foreground until Ctrl+C")
+    schedule_parser.add_argument("-j", "--jobs", type=positive_int, default=4, help="most runs at once (default: 4)")
+    schedule_parser.set_defaults(func=cmd_schedule)
+
+    daemon_parser = commands.add_parser("daemon", help="keep the library and shell sessions resident")
+    daemon_parser.add_argument("--stop", action="store_true", help="stop the running daemon")
+    daemon_parser.set_defaults(func=cmd_daemon)
+
+    gui_parser = commands.add_parser("gui", help="open the window (default)")
+    gui_parser.add_argument("--trace-startup", action="store_true", help="print startup phase timings to stderr")
+    gui_parser.add_argument("qt_args", nargs=argparse.REMAINDER)
+    gui_parser.set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    if args.action is None:
+        args = build_parser().parse_args(["gui"])
+    return args.func(args)
@@ -0,0 +1,22 @@
+import getpass
+import hashlib
+import os
+import tempfile
+
+COMMAND_FILE = "commandes.txt"  # Legacy text library, imported once into COMMAND_DB
+COMMAND_DB = "commandes.db"
+HISTORY_DB = "history.db"  # One row per finished run, see cmdies.history
+RESULT_CACHE_DIR = "result_cache"
+OUTPUT_ARCHIVE_DIR = "output_archive"  # Compressed output of past runs, see cmdies.archive
+
+# The daemon writes its address and access token here; one daemon per library.
+# $XDG_RUNTIME_DIR is private to the user; the shared temp directory is only a
+# fallback, and the daemon checks who owns the directory before using it.
+DAEMON_INFO_DIR = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"cmdies-{getpass.getuser()}"
+)
+
+
+def daemon_info_path(db_path=COMMAND_DB):
+    library = hashlib.sha256(os.path.abspath(db_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(DAEMON_INFO_DIR, f"daemon-{library}.json")
@@ -0,0 +1,306 @@
+import hmac
+import json
+import os
+import secrets
+import select
+import socket
+import socketserver
+import stat
+import threading
+
+from cmdies.archive import OutputArchive
+from cmdies.cache import ResultCache
+from cmdies.config import COMMAND_DB, COMMAND_FILE, HISTORY_DB, OUTPUT_ARCHIVE_DIR, RESULT_CACHE_DIR, DAEMON_INFO_DIR, daemon_info_path
+from cmdies.frecency import FrecencyRanking
+from cmdies.history import HistoryStore
+from cmdies.runner import invalidate_cached, run_saved_command
+from cmdies.search import CommandIndex
+from cmdies.sessions import SessionPool
+from cmdies.store import CommandStore
+from cmdies.templates import TemplateError, fill
+from cmdies.workflow import WORKFLOW_ENV, WorkflowError, run_workflow
+
+CONNECT_TIMEOUT = 0.5  # Seconds before a client gives up and runs the command itself
+OUTPUT_BATCH_DELAY = 0.02  # Seconds of output coalesced into one reply message
+CLIENT_POLL_SECONDS = 0.2  # How often a run checks that its client is still connected
+
+
+class DaemonUnavailable(Exception):
+    pass
+
+
+def check_info_dir(path=DAEMON_INFO_DIR):
+    # Another user who created the directory first would decide where the token
+    # and the socket go, so only a real directory of ours, closed to others, is used
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise DaemonUnavailable(f"{path} is not a directory")
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid():
+            raise DaemonUnavailable(f"{path} belongs to another user")
+        if stat.S_IMODE(info.st_mode) != 0o700:
+            raise DaemonUnavailable(f"{path} is accessible to other users (mode {stat.S_IMODE(info.st_mode):o})")
+
+
+class Library:
+    # The command library as seen by the daemon, refreshed from the store's
+    # revision log before each request. Search ranks by the frecency scores
+    # saved in history, which runs through the daemon keep up to date. Cached
+    # output of edited and deleted commands is dropped.
+    def __init__(self, store, history, cache=None):
+        self.store = store
+        self.history = history
+        self.cache = cache
+        self.commands = store.load()
+        self.index = CommandIndex(self.commands, FrecencyRanking(history.frecency()))
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        # A copy that a concurrent refresh does not change while it is serialized
+        with self._lock:
+            return dict(self.commands)
+
+    def search(self, query, limit):
+        with self._lock:
+            return self.index.search(query, limit)
+
+    def use(self, name):
+        with self._lock:
+            self.history.touch(name)
+            self.index.ranking.bump(name)
+
+    def refresh(self):
+        with self._lock:
+            if not self.store.has_external_changes():
+                return
+            changed, deleted = self.store.changes_since()
+            for name, data in changed.items():
+                self._invalidate(self.commands.get(name))
+                self.commands[name] = data
+                self.index.add(name, data)
+            for name in deleted:
+                old = self.commands.pop(name, None)
+                if old is not None:
+                    self._invalidate(old)
+                    self.index.remove(name)
+
+    def _invalidate(self, data):
+        if data is not None and self.cache is not None:
+            invalidate_cached(self.cache, data)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    # One JSON request line in, JSON message lines out. A client that goes away
+    # (Ctrl+C in the CLI) cancels its run: the run is stopped as soon as the
+    # connection reaches EOF or a reply cannot be sent.
+    def setup(self):
+        super().setup()
+        self.active = None
+        self.cancelled = False
+        self._cancel_lock = threading.Lock()
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        server = self.server
+        if not hmac.compare_digest(str(request.get("token", "")), server.token):
+            self.send({"error": "Invalid daemon token."})
+            return
+
+        library = server.library
+        library.refresh()
+        op = request.get("op")
+        if op == "ping":
+            self.send({"ok": True})
+        elif op == "list":
+            self.send({"commands": library.snapshot()})
+        elif op == "search":
+            self.send({"names": library.search(request.get("query", ""), request.get("limit", 10))})
+        elif op == "run":
+            commands = library.snapshot()
+            data = commands.get(request.get("name"))
+            if data is None:
+                self.send({"error": f"Command '{request.get('name')}' not found."})
+                return
+            library.use(request.get("name"))
+            done = threading.Event()
+            watcher = threading.Thread(target=self._watch_client, args=(done,), daemon=True)
+            watcher.start()
+            try:
+                self.run_command(data, commands, request)
+            finally:
+                # finish() closes the connection; the watcher must be off it by then
+                done.set()
+                watcher.join()
+        elif op == "stop":
+            self.send({"ok": True})
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        else:
+            self.send({"error": f"Unknown request: {op}"})
+
+    def run_command(self, data, commands, request):
+        server = self.server
+        batcher = OutputBatcher(self.send)
+        try:
+            if data["env"] == WORKFLOW_ENV:
+                exit_code = run_workflow(data, commands, batcher.write, server.history, server.archive, self._track)
+            else:
+                exit_code = run_saved_command(
+                    fill(data, request.get("params") or {}), batcher.write, server.sessions, server.cache,
+                    server.history, request.get("name"), server.archive, self._track
+                )
+        except (TemplateError, WorkflowError) as e:
+            batcher.close()
+            self.send({"error": str(e)})
+            return
+        batcher.close()
+        self.send({"exit_code": exit_code})
+
+    def send(self, message):
+        if self.cancelled:
+            return
+        try:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.cancel()
+
+    def _watch_client(self, done):
+        # The client sends nothing after its request, so the socket only turns
+        # readable at EOF. Polled on the raw socket until the run is done:
+        # a read blocked on rfile would keep finish() from closing it.
+        while not done.is_set():
+            try:
+                readable, _, _ = select.select([self.connection], [], [], CLIENT_POLL_SECONDS)
+                if readable and not self.connection.recv(1):
+                    break
+            except (OSError, ValueError):
+                break
+        else:
+            return
+        self.cancel()
+
+    def _track(self, run):
+        with self._cancel_lock:
+            self.active = run
+            if self.cancelled:
+                run.stop()
+
+    def cancel(self):
+        with self._cancel_lock:
+            self.cancelled = True
+            if self.active is not None:
+                self.active.stop()
+
+
+class OutputBatcher:
+    # Coalesces streamed output into one message per OUTPUT_BATCH_DELAY
+    def __init__(self, send):
+        self._send = send
+        self._chunks = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def write(self, text):
+        with self._lock:
+            self._chunks.append(text)
+            if self._timer is None:
+                self._timer = threading.Timer(OUTPUT_BATCH_DELAY, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._timer = None
+            if self._chunks:
+                text = "".join(self._chunks)
+                self._chunks = []
+                self._send({"output": text})
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self.flush()
+
+
+def _server_class():
+    if hasattr(socketserver, "ThreadingUnixStreamServer"):
+        return socketserver.ThreadingUnixStreamServer
+    return socketserver.ThreadingTCPServer
+
+
+def serve(db_path=COMMAND_DB, legacy_path=COMMAND_FILE):
+    # Keeps the library, the search index and warm sessions resident, and
+    # answers requests on a local socket until asked to stop
+    os.makedirs(DAEMON_INFO_DIR, mode=0o700, exist_ok=True)
+    try:
+        check_info_dir()
+    except DaemonUnavailable as e:
+        print(f"Error while starting the daemon: {e}")
+        return 1
+    info_path = daemon_info_path(db_path)
+    server_class = _server_class()
+    if server_class is socketserver.ThreadingTCPServer:
+        address = ("127.0.0.1", 0)
+    else:
+        address = f"{info_path[:-5]}.sock"
+        if os.path.exists(address):
+            os.remove(address)
+
+    server = server_class(address, RequestHandler)
+    server.daemon_threads = True
+    server.token = secrets.token_hex(16)
+    server.history = HistoryStore(HISTORY_DB)
+    server.cache = ResultCache(RESULT_CACHE_DIR)
+    server.library = Library(CommandStore(db_path, legacy_path=legacy_path), server.history, server.cache)
+    server.sessions = SessionPool()
+    server.sessions.warm({data["env"] for data in server.library.commands.values()})
+    server.archive = OutputArchive(OUTPUT_ARCHIVE_DIR)
+
+    fd = os.open(info_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"address": server.server_address, "token": server.token, "pid": os.getpid()}, f)
+
+    print(f"Daemon listening on {server.server_address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.sessions.close()
+        server.library.store.close()
+        server.history.close()
+        for path in (info_path, address if isinstance(address, str) else None):
+            if path and os.path.exists(path):
+                os.remove(path)
+    return 0
+
+
+def request(payload, on_message, db_path=COMMAND_DB):
+    # Sends one request to the running daemon and feeds every reply line to
+    # on_message; raises DaemonUnavailable when no daemon answers
+    try:
+        check_info_dir()
+        with open(daemon_info_path(db_path), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        address = info["address"]
+        if isinstance(address, str):
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = tuple(address)
+        conn.settimeout(CONNECT_TIMEOUT)
+        conn.connect(address)
+    except (OSError, ValueError, KeyError) as e:
+        raise DaemonUnavailable(str(e))
+
+    with conn:
+        conn.settimeout(None)
+        conn.sendall(json.dumps(dict(payload, token=info["token"])).encode("utf-8") + b"\n")
+        with conn.makefile("rb") as replies:
+            for line in replies:
+                on_message(json.loads(line))
@@ -0,0 +1,131 @@
+import os
+import re
+import shlex
+import shutil
+import threading
+
+# Per-command direct_exec option: auto launches simple commands without a shell,
+# always splits every command whose program is found into an argv (shell
+# characters are passed on literally) and never keeps the shell
+DIRECT_EXEC_MODES = ("auto", "always", "never")
+
+# Anything the shell would expand, redirect, chain or glob outside quotes, and
+# what it still expands inside double quotes
+BASH_SPECIAL = set("|&;<>()$`\\*?[]{}~!#\n\r")
+BASH_DOUBLE_QUOTED_SPECIAL = set("$`\\")
+CMD_SPECIAL = re.compile(r"[|&<>()^%!\n\r]")
+
+# Words a shell runs itself; some also exist as programs but behave differently
+BASH_BUILTINS = {
+    ".", ":", "[", "[[", "alias", "bg", "bind", "break", "builtin", "case", "cd", "command", "compgen", "complete",
+    "continue", "declare", "dirs", "disown", "echo", "enable", "eval", "exec", "exit", "export", "false", "fc", "fg",
+    "for", "function", "getopts", "hash", "help", "history", "if", "jobs", "kill", "let", "local", "logout",
+    "mapfile", "popd", "printf", "pushd", "pwd", "read", "readarray", "readonly", "return", "select", "set",
+    "shift", "shopt", "source", "suspend", "test", "time", "times", "trap", "true", "type", "typeset", "ulimit",
+    "umask", "unalias", "unset", "until", "wait", "while",
+}
+CMD_BUILTINS = {
+    "assoc", "break", "call", "cd", "chdir", "cls", "color", "copy", "date", "del", "dir", "echo", "endlocal", "erase",
+    "exit", "for", "ftype", "goto", "if", "md", "mkdir", "mklink", "move", "path", "pause", "popd", "prompt", "pushd",
+    "rd", "ren", "rename", "rmdir", "set", "setlocal", "shift", "start", "time", "title", "type", "ver", "verify", "vol",
+}
+CMD_PROGRAM_EXTENSIONS = (".exe", ".com")  # .bat and .cmd scripts need cmd.exe
+
+# Environments launched directly on this platform: Bash from a POSIX process
+# only, since on Windows "bash" may be WSL with a PATH of its own
+DIRECT_ENVIRONMENTS = ("CMD",) if os.name == "nt" else ("Bash",)
+
+
+class ProgramCache:
+    # shutil.which results, dropped whenever PATH (or PATHEXT) changes
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paths = {}
+        self._key = None
+
+    def resolve(self, program):
+        key = (os.environ.get("PATH"), os.environ.get("PATHEXT"))
+        with self._lock:
+            if key != self._key:
+                self._paths.clear()
+                self._key = key
+            if program not in self._paths:
+                self._paths[program] = shutil.which(program)
+            return self._paths[program]
+
+    def forget(self, executable):
+        # Drops the programs resolved to executable, e.g. after it failed to start
+        with self._lock:
+            for program in [program for program, path in self._paths.items() if path == executable]:
+                del self._paths[program]
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+
+
+programs = ProgramCache()
+
+
+def direct_args(command, env, mode="auto"):
+    # (args, executable) to launch command without its shell, or None when the
+    # shell is needed. args is an argv list for Bash and the command line for
+    # CMD, which Windows hands to the program as is.
+    if mode == "never" or env not in DIRECT_ENVIRONMENTS:
+        return None
+    if env == "Bash":
+        return _bash_args(command, mode)
+    return _cmd_args(command, mode)
+
+
+def needs_bash(command):
+    quote = None
+    for char in command:
+        if quote == "'":
+            if char == "'":
+                quote = None
+        elif quote == '"':
+            if char == '"':
+                quote = None
+            elif char in BASH_DOUBLE_QUOTED_SPECIAL:
+                return True
+        elif char in "'\"":
+            quote = char
+        elif char in BASH_SPECIAL:
+            return True
+    return quote is not None
+
+
+def _bash_args(command, mode):
+    if mode == "auto" and needs_bash(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or (mode == "auto" and (argv[0] in BASH_BUILTINS or "=" in argv[0])):
+        return None
+    executable = programs.resolve(argv[0])
+    if executable is None:
+        return None
+    return argv, executable
+
+
+def _cmd_args(command, mode):
+    command = command.strip()
+    if not command or (mode == "auto" and CMD_SPECIAL.search(command)):
+        return None
+    if command.startswith('"'):
+        end = command.find('"', 1)
+        if end < 0:
+            return None
+        program, rest = command[1:end], command[end + 1:]
+    else:
+        program, _, rest = command.partition(" ")
+        rest = " " + rest if rest else ""
+    if mode == "auto" and program.lower() in CMD_BUILTINS:
+        return None
+    executable = programs.resolve(program)
+    if executable is None or not executable.lower().endswith(CMD_PROGRAM_EXTENSIONS):
+        return None
+    return f'"{executable}"{rest}', executable
@@ -0,0 +1,87 @@
+import math
+import time
+
+from cmdies.sortedlist import SortedList
+
+HALF_LIFE = 7 * 24 * 3600  # Seconds after which a use counts half as much
+DECAY = math.log(2) / HALF_LIFE
+
+
+def logaddexp(a, b):
+    # log(exp(a) + exp(b)) without overflowing
+    if a == -math.inf:
+        return b
+    if b == -math.inf:
+        return a
+    high, low = (a, b) if a > b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+def use_score(when=None):
+    return DECAY * (time.time() if when is None else when)
+
+
+class FrecencyRanking:
+    # Ranks command names by how often and how recently they were run. Each use
+    # at time t adds exp(DECAY * t) to a score, so older uses weigh less relative
+    # to newer ones and scores never need to be rescaled as time passes. Scores
+    # are kept as logarithms, which stay small while exp() would overflow.
+    # The library's names are kept in one SortedList in rank order, never-run
+    # names alphabetically after the used ones. The search index and the command
+    # list model share it; a use moves one entry in O(log n).
+    def __init__(self, scores=None):
+        self.scores = dict(scores or {})  # Also of deleted names, which get their rank back when re-added
+        self.order = SortedList()  # sort_key() of each library name, best first
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, name):
+        return self.sort_key(name) in self.order
+
+    def score(self, name):
+        return self.scores.get(name, -math.inf)
+
+    def sort_key(self, name, score=None):
+        return (-(self.score(name) if score is None else score), name.lower(), name)
+
+    def reset(self, names):
+        self.order = SortedList(self.sort_key(name) for name in names)
+
+    def add(self, name):
+        key = self.sort_key(name)
+        if key not in self.order:
+            self.order.add(key)
+
+    def discard(self, name):
+        self.order.discard(self.sort_key(name))
+
+    def row(self, name):
+        # Position of name in the order, or None
+        key = self.sort_key(name)
+        position = self.order.bisect_left(key)
+        if position < len(self.order) and self.order[position] == key:
+            return position
+        return None
+
+    def name_at(self, row):
+        return self.order[row][2]
+
+    def names(self, start=0):
+        return (key[2] for key in self.order.islice(start))
+
+    def bumped(self, name, when=None):
+        # The score name would have after one more use
+        return logaddexp(self.score(name), use_score(when))
+
+    def bump(self, name, when=None):
+        score = self.bumped(name, when)
+        self.set(name, score)
+        return score
+
+    def set(self, name, score):
+        key = self.sort_key(name)
+        if key in self.order:
+            self.order.remove(key)
+            self.order.add(self.sort_key(name, score))
+        self.scores[name] = score
@@ -0,0 +1,2888 @@
+import sys
+import os
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
+    QLabel, QComboBox, QMessageBox, QListView, QDialog, QDialogButtonBox, QTextEdit,
+    QScrollArea, QFrame, QSizePolicy, QPlainTextEdit, QSpinBox, QTabWidget, QCompleter, QFormLayout,
+    QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QScrollBar, QAbstractSlider, QCheckBox,
+    QStackedWidget, QShortcut
+)
+from PyQt5.QtCore import (
+    Qt, QSize, QRect, QObject, QTimer, QUrl, QStringListModel, QAbstractListModel, QModelIndex,
+    QFileSystemWatcher, QEvent, pyqtSignal
+)
+from PyQt5.QtGui import (
+    QFont, QIcon, QPixmap, QPainter, QColor, QLinearGradient, QTextCursor, QTextCharFormat, QTextFormat,
+    QDesktopServices, QKeySequence
+)
+import codecs
+import html
+import re
+import shutil
+import tempfile
+import threading
+import time
+from cmdies.archive import ArchiveError, OutputArchive
+from cmdies.cache import ResultCache, MAX_ENTRY_SIZE
+from cmdies.directexec import DIRECT_EXEC_MODES
+from cmdies.frecency import FrecencyRanking
+from cmdies.history import HistoryStore
+from cmdies.outputsearch import OutputSearch, compile_pattern
+from cmdies.ansi import AnsiParser, strip_ansi
+from cmdies.processes import LIMITS_SUPPORTED
+from cmdies.runner import (
+    CommandRun, JobPool, DEFAULT_MAX_JOBS, DECODE_ERRORS, cache_decoding, command_options, invalidate_cached
+)
+from cmdies.schedule import ScheduleError, Scheduler, format_delay, last_result, parse_schedule, run_scheduled
+from cmdies.search import CommandIndex
+from cmdies.sessions import SessionPool
+from cmdies.shellhistory import DEFAULT_PROPOSALS, HistoryCounter, default_history_files, guess_env, propose
+from cmdies.store import CommandStore
+from cmdies.templates import (
+    TemplateError, export_results, fill, is_template, item_label, parse_matrix, placeholders, render
+)
+from cmdies.watch import DEFAULT_INTERVAL, CommandWatch
+from cmdies.workflow import WORKFLOW_ENV, WorkflowError, WorkflowRun, parse_workflow
+from cmdies.config import COMMAND_FILE, COMMAND_DB, HISTORY_DB, OUTPUT_ARCHIVE_DIR, RESULT_CACHE_DIR
+
+CLOSE_ICON_PATH = "icons/close.png"
+MINIMIZE_ICON_PATH = "icons/minimize.png"
+TERMINAL_ICON_PATH = "icons/terminal.png"
+
+OUTPUT_FLUSH_INTERVAL_MS = 16  # Coalesce streamed chunks into one repaint per frame
+OUTPUT_MAX_LINES = 20000  # Lines kept in the result area, the trimmed ones go to a temp file
+OUTPUT_TRIM_MARGIN = 2000  # Lines the result area may grow past OUTPUT_MAX_LINES before a trim
+
+USE_WARM_SESSIONS = True  # Run PowerShell/Bash commands in persistent interpreters
+
+LIBRARY_POLL_INTERVAL_MS = 2000  # Fallback check for library changes made by other instances
+
+MODEL_FETCH_BATCH = 500  # Rows handed to views per fetchMore call
+
+SEARCH_RESULT_COUNT = 10  # Type-ahead matches shown under the command input
+SUGGESTION_COUNT = 5  # Closest matches offered when a command name is not found
+RECENT_RUN_COUNT = 500  # Runs listed in the output history
+FIND_DELAY_MS = 150  # Typing pause before the find bar starts a new search
+MAX_WATCH_INTERVAL = 3600  # Seconds
+SCHEDULE_REFRESH_MS = 1000  # Countdown refresh of the schedule view
+
+TRACE_STARTUP = os.environ.get("CMDIES_TRACE_STARTUP") == "1"  # Print startup phase timings to stderr
+
+# One application-wide stylesheet, parsed once by Qt instead of once per widget
+APP_STYLESHEET = """
+    /* Main window */
+    #content {
+        background-color: #1e1e1e;
+        border-bottom-left-radius: 8px;
+        border-bottom-right-radius: 8px;
+        border: 1px solid #569cd6;
+        border-top: none;
+    }
+    QLabel {
+        color: #569cd6;
+        font-size: 14px;
+    }
+    QLabel#errorLabel {
+        color: #ff5f56;
+    }
+    QLineEdit, QTextEdit, QPlainTextEdit, QComboBox {
+        background-color: #252525;
+        color: #fff;
+        border: 1px solid #569cd6;
+        border-radius: 4px;
+        padding: 8px;
+        selection-background-color: #569cd6;
+    }
+    QComboBox::drop-down {
+        subcontrol-origin: padding;
+        subcontrol-position: top right;
+        width: 24px;
+        border-left-width: 1px;
+        border-left-color: #569cd6;
+        border-left-style: solid;
+        border-top-right-radius: 4px;
+        border-bottom-right-radius: 4px;
+    }
+    QComboBox::down-arrow {
+        image: url(none);
+        width: 16px;
+        height: 16px;
+    }
+    QComboBox QAbstractItemView {
+        background-color: #252525;
+        color: #fff;
+        border: 1px solid #569cd6;
+        selection-background-color: #569cd6;
+        selection-color: #fff;
+    }
+    QPushButton {
+        background-color: #252525;
+        color: #569cd6;
+        border: 1px solid #569cd6;
+        border-radius: 4px;
+        padding: 8px 16px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #569cd6;
+        color: #fff;
+    }
+    QPushButton:pressed {
+        background-color: #005f8c;
+    }
+    QScrollArea {
+        border: none;
+    }
+    QCheckBox {
+        color: #569cd6;
+    }
+    #watchInterval {
+        background-color: #252525;
+        color: #fff;
+        border: 1px solid #569cd6;
+        border-radius: 4px;
+        padding: 4px;
+    }
+    QTextEdit, QPlainTextEdit {
+        background-color: #252525;
+        color: #569cd6;
+        border: 1px solid #569cd6;
+        border-radius: 4px;
+        padding: 10px;
+    }
+
+    /* Custom title bar */
+    #titleBar {
+        background-color: #1a1a1a;
+        border-top-left-radius: 8px;
+        border-top-right-radius: 8px;
+        border: 1px solid #569cd6;
+        border-bottom: none;
+    }
+    #titleLabel {
+        color: #569cd6;
+        font-weight: bold;
+        border: none;
+        background-color: transparent;
+    }
+    #minimizeButton, #closeButton {
+        background-color: #252525;
+        border-radius: 4px;
+        padding: 0;
+    }
+    #minimizeButton {
+        color: #569cd6;
+        border: 1px solid #569cd6;
+    }
+    #minimizeButton:hover {
+        background-color: #569cd6;
+        color: #fff;
+    }
+    #closeButton {
+        color: #ff5f56;
+        border: 1px solid #ff5f56;
+    }
+    #closeButton:hover {
+        background-color: #ff5f56;
+        color: #fff;
+    }
+    #appTitle {
+        color: #569cd6;
+        font-size: 24px;
+        font-weight: bold;
+        border: none;
+    }
+
+    /* Saved commands combo */
+    #commandCombo {
+        background-color: #252525;
+        color: #fff;
+        border: 1px solid #569cd6;
+        border-radius: 4px;
+        padding: 5px;
+    }
+    #commandCombo::down-arrow {
+        image: url(icons/arrow-down.png);
+    }
+
+    /* Dialogs */
+    AddCommandDialog, SelectCommandsDialog, StatsDialog, OutputHistoryDialog, TemplateDialog, ImportHistoryDialog,
+    ScheduleDialog {
+        background-color: #252525;
+        border: 1px solid #569cd6;
+        border-radius: 5px;
+    }
+    AddCommandDialog QLineEdit, AddCommandDialog QTextEdit, AddCommandDialog QComboBox,
+    AddCommandDialog QSpinBox, SelectCommandsDialog QSpinBox,
+    TemplateDialog QLineEdit, TemplateDialog QPlainTextEdit, TemplateDialog QSpinBox, ImportHistoryDialog QSpinBox {
+        background-color: #333;
+        color: #fff;
+        border: 1px solid #569cd6;
+        border-radius: 3px;
+        padding: 5px;
+        selection-background-color: #569cd6;
+    }
+    SelectCommandsDialog QListView {
+        background-color: #333;
+        color: #fff;
+        border: 1px solid #569cd6;
+        border-radius: 3px;
+        padding: 5px;
+    }
+    SelectCommandsDialog QListView::item {
+        padding: 5px;
+    }
+    SelectCommandsDialog QListView::item:hover {
+        background-color: #444;
+    }
+    SelectCommandsDialog QListView::item:selected {
+        background-color: #569cd6;
+        color: #fff;
+    }
+    SelectCommandsDialog QDialogButtonBox {
+        button-layout: 1;
+    }
+    StatsDialog QTableWidget, OutputHistoryDialog QTableWidget, MatrixWindow QTableWidget,
+    WorkflowWindow QTableWidget, ImportHistoryDialog QTableWidget, ScheduleDialog QTableWidget {
+        background-color: #333;
+        alternate-background-color: #2b2b2b;
+        color: #fff;
+        gridline-color: #444;
+        border: 1px solid #569cd6;
+        selection-background-color: #569cd6;
+    }
+    StatsDialog QHeaderView::section, OutputHistoryDialog QHeaderView::section,
+    MatrixWindow QHeaderView::section, WorkflowWindow QHeaderView::section, ImportHistoryDialog QHeaderView::section,
+    ScheduleDialog QHeaderView::section {
+        background-color: #252525;
+        color: #569cd6;
+        border: none;
+        border-bottom: 1px solid #569cd6;
+        padding: 4px;
+    }
+    AddCommandDialog QPushButton, SelectCommandsDialog QPushButton, StatsDialog QPushButton,
+    OutputHistoryDialog QPushButton, TemplateDialog QPushButton, ImportHistoryDialog QPushButton,
+    ScheduleDialog QPushButton {
+        background-color: #333;
+        color: #569cd6;
+        border: 1px solid #569cd6;
+        border-radius: 3px;
+        padding: 5px 10px;
+        min-width: 80px;
+        font-weight: normal;
+    }
+    AddCommandDialog QPushButton:hover, SelectCommandsDialog QPushButton:hover, StatsDialog QPushButton:hover,
+    OutputHistoryDialog QPushButton:hover, TemplateDialog QPushButton:hover, ImportHistoryDialog QPushButton:hover,
+    ScheduleDialog QPushButton:hover {
+        background-color: #569cd6;
+        color: #fff;
+    }
+    AddCommandDialog QPushButton:pressed, SelectCommandsDialog QPushButton:pressed, StatsDialog QPushButton:pressed,
+    OutputHistoryDialog QPushButton:pressed, TemplateDialog QPushButton:pressed,
+    ImportHistoryDialog QPushButton:pressed, ScheduleDialog QPushButton:pressed {
+        background-color: #005f8c;
+    }
+
+    OutputHistoryDialog QPlainTextEdit {
+        background-color: #333;
+        color: #fff;
+        padding: 5px;
+    }
+
+    /* Parallel run window */
+    JobsWindow, MatrixWindow, WorkflowWindow {
+        background-color: #1e1e1e;
+        border: 1px solid #569cd6;
+    }
+    JobsWindow QTabWidget::pane {
+        border: 1px solid #569cd6;
+        border-radius: 3px;
+    }
+    JobsWindow QTabBar::tab {
+        background-color: #252525;
+        color: #569cd6;
+        border: 1px solid #569cd6;
+        padding: 5px 10px;
+    }
+    JobsWindow QTabBar::tab:selected {
+        background-color: #569cd6;
+        color: #fff;
+    }
+    JobsWindow QPlainTextEdit, MatrixWindow QPlainTextEdit, WorkflowWindow QPlainTextEdit {
+        background-color: #252525;
+        color: #fff;
+        border: none;
+    }
+"""
+
+class StartupTimer:
+    # Records how long each startup phase took, measured from process start
+    def __init__(self, started_at=None, enabled=TRACE_STARTUP):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.enabled = enabled
+        self.phases = []
+
+    def mark(self, phase):
+        elapsed = time.perf_counter() - self.started_at
+        self.phases.append((phase, elapsed))
+        if self.enabled:
+            print(f"[startup] {elapsed * 1000:8.1f} ms  {phase}", file=sys.stderr)
+
+class LibraryLoader(QObject):
+    # Opens the store and builds the search index off the GUI thread
+    loaded = pyqtSignal(object, object, object)  # store, commands, index
+    failed = pyqtSignal(str)
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            store = CommandStore(COMMAND_DB, legacy_path=COMMAND_FILE)
+            commands = store.load()
+            index = CommandIndex(commands, FrecencyRanking(self.history.frecency()))
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(store, commands, index)
+
+class CommandWorker(QObject):
+    # Bridges a CommandRun reader thread to the GUI thread through queued signals.
+    # ANSI colors are parsed on the reader thread, so the GUI thread only inserts
+    # ready-made (text, style) runs. options are passed on to CommandRun.
+    output = pyqtSignal(object)  # [(text, style)]
+    finished = pyqtSignal(int)
+    started = pyqtSignal()
+
+    def __init__(self, command, env, parent=None, sessions=None, capture_limit=None, archive=None, **options):
+        super().__init__(parent)
+        self.parser = AnsiParser()
+        self.run = CommandRun(
+            command, env,
+            on_output=self.parse_output, on_finished=self.finished.emit, on_started=self.started.emit,
+            sessions=sessions, capture_limit=capture_limit, archive=archive, **options
+        )
+
+    def parse_output(self, text):
+        runs = self.parser.feed(text)
+        if runs:
+            self.output.emit(runs)
+
+    def start(self):
+        self.run.start()
+
+    def stop(self):
+        self.run.stop()
+
+    def end_reason(self):
+        # Why a finished run ended early, or None
+        if self.run.timed_out:
+            return f"Timed out after {self.run.timeout}s"
+        if self.run.stopped:
+            return "Stopped"
+        return None
+
+    def is_running(self):
+        return self.run.is_running()
+
+class WorkflowWorker(QObject):
+    # Runs a WorkflowRun on its own thread and reports to the GUI thread; like
+    # CommandWorker, output is emitted as (text, style) runs, one parser per step
+    output = pyqtSignal(object)
+    state_changed = pyqtSignal(str)  # Step id
+    finished = pyqtSignal(int)
+
+    def __init__(self, steps, commands, parent=None, history=None, archive=None):
+        super().__init__(parent)
+        self.parsers = {step.id: AnsiParser() for step in steps}
+        self.run = WorkflowRun(steps, commands, self.step_output, self.step_state, history, archive)
+        self._thread = None
+
+    def step_output(self, step, text):
+        runs = self.parsers[step.id].feed(step.prefix_lines(text))
+        if runs:
+            self.output.emit(runs)
+
+    def step_state(self, step):
+        self.state_changed.emit(step.id)
+
+    def start(self):
+        self._thread = threading.Thread(target=lambda: self.finished.emit(self.run.run()), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.run.stop()
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+class WatchWorker(QObject):
+    # Bridges a CommandWatch to the GUI thread. When a run's output changed, its
+    # text is written to a fresh transcript on the run's thread for the find bar.
+    updated = pyqtSignal(object, object)  # WatchUpdate, transcript path or None
+
+    def __init__(self, data, interval, parent=None, sessions=None):
+        super().__init__(parent)
+        self.watch = CommandWatch(data, self.write_update, interval, sessions)
+
+    def write_update(self, update):
+        path = None
+        if update.changes:
+            try:
+                fd, path = tempfile.mkstemp(prefix="iknowmycmdies-", suffix=".log")
+                with os.fdopen(fd, "w", encoding="utf-8", errors="replace") as f:
+                    f.writelines(line + "\n" for line in update.lines)
+            except OSError as e:
+                print(f"Error while writing the watch transcript: {e}")
+                path = None
+            if path and not self.watch.is_active():
+                # Stopped meanwhile, maybe because the window is closing; the view
+                # that would delete this transcript may never receive it
+                os.remove(path)
+                return
+        self.updated.emit(update, path)
+
+    def start(self):
+        self.watch.start()
+
+    def stop(self):
+        self.watch.stop()
+
+class OutputView(QPlainTextEdit):
+    # Plain-text result area that appends streamed output in timed batches. Once it
+    # holds trim_margin lines more than max_lines, the oldest are removed in one
+    # edit and written to a transcript file; searches scan the transcript and
+    # then the output still in the view.
+    # Output arrives as (text, style) runs from AnsiParser; each style maps to a
+    # cached QTextCharFormat, so colors cost one lookup per run. In watch mode the
+    # output is instead edited in place, one block per line, from line diffs.
+    spilled = pyqtSignal(str)
+    appended = pyqtSignal(str)  # The output text added
+    cleared = pyqtSignal()
+
+    def __init__(self, max_lines=OUTPUT_MAX_LINES, parent=None, trim_margin=OUTPUT_TRIM_MARGIN):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.TypeWriter)
+        self.setFont(font)
+
+        self.max_lines = max_lines
+        self.trim_margin = trim_margin
+        self.transcript_path = None
+        self.transcript_size = 0  # Bytes written to the transcript
+        self._transcript = None
+        self._full_outputs = []  # Copies of the full output opened with open_spill
+        self.output_start_block = None  # Block holding the first output line, before any trimming
+        self.output_start_offset = 0  # Where the output starts in that block
+        self.output_lines = 0  # Line breaks in the output
+        self.spilled_lines = 0  # Output lines in the transcript, one more once all of it is
+        self.trimmed_blocks = 0
+        self.complete = False
+        self.watching = False
+        self._pending = []
+        self._parser = AnsiParser()  # For text appended from the GUI thread
+
+        self.output_format = QTextCharFormat()
+        self.output_format.setForeground(QColor("#fff"))
+        self._formats = {None: self.output_format}
+        self.changed_format = QTextCharFormat()
+        self.changed_format.setBackground(QColor("#264f78"))
+        self.changed_format.setProperty(QTextFormat.FullWidthSelection, True)
+        self.watch_lines = 0
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(OUTPUT_FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def clear_output(self):
+        self._pending.clear()
+        self._parser.reset()
+        self._flush_timer.stop()
+        self.discard_transcript()
+        self.output_start_block = None
+        self.output_start_offset = 0
+        self.output_lines = 0
+        self.spilled_lines = 0
+        self.trimmed_blocks = 0
+        self.complete = False
+        self.watching = False
+        self.watch_lines = 0
+        self.setExtraSelections([])
+        self.clear()
+        self.cleared.emit()
+
+    def show_html(self, html):
+        self.clear_output()
+        self.appendHtml(html)
+
+    def append_html(self, html):
+        self.flush()
+        self.appendHtml(html)
+        self._trim()
+
+    def append_output(self, text):
+        self.append_runs(self._parser.feed(text))
+
+    def append_runs(self, runs):
+        self._pending.extend(runs)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def text_format(self, style):
+        text_format = self._formats.get(style)
+        if text_format is None:
+            foreground, background, bold, italic, underline = style
+            text_format = QTextCharFormat(self.output_format)
+            if foreground:
+                text_format.setForeground(QColor(foreground))
+            if background:
+                text_format.setBackground(QColor(background))
+            if bold:
+                text_format.setFontWeight(QFont.Bold)
+            text_format.setFontItalic(italic)
+            text_format.setFontUnderline(underline)
+            self._formats[style] = text_format
+        return text_format
+
+    def finish_output(self):
+        # No more output will be appended to this transcript
+        self.flush()
+        self.complete = True
+        self.appended.emit("")
+
+    def flush(self):
+        if not self._pending:
+            return
+        runs = self._pending
+        self._pending = []
+        text = "".join(run_text for run_text, _ in runs)
+
+        if self.output_start_block is None:
+            last = self.document().lastBlock()
+            self.output_start_block = last.blockNumber() + self.trimmed_blocks
+            self.output_start_offset = len(last.text())
+        self.output_lines += text.count("\n")
+
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        # Neighbouring runs of the same style are inserted together
+        start = 0
+        for index in range(1, len(runs) + 1):
+            if index == len(runs) or runs[index][1] != runs[start][1]:
+                chunk = "".join(run_text for run_text, _ in runs[start:index])
+                cursor.insertText(chunk, self.text_format(runs[start][1]))
+                start = index
+        cursor.endEditBlock()
+        self._trim()
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+        self.appended.emit(text)
+
+    def _trim(self):
+        # Trimming every flush would shift the whole document each time
+        excess = self.document().blockCount() - self.max_lines
+        if excess <= self.trim_margin:
+            return
+        if self.output_start_block is not None and self.spilled_lines <= self.output_lines:
+            last_line = self.trimmed_blocks + excess - self.output_start_block
+            if last_line > self.output_lines:
+                # Lines added after the output, its partial last line goes too
+                self._spill(self.output_text(self.spilled_lines, self.output_lines))
+                self.spilled_lines = self.output_lines + 1
+            elif last_line > self.spilled_lines:
+                self._spill(self.output_text(self.spilled_lines, last_line) + "\n")
+                self.spilled_lines = last_line
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor, excess)
+        cursor.removeSelectedText()
+        cursor.endEditBlock()
+        self.trimmed_blocks += excess
+
+    def _spill(self, text):
+        if self._transcript is None:
+            if self.transcript_path or not self._open_transcript():
+                return
+            self.spilled.emit(self.transcript_path)
+        try:
+            data = text.encode("utf-8", "replace")
+            self._transcript.write(data)
+            self._transcript.flush()
+            self.transcript_size += len(data)
+        except OSError as e:
+            print(f"Error while writing the output transcript: {e}")
+            self._close_transcript()
+
+    def output_text(self, first, last):
+        # Output lines first to last - 1 and the partial line after them when last
+        # is output_lines, joined by line breaks; the lines must still be in the view
+        block = self.document().findBlockByNumber(self.output_block(first))
+        lines = []
+        for line in range(first, last + 1):
+            if line == last and last < self.output_lines:
+                break
+            text = block.text()
+            lines.append(text[self.output_start_offset:] if line == 0 else text)
+            block = block.next()
+        return "\n".join(lines)
+
+    def search_source(self):
+        # What a search of the whole output reads: the transcript's path and the
+        # bytes of it to read (all when None), then the output still in the view
+        if self.watching:
+            return self.transcript_path, None, ""
+        if self.output_start_block is None or self.spilled_lines > self.output_lines:
+            return self.transcript_path, self.transcript_size, ""
+        return self.transcript_path, self.transcript_size, self.output_text(self.spilled_lines, self.output_lines)
+
+    def output_block(self, line):
+        # Block number of an output line, or -1 when it was trimmed from the view
+        if self.output_start_block is None:
+            return -1
+        block = self.output_start_block + line - self.trimmed_blocks
+        return block if 0 <= block < self.document().blockCount() else -1
+
+    def begin_watch(self):
+        # Output from here on is kept as one block per line and updated by apply_changes
+        self.flush()
+        self.appendPlainText("")
+        self.output_start_block = self.document().blockCount() - 1
+        self.watching = True
+        self.watch_lines = 0
+
+    def apply_changes(self, update):
+        # Rewrites only the blocks of changed lines, last change first so the line
+        # numbers of the earlier ones stay valid, then highlights the new lines.
+        # A watch output with no lines still has its one empty block.
+        document = self.document()
+        start = self.output_start_block
+        count = self.watch_lines
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        for tag, i1, i2, j1, j2 in reversed(update.changes):
+            text = "\n".join(update.lines[j1:j2])
+            if i2 > i1:
+                first = document.findBlockByNumber(start + i1)
+                last = document.findBlockByNumber(start + i2 - 1)
+                begin, end = first.position(), last.position() + last.length() - 1
+                if j1 == j2:
+                    # Removed lines take one line break with them
+                    if i2 < count:
+                        end += 1
+                    elif i1 > 0:
+                        begin -= 1
+                cursor.setPosition(begin)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                cursor.removeSelectedText()
+            elif count == 0:
+                cursor.setPosition(document.findBlockByNumber(start).position())
+            elif i1 < count:
+                cursor.setPosition(document.findBlockByNumber(start + i1).position())
+                text += "\n"
+            else:
+                last = document.findBlockByNumber(start + count - 1)
+                cursor.setPosition(last.position() + last.length() - 1)
+                text = "\n" + text
+            if j2 > j1:
+                cursor.insertText(text, self.output_format)
+            count += (j2 - j1) - (i2 - i1)
+        cursor.endEditBlock()
+        self.watch_lines = count
+
+        selections = []
+        for tag, i1, i2, j1, j2 in update.changes:
+            for line in range(j1, j2):
+                selection = QTextEdit.ExtraSelection()
+                selection.cursor = QTextCursor(document.findBlockByNumber(start + line))
+                selection.format = self.changed_format
+                selections.append(selection)
+        self.setExtraSelections(selections)
+
+    def replace_transcript(self, path):
+        # Searches move to the transcript of the latest watch run
+        self.discard_transcript()
+        self.transcript_path = path
+        self.complete = True
+        self.cleared.emit()
+
+    def _open_transcript(self):
+        try:
+            fd, self.transcript_path = tempfile.mkstemp(prefix="iknowmycmdies-", suffix=".log")
+            self._transcript = os.fdopen(fd, "wb")
+            return True
+        except OSError as e:
+            print(f"Error while creating the output transcript: {e}")
+            return False
+
+    def _close_transcript(self):
+        if self._transcript is not None:
+            self._transcript.close()
+            self._transcript = None
+
+    def discard_transcript(self):
+        # Also called when the window closes, so no transcript outlives the session
+        self._close_transcript()
+        for path in [self.transcript_path] + self._full_outputs:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self.transcript_path = None
+        self.transcript_size = 0
+        self._full_outputs = []
+
+    def open_spill(self):
+        # Opens the trimmed lines and the ones still shown, copied into one file
+        self.flush()
+        path, size, text = self.search_source()
+        if not path:
+            return
+        try:
+            fd, full_path = tempfile.mkstemp(prefix="iknowmycmdies-", suffix=".log")
+            self._full_outputs.append(full_path)
+            with os.fdopen(fd, "wb") as f, open(path, "rb") as transcript:
+                shutil.copyfileobj(transcript, f)
+                f.write(text.encode("utf-8", "replace"))
+        except OSError as e:
+            print(f"Error while writing the full output: {e}")
+            return
+        QDesktopServices.openUrl(QUrl.fromLocalFile(full_path))
+
+class FindBar(QWidget):
+    # Searches an OutputView's transcript on a background thread, following output
+    # that is still streaming in. Each new search cancels the previous one.
+    # Matching lines can be shown on their own in filter_view.
+    progress = pyqtSignal(int, object, object, int, bool)  # generation, lines, texts, count, finished
+
+    def __init__(self, view, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.filter_view = OutputView()
+        self.search = None
+        self.generation = 0
+        self.pattern = None
+        self.match_lines = []
+        self.current = -1
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Find in output")
+        self.regex_check = QCheckBox("Regex")
+        self.case_check = QCheckBox("Match case")
+        self.filter_check = QCheckBox("Only matching lines")
+        self.count_label = QLabel()
+        self.next_btn = QPushButton("Next")
+        close_btn = QPushButton("x")
+        close_btn.setFixedWidth(32)
+        layout.addWidget(self.find_input, stretch=1)
+        layout.addWidget(self.regex_check)
+        layout.addWidget(self.case_check)
+        layout.addWidget(self.filter_check)
+        layout.addWidget(self.count_label)
+        layout.addWidget(self.next_btn)
+        layout.addWidget(close_btn)
+        self.setLayout(layout)
+
+        self.restart_timer = QTimer(self)
+        self.restart_timer.setSingleShot(True)
+        self.restart_timer.setInterval(FIND_DELAY_MS)
+        self.restart_timer.timeout.connect(self.restart)
+
+        self.find_input.textChanged.connect(self.restart_timer.start)
+        self.find_input.returnPressed.connect(self.next_match)
+        self.regex_check.toggled.connect(self.restart)
+        self.case_check.toggled.connect(self.restart)
+        self.next_btn.clicked.connect(self.next_match)
+        close_btn.clicked.connect(self.close_bar)
+        self.progress.connect(self.add_matches)
+        self.view.appended.connect(self.output_appended)
+        self.view.cleared.connect(self.restart)
+        QShortcut(QKeySequence(Qt.Key_Escape), self.find_input, self.close_bar)
+
+    def open_bar(self):
+        self.setVisible(True)
+        self.find_input.setFocus()
+        self.find_input.selectAll()
+
+    def close_bar(self):
+        self.find_input.clear()
+        self.filter_check.setChecked(False)
+        self.setVisible(False)
+
+    def restart(self):
+        self.restart_timer.stop()
+        if self.search is not None:
+            self.search.cancel()
+            self.search = None
+        self.generation += 1
+        self.pattern = None
+        self.match_lines = []
+        self.current = -1
+        self.filter_view.clear_output()
+        self.count_label.setText("")
+
+        text = self.find_input.text()
+        if not text:
+            return
+        try:
+            self.pattern = compile_pattern(text, self.regex_check.isChecked(), self.case_check.isChecked())
+        except re.error as e:
+            self.count_label.setText(f"Invalid pattern: {e}")
+            return
+        self.count_label.setText("Searching…")
+        path, size, text = self.view.search_source()
+        if not path and not text:
+            # Nothing streamed yet; the search starts with the first output
+            if self.view.complete:
+                self.count_label.setText("No output to search")
+            return
+        generation = self.generation
+        self.search = OutputSearch(
+            path, self.pattern,
+            lambda lines, texts, count, finished: self.progress.emit(generation, lines, texts, count, finished),
+            size
+        )
+        self.search.feed(text)
+        self.search.start()
+        if self.view.complete:
+            self.search.notify(complete=True)
+
+    def output_appended(self, text):
+        if self.search is not None:
+            self.search.feed(text)
+            self.search.notify(self.view.complete)
+        elif self.pattern is not None:
+            self.restart()
+
+    def add_matches(self, generation, lines, texts, count, finished):
+        if generation != self.generation:
+            return
+        self.match_lines.extend(lines)
+        if texts:
+            self.filter_view.append_output("\n".join(texts) + "\n")
+        more = "" if finished else "+"
+        self.count_label.setText(f"{count}{more} matches on {len(self.match_lines)} lines")
+
+    def next_match(self):
+        if not self.match_lines:
+            return
+        self.current = (self.current + 1) % len(self.match_lines)
+        line = self.match_lines[self.current]
+        # In the filtered view, the n-th matching line is the n-th output line
+        view = self.filter_view if self.filter_check.isChecked() else self.view
+        view.flush()
+        block_number = view.output_block(self.current if view is self.filter_view else line)
+        status = f"{self.current + 1}/{len(self.match_lines)}, line {line + 1}"
+        if block_number < 0:
+            self.count_label.setText(f"{status} (only in the full output)")
+            return
+        block = view.document().findBlockByNumber(block_number)
+        match = self.pattern.search(block.text())
+        cursor = QTextCursor(block)
+        if match is not None:
+            cursor.setPosition(block.position() + match.start())
+            cursor.setPosition(block.position() + match.end(), QTextCursor.KeepAnchor)
+        view.setTextCursor(cursor)
+        view.ensureCursorVisible()
+        self.count_label.setText(status)
+
+class CommandListModel(QAbstractListModel):
+    # Command names shared by the combo box and the selection dialogs, most
+    # frecent first and the never-run ones alphabetically after them. The rows
+    # are the ranking's order, which the search index shares; adds, removals
+    # and moves touch one row. Views pull rows lazily through fetchMore.
+    def __init__(self, parent=None, ranking=None):
+        super().__init__(parent)
+        self.ranking = ranking if ranking is not None else FrecencyRanking()
+        self._loaded = min(len(self.ranking), MODEL_FETCH_BATCH)
+
+    def reset(self, ranking):
+        self.beginResetModel()
+        self.ranking = ranking
+        self._loaded = min(len(ranking), MODEL_FETCH_BATCH)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole) and index.row() < self._loaded:
+            return self.ranking.name_at(index.row())
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self.ranking)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(MODEL_FETCH_BATCH, len(self.ranking) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def name_at(self, row):
+        return self.ranking.name_at(row)
+
+    # Call insert and remove before the search index's add and remove, which
+    # change the shared order without telling the views
+    def insert(self, name):
+        key = self.ranking.sort_key(name)
+        if key in self.ranking.order:
+            return
+        row = self.ranking.order.bisect_left(key)
+        # Rows past the loaded window are not known to views yet
+        visible = row < self._loaded or self._loaded == len(self.ranking)
+        if visible:
+            self.beginInsertRows(QModelIndex(), row, row)
+        self.ranking.add(name)
+        if visible:
+            self._loaded += 1
+            self.endInsertRows()
+
+    def remove(self, name):
+        row = self.ranking.row(name)
+        if row is None:
+            return
+        visible = row < self._loaded
+        if visible:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        self.ranking.discard(name)
+        if visible:
+            self._loaded -= 1
+            self.endRemoveRows()
+
+    def bump(self, name, when=None):
+        # Counts a use of name and moves its row up to its new rank. A move keeps
+        # the combo box selection, where a remove and insert would change it.
+        row = self.ranking.row(name)
+        score = self.ranking.bumped(name, when)
+        if row is None:
+            self.ranking.set(name, score)
+            return
+        # Never below row: the score only grows
+        new_row = self.ranking.order.bisect_left(self.ranking.sort_key(name, score))
+        if row < self._loaded:
+            moved = new_row != row
+            if moved:
+                self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), new_row)
+        else:
+            # Rows past the loaded window are not known to views yet
+            moved = False
+            if new_row < self._loaded:
+                self.beginInsertRows(QModelIndex(), new_row, new_row)
+        self.ranking.set(name, score)
+        if moved:
+            self.endMoveRows()
+        elif row >= self._loaded and new_row < self._loaded:
+            self._loaded += 1
+            self.endInsertRows()
+
+class TitleBar(QWidget):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.setFixedHeight(100)
+        self.layout = QHBoxLayout()
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.layout.setSpacing(0)
+        
+        # Title with icon
+        self.title = QLabel("     IknowMyCMDies")
+        self.title.setAlignment(Qt.AlignCenter)
+        self.title.setStyleSheet("color: #569cd6; font-weight: bold;")
+        
+        # Control buttons
+        self.btn_layout = QHBoxLayout()
+        self.btn_layout.setSpacing(0)
+        self.btn_layout.setContentsMargins(0, 0, 5, 0)
+        
+        self.min_btn = QPushButton()
+        self.min_btn.setIcon(QIcon(MINIMIZE_ICON_PATH))
+        self.min_btn.setFixedSize(40, 30)
+        self.min_btn.clicked.connect(self.parent.showMinimized)
+        
+    
+        self.close_btn = QPushButton()
+        self.close_btn.setIcon(QIcon(CLOSE_ICON_PATH))
+        self.close_btn.setFixedSize(40, 30)
+        self.close_btn.clicked.connect(self.parent.close)
+        
+        self.btn_layout.addWidget(self.min_btn)
+        self.btn_layout.addWidget(self.close_btn)
+        
+        self.layout.addWidget(self.title, stretch=1)
+        self.layout.addLayout(self.btn_layout)
+        
+        self.setLayout(self.layout)
+        self.setStyleSheet("""
+            QWidget {
+                background-color: #1a1a1a;
+                border-top-left-radius: 8px;
+                border-top-right-radius: 8px;
+                border: 1px solid #569cd6;
+                border-bottom: none;
+            }
+            QPushButton {
+                background: transparent;
+                border: none;
+                padding: 0;
+            }
+            QPushButton:hover {
+                background-color: #569cd6;
+                border-radius: 4px;
+            }
+        """)
+
+    def toggle_maximize(self):
+        if self.parent.isMaximized():
+            self.parent.showNormal()
+        else:
+            self.parent.showMaximized()
+
+class HistoryScanner(QObject):
+    # Counts shell history commands off the GUI thread
+    scanned = pyqtSignal(object)  # HistoryCounter
+    failed = pyqtSignal(str)
+
+    def start(self, files):
+        threading.Thread(target=self.run, args=(files,), daemon=True).start()
+
+    def run(self, files):
+        counter = HistoryCounter()
+        try:
+            for path, env in files:
+                counter.add_file(path, env)
+        except OSError as e:
+            self.failed.emit(str(e))
+            return
+        self.scanned.emit(counter)
+
+class ImportHistoryDialog(QDialog):
+    # Proposes the most used commands of the shell histories for saving, with
+    # automatic names that can be edited; only checked rows are imported
+    COLUMNS = ["Name", "Uses", "Last used", "Env", "Command"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Import Shell History")
+        self.resize(900, 600)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.commands = {}
+        self.counter = None
+        self.proposals = []
+        self.scanner = HistoryScanner(self)
+        self.scanner.scanned.connect(self.scanned)
+        self.scanner.failed.connect(self.scan_failed)
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+
+        self.status_label = QLabel()
+        self.status_label.setTextFormat(Qt.PlainText)
+        self.status_label.setWordWrap(True)
+        files_btn = QPushButton("Choose files…")
+        files_btn.clicked.connect(self.choose_files)
+        self.limit_spin = QSpinBox()
+        self.limit_spin.setRange(1, 1000)
+        self.limit_spin.setValue(DEFAULT_PROPOSALS)
+        self.limit_spin.valueChanged.connect(self.show_proposals)
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.status_label, stretch=1)
+        top_layout.addWidget(QLabel("Proposals:"))
+        top_layout.addWidget(self.limit_spin)
+        top_layout.addWidget(files_btn)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.DoubleClicked | QTableWidget.EditKeyPressed)
+        self.table.setAlternatingRowColors(True)
+
+        self.error_label = QLabel()
+        self.error_label.setObjectName("errorLabel")
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.button(QDialogButtonBox.Ok).setText("Import checked")
+        self.buttons.accepted.connect(self.validate)
+        self.buttons.rejected.connect(self.reject)
+
+        self.layout.addLayout(top_layout)
+        self.layout.addWidget(self.table, stretch=1)
+        self.layout.addWidget(self.error_label)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+
+    def scan(self, commands, files=None):
+        self.commands = commands
+        files = default_history_files() if files is None else files
+        self.table.setRowCount(0)
+        self.error_label.clear()
+        if not files:
+            self.status_label.setText("No Bash or PSReadLine history found; choose the history files to read.")
+            return
+        self.status_label.setText("Reading " + ", ".join(path for path, _ in files) + "…")
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(False)
+        self.scanner.start(files)
+
+    def choose_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Shell history files", os.path.expanduser("~"))
+        if paths:
+            self.scan(self.commands, [(path, guess_env(path)) for path in paths])
+
+    def scanned(self, counter):
+        self.counter = counter
+        self.status_label.setText(f"{counter.lines} history entries, {len(counter.entries)} distinct commands counted")
+        self.show_proposals()
+
+    def scan_failed(self, error):
+        print(f"Error while reading shell history: {error}")
+        self.status_label.setText(error)
+
+    def show_proposals(self):
+        if self.counter is None:
+            return
+        self.proposals = propose(self.counter, self.commands, self.limit_spin.value())
+        self.table.setRowCount(len(self.proposals))
+        for row, (name, data, count, ago) in enumerate(self.proposals):
+            name_item = QTableWidgetItem(name)
+            name_item.setFlags(name_item.flags() | Qt.ItemIsUserCheckable)
+            name_item.setCheckState(Qt.Checked)
+            self.table.setItem(row, 0, name_item)
+            values = [count, "just now" if ago == 0 else f"{ago} commands ago", data["env"], data["command"]]
+            for column, value in enumerate(values, 1):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                self.table.setItem(row, column, item)
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(bool(self.proposals))
+
+    def get_entries(self):
+        entries = {}
+        for row, (_, data, _, _) in enumerate(self.proposals):
+            item = self.table.item(row, 0)
+            if item.checkState() == Qt.Checked:
+                entries[item.text().strip()] = data
+        return entries
+
+    def validate(self):
+        # Edited names must stay unique and must not replace saved commands
+        names = [self.table.item(row, 0).text().strip() for row in range(self.table.rowCount())
+                 if self.table.item(row, 0).checkState() == Qt.Checked]
+        for name in names:
+            if not name:
+                self.error_label.setText("Every checked command needs a name.")
+                return
+            if name in self.commands or names.count(name) > 1:
+                self.error_label.setText(f"The name '{name}' is already used.")
+                return
+        self.accept()
+
+class AddCommandDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Add a Command")
+        self.setFixedSize(500, 640 if LIMITS_SUPPORTED else 570)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+        
+        # Command name
+        name_label = QLabel("Name:")
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("Ex: disable-bluetooth")
+        
+        # Shell command
+        cmd_label = QLabel("Command:")
+        self.cmd_input = QTextEdit()
+        self.cmd_input.setPlaceholderText("Ex: Get-PnpDevice | Where-Object { $_.FriendlyName -like '*Bluetooth*' } | Disable-PnpDevice -Confirm:$false")
+        self.cmd_input.setMaximumHeight(100)
+
+        # Execution environment
+        env_label = QLabel("Execute with:")
+        self.env_combo = QComboBox()
+        self.env_combo.addItems(["CMD", "PowerShell", "Bash", WORKFLOW_ENV])
+        self.env_combo.setItemData(
+            3, "One step per line: step = saved-command [after a, b] [on-failure c] [< step-piped-in]", Qt.ToolTipRole
+        )
+
+        # Per-command options, 0 meaning off
+        self.options_form = QFormLayout()
+        self.option_spins = {}
+        self.add_option("cache_ttl", "Cache results for:", 7 * 24 * 3600, " s", "Never",
+                        "Reuse the output of read-only commands for this long")
+        self.add_option("timeout", "Stop after:", 7 * 24 * 3600, " s", "Never",
+                        "Kill the command and everything it started after this long")
+        if LIMITS_SUPPORTED:
+            self.add_option("cpu_limit", "CPU time limit:", 7 * 24 * 3600, " s", "None")
+            self.add_option("memory_limit", "Memory limit:", 1024 * 1024, " MB", "None",
+                            "Address space limit; the command runs in a fresh process")
+            self.add_option("file_limit", "Open files limit:", 1024 * 1024, "", "None")
+
+        # Output decoding, for tools that do not write in the locale's encoding
+        self.encoding_combo = QComboBox()
+        self.encoding_combo.setEditable(True)
+        self.encoding_combo.addItems(["Default", "utf-8", "cp437", "cp850", "cp1252", "latin-1", "utf-16-le"])
+        self.errors_combo = QComboBox()
+        self.errors_combo.addItems(DECODE_ERRORS)
+        self.errors_combo.setToolTip("What to show for bytes that are not valid in the encoding")
+        self.options_form.addRow("Output encoding:", self.encoding_combo)
+        self.options_form.addRow("Invalid bytes:", self.errors_combo)
+
+        # Starting the program without its shell
+        self.direct_combo = QComboBox()
+        self.direct_combo.addItems(DIRECT_EXEC_MODES)
+        self.direct_combo.setToolTip(
+            "auto: a single program with plain arguments starts without the shell\n"
+            "always: split into arguments even when shell characters are present, which are passed on as is\n"
+            "never: always go through the shell"
+        )
+        self.options_form.addRow("Skip the shell:", self.direct_combo)
+
+        # Recurring runs by the built-in scheduler
+        self.schedule_input = QLineEdit()
+        self.schedule_input.setPlaceholderText("Ex: every 10m, */15 * * * *, @daily (empty: not scheduled)")
+        self.options_form.addRow("Schedule:", self.schedule_input)
+
+        # Buttons
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+
+        self.layout.addWidget(name_label)
+        self.layout.addWidget(self.name_input)
+        self.layout.addWidget(cmd_label)
+        self.layout.addWidget(self.cmd_input)
+        self.layout.addWidget(env_label)
+        self.layout.addWidget(self.env_combo)
+        self.layout.addLayout(self.options_form)
+        self.layout.addWidget(self.buttons)
+
+        self.setLayout(self.layout)
+
+    def add_option(self, key, label, maximum, suffix, off_text, tooltip=None):
+        spin = QSpinBox()
+        spin.setRange(0, maximum)
+        spin.setSuffix(suffix)
+        spin.setSpecialValueText(off_text)
+        if tooltip:
+            spin.setToolTip(tooltip)
+        self.option_spins[key] = spin
+        self.options_form.addRow(label, spin)
+
+    def reset(self):
+        self.name_input.clear()
+        self.cmd_input.clear()
+        self.env_combo.setCurrentIndex(0)
+        for spin in self.option_spins.values():
+            spin.setValue(0)
+        self.encoding_combo.setCurrentIndex(0)
+        self.errors_combo.setCurrentIndex(0)
+        self.direct_combo.setCurrentIndex(0)
+        self.schedule_input.clear()
+        self.name_input.setFocus()
+
+    def get_encoding(self):
+        encoding = self.encoding_combo.currentText().strip()
+        return None if encoding in ("", "Default") else encoding
+
+    def accept(self):
+        encoding = self.get_encoding()
+        if encoding is not None:
+            try:
+                codecs.lookup(encoding)
+            except LookupError:
+                QMessageBox.warning(self, "Unknown encoding", f"There is no codec named '{encoding}'.")
+                return
+        schedule = self.schedule_input.text().strip()
+        if schedule:
+            try:
+                parse_schedule(schedule)
+            except ScheduleError as e:
+                QMessageBox.warning(self, "Invalid schedule", str(e))
+                return
+        super().accept()
+
+    def get_command(self):
+        return self.name_input.text().strip(), self.cmd_input.toPlainText().strip(), self.env_combo.currentText()
+
+    def get_options(self):
+        # Only non-default options are stored with the command
+        options = {key: spin.value() for key, spin in self.option_spins.items() if spin.value()}
+        if self.get_encoding() is not None:
+            options["encoding"] = self.get_encoding()
+        if self.errors_combo.currentText() != "replace":
+            options["errors"] = self.errors_combo.currentText()
+        if self.direct_combo.currentText() != "auto":
+            options["direct_exec"] = self.direct_combo.currentText()
+        if self.schedule_input.text().strip():
+            options["schedule"] = " ".join(self.schedule_input.text().split())
+        return options
+
+class SelectCommandsDialog(QDialog):
+    def __init__(self, model, title, prompt, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setFixedSize(400, 400)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+
+        self.model = model
+        self.list_view = QListView()
+        self.list_view.setModel(model)
+        self.list_view.setSelectionMode(QListView.MultiSelection)
+        self.list_view.setUniformItemSizes(True)
+        
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+
+        self.layout.addWidget(QLabel(prompt))
+        self.layout.addWidget(self.list_view)
+        self.layout.addWidget(self.buttons)
+
+        self.setLayout(self.layout)
+
+    def get_selected_commands(self):
+        rows = sorted(index.row() for index in self.list_view.selectionModel().selectedRows())
+        return [self.model.name_at(row) for row in rows]
+
+class DeleteCommandDialog(SelectCommandsDialog):
+    def __init__(self, model, parent=None):
+        super().__init__(model, "Delete Commands", "Select commands to delete:", parent)
+
+class RunCommandsDialog(SelectCommandsDialog):
+    def __init__(self, model, max_jobs=DEFAULT_MAX_JOBS, parent=None):
+        super().__init__(model, "Run Commands", "Select commands to run in parallel:", parent)
+
+        # Concurrency limit, inserted above the OK/Cancel buttons
+        jobs_layout = QHBoxLayout()
+        jobs_layout.addWidget(QLabel("Max parallel jobs:"))
+        self.jobs_spin = QSpinBox()
+        self.jobs_spin.setRange(1, 64)
+        self.jobs_spin.setValue(max_jobs)
+        jobs_layout.addWidget(self.jobs_spin)
+        self.layout.insertLayout(self.layout.count() - 1, jobs_layout)
+
+    def get_max_jobs(self):
+        return self.jobs_spin.value()
+
+class TemplateDialog(QDialog):
+    # Asks for the {{placeholder}} values of a command template. A matrix of rows
+    # fans the template out into one parallel run per row; placeholders missing
+    # from the matrix take the values of the fields above it.
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, parent=None):
+        super().__init__(parent)
+        self.setFixedSize(500, 500)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.name = None
+        self.command = ""
+        self.inputs = {}
+        self.runs = []
+        self.last_values = {}  # Command name -> field values of its last run
+        self.last_matrix = {}
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+
+        self.command_label = QLabel()
+        self.command_label.setTextFormat(Qt.PlainText)
+        self.command_label.setWordWrap(True)
+        self.values_form = QFormLayout()
+
+        self.matrix_label = QLabel()
+        self.matrix_label.setWordWrap(True)
+        self.matrix_input = QPlainTextEdit()
+        load_btn = QPushButton("Load CSV…")
+        load_btn.clicked.connect(self.load_csv)
+        self.jobs_spin = QSpinBox()
+        self.jobs_spin.setRange(1, 64)
+        self.jobs_spin.setValue(max_jobs)
+        matrix_layout = QHBoxLayout()
+        matrix_layout.addWidget(load_btn)
+        matrix_layout.addStretch(1)
+        matrix_layout.addWidget(QLabel("Max parallel jobs:"))
+        matrix_layout.addWidget(self.jobs_spin)
+
+        self.error_label = QLabel()
+        self.error_label.setObjectName("errorLabel")
+        self.error_label.setWordWrap(True)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.accepted.connect(self.validate)
+        self.buttons.rejected.connect(self.reject)
+
+        self.layout.addWidget(self.command_label)
+        self.layout.addLayout(self.values_form)
+        self.layout.addWidget(self.matrix_label)
+        self.layout.addWidget(self.matrix_input, stretch=1)
+        self.layout.addLayout(matrix_layout)
+        self.layout.addWidget(self.error_label)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+
+    def set_template(self, name, command):
+        self.name = name
+        self.command = command
+        self.setWindowTitle(f"Run {name}")
+        self.command_label.setText(command)
+        while self.values_form.rowCount():
+            self.values_form.removeRow(0)
+        self.inputs = {}
+        last = self.last_values.get(name, {})
+        for placeholder, default in placeholders(command):
+            field = QLineEdit(last.get(placeholder, ""))
+            if default is not None:
+                field.setPlaceholderText(default)
+            self.inputs[placeholder] = field
+            self.values_form.addRow(f"{placeholder}:", field)
+        columns = "one value" if len(self.inputs) == 1 else "comma-separated values"
+        self.matrix_label.setText(
+            f"Matrix, one run per line ({columns}, optionally under a CSV header naming the placeholders). "
+            "Leave it empty for a single run."
+        )
+        self.matrix_input.setPlainText(self.last_matrix.get(name, ""))
+        self.error_label.clear()
+        if self.inputs:
+            next(iter(self.inputs.values())).setFocus()
+
+    def get_values(self):
+        return {name: field.text().strip() for name, field in self.inputs.items()}
+
+    def get_max_jobs(self):
+        return self.jobs_spin.value()
+
+    def is_matrix(self):
+        return bool(self.matrix_input.toPlainText().strip())
+
+    def load_csv(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load matrix", "", "CSV (*.csv);;Text (*.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8", newline="") as f:
+                self.matrix_input.setPlainText(f.read())
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error while loading the matrix: {e}")
+            self.error_label.setText(str(e))
+
+    def validate(self):
+        # Every run is rendered before the dialog closes, so mistakes can be fixed in place
+        values = self.get_values()
+        try:
+            if self.is_matrix():
+                rows = parse_matrix(self.matrix_input.toPlainText(), list(self.inputs))
+                runs = [
+                    (item_label(row), {**values, **{key: value for key, value in row.items() if value}}) for row in rows
+                ]
+            else:
+                runs = [(item_label(values), values)]
+            for _, run_values in runs:
+                render(self.command, run_values)
+        except TemplateError as e:
+            self.error_label.setText(str(e))
+            return
+        self.runs = runs
+        self.last_values[self.name] = values
+        self.last_matrix[self.name] = self.matrix_input.toPlainText()
+        self.accept()
+
+class JobTab(QWidget):
+    # One parallel job: a status line above its own output view
+    def __init__(self, name, data, parent=None, sessions=None, archive=None):
+        super().__init__(parent)
+        self.name = name
+        self.worker = CommandWorker(
+            data["command"], data["env"], self, sessions, archive=archive, **command_options(data)
+        )
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(5, 5, 5, 5)
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel("Queued")
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.clicked.connect(self.worker.stop)
+        status_layout.addWidget(self.status_label, stretch=1)
+        status_layout.addWidget(self.stop_btn)
+        self.output_view = OutputView()
+        layout.addLayout(status_layout)
+        layout.addWidget(self.output_view, stretch=1)
+        self.setLayout(layout)
+
+        self.worker.output.connect(self.output_view.append_runs)
+
+    def status_text(self):
+        run = self.worker.run
+        if run.started_at is None:
+            return "Queued"
+        if run.exit_code is None:
+            return f"Running… {run.elapsed():.1f}s"
+        reason = self.worker.end_reason()
+        if reason is not None:
+            return f"{reason} ({run.elapsed():.2f}s)"
+        return f"Exit code {run.exit_code} in {run.elapsed():.2f}s"
+
+    def refresh_status(self):
+        self.status_label.setText(self.status_text())
+        self.stop_btn.setEnabled(self.worker.run.exit_code is None and not self.worker.run.stopped)
+
+class JobsWindow(QDialog):
+    # Shows every job of a parallel run in its own tab with a live status line
+    def __init__(self, jobs, max_jobs, parent=None, sessions=None, history=None, archive=None):
+        super().__init__(parent)
+        self.setWindowTitle("Parallel Run")
+        self.resize(800, 600)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+
+        self.pool = JobPool(max_jobs)
+        self.history = history
+        self.tabs = QTabWidget()
+        self.summary_label = QLabel()
+        self.stop_all_btn = QPushButton("Stop all")
+        self.stop_all_btn.clicked.connect(self.stop_all)
+        self.job_tabs = []
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(15, 15, 15, 15)
+        summary_layout = QHBoxLayout()
+        summary_layout.addWidget(self.summary_label, stretch=1)
+        summary_layout.addWidget(self.stop_all_btn)
+        layout.addLayout(summary_layout)
+        layout.addWidget(self.tabs, stretch=1)
+        self.setLayout(layout)
+
+        for name, data in jobs:
+            tab = JobTab(name, data, self, sessions, archive)
+            tab.worker.started.connect(self.refresh)
+            tab.worker.finished.connect(lambda exit_code, tab=tab: self.job_finished(tab))
+            self.tabs.addTab(tab, name)
+            self.job_tabs.append(tab)
+
+        # Elapsed times tick while jobs are running
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(250)
+        self.status_timer.timeout.connect(self.refresh)
+
+        self.refresh()
+        for tab in self.job_tabs:
+            # Recorded on the pool thread, which end_jobs() waits for
+            on_done = None if history is None else lambda run, name=tab.name: history.record(name, run)
+            self.pool.submit(tab.worker.run, on_done)
+        self.status_timer.start()
+
+    def stop_all(self):
+        for tab in self.job_tabs:
+            tab.worker.stop()
+        self.refresh()
+
+    def job_finished(self, tab):
+        tab.output_view.finish_output()
+        self.refresh()
+
+    def refresh(self):
+        running = failed = done = 0
+        for index, tab in enumerate(self.job_tabs):
+            tab.refresh_status()
+            run = tab.worker.run
+            if run.exit_code is not None:
+                done += 1
+                failed += run.exit_code != 0
+                marker = "✔" if run.exit_code == 0 else "✖"
+            elif run.started_at is not None:
+                running += 1
+                marker = "…"
+            else:
+                marker = "·"
+            self.tabs.setTabText(index, f"{marker} {tab.name}")
+        total = len(self.job_tabs)
+        self.summary_label.setText(f"{done}/{total} done, {running} running, {failed} failed")
+        if done == total:
+            self.status_timer.stop()
+            self.stop_all_btn.setEnabled(False)
+
+    def done(self, result):
+        # Esc, the close button and the main window closing all come here
+        self.end_jobs()
+        super().done(result)
+
+    def end_jobs(self):
+        # Queued jobs are dropped and running ones killed and waited for, so
+        # their history records are written before the window goes away
+        self.status_timer.stop()
+        self.pool.shutdown()
+        for tab in self.job_tabs:
+            tab.worker.stop()
+            tab.output_view.discard_transcript()
+        self.pool.shutdown(wait=True)
+
+class MatrixWindow(QDialog):
+    # Runs a command template once per matrix row on a JobPool and collects the
+    # results in one table; selecting a finished row opens its archived output.
+    # runs holds (label, placeholder values) per row.
+    COLUMNS = ["Item", "Status", "Exit code", "Duration (s)", "Output (KB)"]
+    STATUS_COLORS = {"OK": "#27c93f", "Failed": "#ff5f56", "Timed out": "#ff5f56", "Stopped": "#ffbd2e"}
+
+    def __init__(self, name, data, runs, max_jobs, parent=None, sessions=None, history=None, archive=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Matrix Run: {name}")
+        self.resize(900, 650)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+
+        self.name = name
+        self.pool = JobPool(max_jobs)
+        self.history = history
+        self.archive = archive
+        self.jobs = []  # [{"label", "values", "worker", "items"}] in matrix order
+        self.unsettled = set(range(len(runs)))  # Rows whose status can still change
+
+        self.summary_label = QLabel()
+        self.stop_all_btn = QPushButton("Stop all")
+        self.stop_all_btn.clicked.connect(self.stop_all)
+        export_btn = QPushButton("Export results…")
+        export_btn.clicked.connect(self.export)
+
+        self.table = QTableWidget(len(runs), len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.setAlternatingRowColors(True)
+        self.table.itemSelectionChanged.connect(self.open_selected)
+
+        self.output_label = QLabel("Select a finished run to see its output")
+        self.output_label.setTextFormat(Qt.PlainText)
+        self.output_view = ArchivedOutputView()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(15, 15, 15, 15)
+        summary_layout = QHBoxLayout()
+        summary_layout.addWidget(self.summary_label, stretch=1)
+        summary_layout.addWidget(export_btn)
+        summary_layout.addWidget(self.stop_all_btn)
+        layout.addLayout(summary_layout)
+        layout.addWidget(self.table, stretch=1)
+        layout.addWidget(self.output_label)
+        layout.addWidget(self.output_view, stretch=1)
+        self.setLayout(layout)
+
+        for row, (label, values) in enumerate(runs):
+            job_data = fill(data, values)
+            worker = CommandWorker(
+                job_data["command"], job_data["env"], self, sessions, archive=archive, **command_options(job_data)
+            )
+            worker.started.connect(self.refresh)
+            worker.finished.connect(lambda exit_code, row=row: self.job_finished(row))
+            items = []
+            for column in range(len(self.COLUMNS)):
+                # Rows keep their matrix index when the table is sorted
+                item = QTableWidgetItem()
+                item.setData(Qt.UserRole, row)
+                self.table.setItem(row, column, item)
+                items.append(item)
+            items[0].setData(Qt.DisplayRole, label)
+            items[0].setToolTip(job_data["command"])
+            self.jobs.append({"label": label, "values": values, "worker": worker, "items": items})
+        # Matrix order until a column header is clicked
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+
+        # Elapsed times tick while jobs are running
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(250)
+        self.status_timer.timeout.connect(self.refresh)
+
+        self.refresh()
+        for job in self.jobs:
+            # Recorded on the pool thread, which end_jobs() waits for
+            on_done = None if history is None else lambda run: history.record(name, run)
+            self.pool.submit(job["worker"].run, on_done)
+        self.status_timer.start()
+
+    @staticmethod
+    def status(worker):
+        run = worker.run
+        if run.started_at is None:
+            return "Queued"
+        if run.exit_code is None:
+            return "Running"
+        if run.timed_out:
+            return "Timed out"
+        if run.stopped:
+            return "Stopped"
+        return "OK" if run.exit_code == 0 else "Failed"
+
+    def stop_all(self):
+        for job in self.jobs:
+            job["worker"].stop()
+        self.refresh()
+
+    def job_finished(self, row):
+        self.refresh()
+        if self.selected_row() == row:
+            self.open_selected()
+
+    def refresh(self):
+        # Only rows that can still change are updated
+        for row in list(self.unsettled):
+            worker = self.jobs[row]["worker"]
+            items = self.jobs[row]["items"]
+            run = worker.run
+            status = self.status(worker)
+            items[1].setData(Qt.DisplayRole, status)
+            if status in self.STATUS_COLORS:
+                items[1].setForeground(QColor(self.STATUS_COLORS[status]))
+            if run.started_at is not None:
+                items[3].setData(Qt.DisplayRole, round(run.elapsed(), 2))
+                items[4].setData(Qt.DisplayRole, round(run.output_bytes / 1024, 1))
+            if run.exit_code is not None:
+                items[2].setData(Qt.DisplayRole, run.exit_code)
+                self.unsettled.discard(row)
+
+        total = len(self.jobs)
+        done = total - len(self.unsettled)
+        running = sum(1 for row in self.unsettled if self.jobs[row]["worker"].run.started_at is not None)
+        failed = sum(1 for job in self.jobs if job["worker"].run.exit_code not in (None, 0))
+        self.summary_label.setText(f"{done}/{total} done, {running} running, {failed} failed")
+        if done == total:
+            self.status_timer.stop()
+            self.stop_all_btn.setEnabled(False)
+
+    def selected_row(self):
+        rows = self.table.selectionModel().selectedRows()
+        return rows[0].data(Qt.UserRole) if rows else None
+
+    def open_selected(self):
+        row = self.selected_row()
+        if row is None:
+            return
+        job = self.jobs[row]
+        run = job["worker"].run
+        self.output_view.close_output()
+        if run.exit_code is None:
+            self.output_label.setText(f"{job['label']}  ·  still running")
+            return
+        if self.archive is None or not self.archive.exists(run.output_id):
+            self.output_label.setText(f"{job['label']}  ·  no archived output")
+            return
+        try:
+            output = self.archive.open(run.output_id)
+        except ArchiveError as e:
+            print(f"Error while opening archived output: {e}")
+            self.output_label.setText(str(e))
+            return
+        self.output_view.set_output(output)
+        self.output_label.setText(f"{run.command}  ·  {output.line_count} lines")
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export results", "matrix-results.csv", "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
+        rows = []
+        for job in self.jobs:
+            run = job["worker"].run
+            rows.append({
+                **job["values"], "status": self.status(job["worker"]), "exit_code": run.exit_code,
+                "duration": round(run.elapsed(), 3) if run.started_at is not None else None, "command": run.command,
+            })
+        try:
+            export_results(path, rows)
+        except OSError as e:
+            print(f"Error while exporting results: {e}")
+            QMessageBox.warning(self, "Export failed", str(e))
+            return
+        self.summary_label.setText(f"Exported {len(rows)} rows to {path}")
+
+    def done(self, result):
+        # Esc, the close button and the main window closing all come here
+        self.end_jobs()
+        super().done(result)
+
+    def end_jobs(self):
+        # Queued jobs are dropped and running ones killed and waited for, so
+        # their history records are written before the window goes away
+        self.status_timer.stop()
+        self.pool.shutdown()
+        for job in self.jobs:
+            job["worker"].stop()
+        self.pool.shutdown(wait=True)
+        self.output_view.close_output()
+
+class WorkflowWindow(QDialog):
+    # Live view of a workflow: one row per step in dependency order with its
+    # status, above the combined output of all steps
+    COLUMNS = ["Stage", "Step", "Command", "Depends on", "Status", "Exit code", "Duration (s)"]
+    STATUS_COLORS = {"OK": "#27c93f", "Failed": "#ff5f56", "Stopped": "#ffbd2e", "Skipped": "#888"}
+
+    def __init__(self, name, worker, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Workflow: {name}")
+        self.resize(900, 650)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+
+        self.worker = worker
+        self.worker.setParent(self)
+        self.steps = steps = worker.run.steps
+        self.rows = {step.id: row for row, step in enumerate(steps)}
+
+        self.summary_label = QLabel()
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.clicked.connect(self.worker.stop)
+
+        self.table = QTableWidget(len(steps), len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        for row, step in enumerate(steps):
+            values = [step.stage + 1, step.id, step.command_name, step.depends_text(), step.state, "", ""]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                self.table.setItem(row, column, item)
+
+        self.output_view = OutputView()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(15, 15, 15, 15)
+        summary_layout = QHBoxLayout()
+        summary_layout.addWidget(self.summary_label, stretch=1)
+        summary_layout.addWidget(self.stop_btn)
+        layout.addLayout(summary_layout)
+        layout.addWidget(self.table, stretch=1)
+        layout.addWidget(self.output_view, stretch=1)
+        self.setLayout(layout)
+
+        self.worker.output.connect(self.output_view.append_runs)
+        self.worker.state_changed.connect(self.update_step)
+        self.worker.finished.connect(self.workflow_finished)
+
+        # Durations tick while steps are running
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(250)
+        self.status_timer.timeout.connect(self.refresh)
+
+        self.refresh()
+        self.worker.start()
+        self.status_timer.start()
+
+    def update_step(self, step_id):
+        row = self.rows[step_id]
+        step = self.steps[row]
+        status = self.table.item(row, 4)
+        status.setData(Qt.DisplayRole, step.state)
+        if step.state in self.STATUS_COLORS:
+            status.setForeground(QColor(self.STATUS_COLORS[step.state]))
+        if step.run is not None and step.run.exit_code is not None:
+            self.table.item(row, 5).setData(Qt.DisplayRole, step.run.exit_code)
+        self.refresh()
+
+    def refresh(self):
+        counts = {}
+        for row, step in enumerate(self.steps):
+            counts[step.state] = counts.get(step.state, 0) + 1
+            if step.run is not None and step.run.started_at is not None:
+                self.table.item(row, 6).setData(Qt.DisplayRole, round(step.run.elapsed(), 2))
+        self.summary_label.setText(
+            f"{len(self.steps)} steps: " + ", ".join(f"{count} {state.lower()}" for state, count in counts.items())
+        )
+
+    def workflow_finished(self, exit_code):
+        self.status_timer.stop()
+        self.refresh()
+        self.stop_btn.setEnabled(False)
+        self.output_view.finish_output()
+        result = "succeeded" if exit_code == 0 else "failed"
+        self.output_view.append_html(
+            f"<span style='color: {'#27c93f' if exit_code == 0 else '#ff5f56'};'>"
+            f"Workflow {result} in {self.worker.run.elapsed():.2f}s</span>"
+        )
+
+    def done(self, result):
+        # Esc, the close button and the main window closing all come here
+        self.end_jobs()
+        super().done(result)
+
+    def end_jobs(self):
+        # Stops the workflow and waits for it, so its steps' history records are
+        # written before the window goes away
+        self.status_timer.stop()
+        self.worker.stop()
+        self.worker.wait()
+        self.output_view.discard_transcript()
+
+class StatsDialog(QDialog):
+    # Per-command run statistics from the history store, slowest first
+    COLUMNS = ["Command", "Runs", "p50 (s)", "p95 (s)", "Failures (%)", "Mean CPU (s)", "Peak RSS (MB)", "Last run"]
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Run Statistics")
+        self.resize(800, 450)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.history = history
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setAlternatingRowColors(True)
+        self.summary_label = QLabel()
+
+        buttons = QHBoxLayout()
+        export_runs_btn = QPushButton("Export runs…")
+        export_runs_btn.clicked.connect(lambda: self.export(summary=False))
+        export_stats_btn = QPushButton("Export summary…")
+        export_stats_btn.clicked.connect(lambda: self.export(summary=True))
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        buttons.addWidget(export_runs_btn)
+        buttons.addWidget(export_stats_btn)
+        buttons.addStretch(1)
+        buttons.addWidget(close_btn)
+
+        self.layout.addWidget(self.summary_label)
+        self.layout.addWidget(self.table, stretch=1)
+        self.layout.addLayout(buttons)
+        self.setLayout(self.layout)
+
+    def refresh(self):
+        stats = self.history.stats()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(stats))
+        for row, entry in enumerate(stats):
+            rss = entry["peak_rss_kb"]
+            cpu = entry["mean_cpu_time"]
+            values = [
+                entry["name"], entry["runs"], round(entry["p50"], 3), round(entry["p95"], 3),
+                round(entry["failure_rate"] * 100, 1), "" if cpu is None else round(cpu, 3),
+                "" if rss is None else round(rss / 1024, 1),
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_run"])),
+            ]
+            for column, value in enumerate(values):
+                # Numbers are stored as numbers so the columns sort numerically
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+        runs = sum(entry["runs"] for entry in stats)
+        self.summary_label.setText(f"{runs} recorded runs of {len(stats)} commands")
+
+    def export(self, summary):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export run history", "run-stats.csv" if summary else "run-history.csv", "CSV (*.csv);;JSON (*.json)"
+        )
+        if not path:
+            return
+        try:
+            count = self.history.export(path, summary)
+        except OSError as e:
+            print(f"Error while exporting run history: {e}")
+            QMessageBox.warning(self, "Export failed", str(e))
+            return
+        self.summary_label.setText(f"Exported {count} rows to {path}")
+
+class ScheduleDialog(QDialog):
+    # Scheduled commands by next run, with a countdown and how the last run went
+    COLUMNS = ["Command", "Schedule", "Next run", "Last run", "Result", "Runs", "Coalesced"]
+
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Scheduled Commands")
+        self.resize(820, 400)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.scheduler = scheduler
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+
+        self.summary_label = QLabel()
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setAlternatingRowColors(True)
+
+        buttons = QHBoxLayout()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        buttons.addStretch(1)
+        buttons.addWidget(close_btn)
+
+        self.layout.addWidget(self.summary_label)
+        self.layout.addWidget(self.table, stretch=1)
+        self.layout.addLayout(buttons)
+        self.setLayout(self.layout)
+
+        # Countdowns tick while the dialog is open
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(SCHEDULE_REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        jobs = self.scheduler.jobs_by_next_run()
+        now = time.time()
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            if job.schedule is None:
+                next_run = "invalid schedule"
+            elif job.next_run is None:
+                next_run = ""
+            else:
+                next_run = f"in {format_delay(job.next_run - now)} ({time.strftime('%H:%M', time.localtime(job.next_run))})"
+            last_run = "" if job.last_started is None else time.strftime("%m-%d %H:%M:%S", time.localtime(job.last_started))
+            values = [
+                job.name, job.data.get("schedule", ""), next_run, last_run, last_result(job), job.runs, job.coalesced
+            ]
+            for column, value in enumerate(values):
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.table.setItem(row, column, item)
+                item.setData(Qt.DisplayRole, value)
+            color = QColor("#ff5f56") if job.last_error or job.last_exit_code not in (None, 0) else QColor("#fff")
+            self.table.item(row, 4).setForeground(color)
+        running = sum(job.running for job in jobs)
+        summary = f"{len(jobs)} scheduled commands, {running} running, at most {self.scheduler.max_running} at once"
+        if not self.scheduler.owner:
+            summary = f"{len(jobs)} scheduled commands, run by another open instance"
+        self.summary_label.setText(
+            summary if jobs else "No scheduled commands. Give a command a schedule when adding it."
+        )
+
+class ArchivedOutputView(QWidget):
+    # Pages through an archived run: only the lines on screen are decompressed,
+    # so any size of output opens instantly and in constant memory
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.output = None
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.TypeWriter)
+        self.text.setFont(font)
+        self.text.viewport().installEventFilter(self)
+        self.text.installEventFilter(self)
+        self.scrollbar = QScrollBar(Qt.Vertical)
+        self.scrollbar.valueChanged.connect(self.show_window)
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.text, stretch=1)
+        layout.addWidget(self.scrollbar)
+        self.setLayout(layout)
+
+    def set_output(self, output):
+        if self.output is not None:
+            self.output.close()
+        self.output = output
+        self.scrollbar.setValue(0)
+        self.update_range()
+
+    def visible_lines(self):
+        return max(1, self.text.viewport().height() // self.text.fontMetrics().lineSpacing())
+
+    def update_range(self):
+        visible = self.visible_lines()
+        line_count = self.output.line_count if self.output is not None else 0
+        self.scrollbar.setPageStep(visible)
+        self.scrollbar.setRange(0, max(0, line_count - visible))
+        self.show_window()
+
+    def show_window(self):
+        if self.output is None:
+            self.text.clear()
+            return
+        lines = self.output.read_lines(self.scrollbar.value(), self.visible_lines())
+        self.text.setPlainText("\n".join(strip_ansi(line) for line in lines))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_range()
+
+    def eventFilter(self, obj, event):
+        # The text widget only ever holds one screenful; scrolling moves the window
+        if event.type() == QEvent.Wheel:
+            QApplication.sendEvent(self.scrollbar, event)
+            return True
+        if event.type() == QEvent.KeyPress:
+            actions = {
+                Qt.Key_Up: QAbstractSlider.SliderSingleStepSub, Qt.Key_Down: QAbstractSlider.SliderSingleStepAdd,
+                Qt.Key_PageUp: QAbstractSlider.SliderPageStepSub, Qt.Key_PageDown: QAbstractSlider.SliderPageStepAdd,
+                Qt.Key_Home: QAbstractSlider.SliderToMinimum, Qt.Key_End: QAbstractSlider.SliderToMaximum,
+            }
+            if event.key() in actions:
+                self.scrollbar.triggerAction(actions[event.key()])
+                return True
+        return super().eventFilter(obj, event)
+
+    def close_output(self):
+        self.set_output(None)
+
+class OutputHistoryDialog(QDialog):
+    # Recent runs with archived output; selecting one opens its output below
+    COLUMNS = ["Command", "Started", "Duration (s)", "Exit code", "Output (KB)"]
+
+    def __init__(self, history, archive, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Output History")
+        self.resize(900, 650)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.history = history
+        self.archive = archive
+        self.runs = []
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(15, 15, 15, 15)
+        self.layout.setSpacing(10)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.setAlternatingRowColors(True)
+        self.table.itemSelectionChanged.connect(self.open_selected)
+
+        self.status_label = QLabel()
+        self.status_label.setTextFormat(Qt.PlainText)
+        self.output_view = ArchivedOutputView()
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        buttons = QHBoxLayout()
+        buttons.addStretch(1)
+        buttons.addWidget(close_btn)
+
+        self.layout.addWidget(self.table, stretch=1)
+        self.layout.addWidget(self.status_label)
+        self.layout.addWidget(self.output_view, stretch=2)
+        self.layout.addLayout(buttons)
+        self.setLayout(self.layout)
+
+    def refresh(self):
+        # Newest first; runs whose output was pruned are left out
+        self.runs = [run for run in reversed(self.history.runs(limit=RECENT_RUN_COUNT)) if self.archive.exists(run["output_id"])]
+        self.table.setRowCount(len(self.runs))
+        for row, run in enumerate(self.runs):
+            values = [
+                run["name"] or run["command"],
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started"])),
+                f"{run['wall_time']:.2f}", str(run["exit_code"]), f"{run['output_bytes'] / 1024:.1f}",
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.output_view.close_output()
+        self.status_label.setText(f"{len(self.runs)} archived runs")
+
+    def open_selected(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return
+        run = self.runs[rows[0].row()]
+        try:
+            output = self.archive.open(run["output_id"])
+        except ArchiveError as e:
+            print(f"Error while opening archived output: {e}")
+            self.output_view.close_output()
+            self.status_label.setText(str(e))
+            return
+        self.output_view.set_output(output)
+        self.status_label.setText(f"{run['command']}  ·  {output.line_count} lines, {output.size / 1024 / 1024:.1f} MB")
+
+    def done(self, result):
+        self.output_view.close_output()
+        super().done(result)
+
+class CommandApp(QWidget):
+    def __init__(self, startup=None):
+        super().__init__()
+        self.setWindowTitle("IknowMyCMDies")
+        self.setFixedSize(900, 700)
+        self.setWindowFlags(Qt.FramelessWindowHint)  # Disable the native title bar
+        self.setAttribute(Qt.WA_TranslucentBackground)
+
+        # The library is filled in by load_library once the window is up
+        self.startup = startup or StartupTimer()
+        self.store = None
+        self.commands = {}
+        self.index = CommandIndex()
+        self.command_model = CommandListModel(self)
+        self.worker = None
+        self.watcher = None
+        self.current_name = None
+        self.max_jobs = DEFAULT_MAX_JOBS
+        self.cache = ResultCache(RESULT_CACHE_DIR)
+        self.history = HistoryStore(HISTORY_DB)
+        self.archive = OutputArchive(OUTPUT_ARCHIVE_DIR)
+        self.sessions = SessionPool() if USE_WARM_SESSIONS else None
+        self.add_dialog = None
+        self.delete_dialog = None
+        self.run_dialog = None
+        self.stats_dialog = None
+        self.output_history_dialog = None
+        self.template_dialog = None
+        self.import_dialog = None
+        self.schedule_dialog = None
+        self.scheduler = Scheduler(self.run_scheduled_job, history=self.history)
+        self.current_values = None
+        self.loader = None
+        self.init_ui()
+        self.set_library_ready(False)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.loader is None:
+            self.loader = LibraryLoader(self.history, self)
+            self.loader.loaded.connect(self.library_loaded)
+            self.loader.failed.connect(self.library_failed)
+            QTimer.singleShot(0, self.load_icons)
+            QTimer.singleShot(0, self.loader.start)
+
+    def load_icons(self):
+        self.terminal_icon.setPixmap(QPixmap(TERMINAL_ICON_PATH))
+        self.startup.mark("first event loop pass")
+
+    def library_loaded(self, store, commands, index):
+        self.store = store
+        self.commands = commands
+        self.index = index
+        self.command_model.reset(index.ranking)
+        self.combo.setCurrentIndex(-1)
+        self.scheduler.update(commands)
+        self.scheduler.start()
+        if self.sessions is not None:
+            self.sessions.warm({data["env"] for data in commands.values()})
+        self.watch_library()
+        self.set_library_ready(True)
+        self.startup.mark(f"library loaded ({len(commands)} commands)")
+
+    def library_failed(self, error):
+        print(f"Error while loading the command library: {error}")
+        self.result_area.show_html(f"<span style='color: #ff5f56;'>Could not load the command library: {html.escape(error)}</span>")
+
+    def set_library_ready(self, ready):
+        for button in (self.add_btn, self.delete_btn, self.run_many_btn, self.import_btn, self.schedule_btn):
+            button.setEnabled(ready)
+
+    def init_ui(self):
+        self.main_layout = QVBoxLayout()
+        self.main_layout.setContentsMargins(0, 0, 0, 0)
+        self.main_layout.setSpacing(0)
+
+        # Custom title bar
+        self.title_bar = QWidget()
+        self.title_bar.setFixedHeight(32)
+        title_bar_layout = QHBoxLayout()
+        title_bar_layout.setContentsMargins(5, 0, 5, 0)
+        title_bar_layout.setSpacing(5)
+
+        # Title
+        title_label = QLabel("IknowMyCMDies")
+        title_label.setObjectName("titleLabel")
+        title_bar_layout.addWidget(title_label, alignment=Qt.AlignLeft)
+
+        # Minimize button
+        minimize_btn = QPushButton("-")
+        minimize_btn.setFixedSize(24, 24)
+        minimize_btn.setObjectName("minimizeButton")
+        minimize_btn.clicked.connect(self.showMinimized)
+        title_bar_layout.addWidget(minimize_btn, alignment=Qt.AlignRight)
+
+        # Close button
+        close_btn = QPushButton("x")
+        close_btn.setFixedSize(24, 24)
+        close_btn.setObjectName("closeButton")
+        close_btn.clicked.connect(self.close)
+        title_bar_layout.addWidget(close_btn, alignment=Qt.AlignRight)
+
+        self.title_bar.setLayout(title_bar_layout)
+        self.title_bar.setObjectName("titleBar")
+        self.main_layout.addWidget(self.title_bar)
+
+        # Main content
+        self.content = QWidget()
+        self.content.setObjectName("content")
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(20, 20, 20, 20)
+        self.layout.setSpacing(15)
+
+        # Title with icon
+        title_layout = QHBoxLayout()
+        title_layout.setAlignment(Qt.AlignCenter)
+        
+        # The pixmap is read from disk after the window is shown
+        self.terminal_icon = QLabel()
+        
+        title = QLabel("IknowMyCMDies")
+        title.setObjectName("appTitle")
+        
+        title_layout.addWidget(self.terminal_icon)
+        title_layout.addWidget(title, alignment=Qt.AlignCenter)
+        self.layout.addLayout(title_layout)
+
+        # Command selection
+        combo_label = QLabel("Saved commands:")
+        self.combo = QComboBox()
+        self.combo.setPlaceholderText("Select a command")  # Shown while nothing is selected
+        self.combo.setModel(self.command_model)
+        self.combo.setCurrentIndex(-1)
+        self.combo.currentTextChanged.connect(self.update_input)  # Connect the combo box to update the input and set focus
+        self.combo.setObjectName("commandCombo")
+        self.layout.addWidget(combo_label)
+        self.layout.addWidget(self.combo)
+
+        # Separator or label for input
+        input_label = QLabel("Command input:")
+        self.layout.addWidget(input_label)
+
+        # Command input
+        self.input_line = QLineEdit()
+        self.input_line.setPlaceholderText("Enter the name of a command or select one from the list")
+        self.layout.addWidget(self.input_line)
+
+        # Type-ahead search, ranked by the index rather than filtered by the completer
+        self.completer_model = QStringListModel(self)
+        self.completer = QCompleter(self.completer_model, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.input_line.setCompleter(self.completer)
+        self.input_line.textEdited.connect(self.update_suggestions)
+
+        # Result area with scrolling
+        result_header = QHBoxLayout()
+        result_label = QLabel("Results:")
+        self.spill_btn = QPushButton("Open full output")
+        self.spill_btn.setVisible(False)
+        result_header.addWidget(result_label)
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.setVisible(False)
+        self.refresh_btn.clicked.connect(self.refresh_command)
+        self.find_btn = QPushButton("Find (Ctrl+F)")
+        # Watch mode re-runs the command on an interval and highlights what changed
+        self.watch_status = QLabel()
+        self.watch_status.setVisible(False)
+        self.watch_check = QCheckBox("Watch every")
+        self.watch_check.setToolTip("Re-run the command on an interval and highlight the lines that changed")
+        self.watch_check.toggled.connect(self.toggle_watch)
+        self.watch_spin = QSpinBox()
+        self.watch_spin.setRange(1, MAX_WATCH_INTERVAL)
+        self.watch_spin.setValue(int(DEFAULT_INTERVAL))
+        self.watch_spin.setSuffix(" s")
+        self.watch_spin.setObjectName("watchInterval")
+        result_header.addStretch(1)
+        result_header.addWidget(self.watch_status)
+        result_header.addWidget(self.watch_check)
+        result_header.addWidget(self.watch_spin)
+        result_header.addWidget(self.refresh_btn)
+        result_header.addWidget(self.spill_btn)
+        result_header.addWidget(self.find_btn)
+
+        self.result_area = OutputView()
+        self.result_area.setPlaceholderText("Execution results will be displayed here...")
+        self.result_area.spilled.connect(lambda path: self.spill_btn.setVisible(True))
+        self.spill_btn.clicked.connect(self.result_area.open_spill)
+
+        # Find bar over the output; its filtered view replaces the result area while enabled
+        self.find_bar = FindBar(self.result_area)
+        self.find_bar.setVisible(False)
+        self.find_btn.clicked.connect(self.find_bar.open_bar)
+        QShortcut(QKeySequence.Find, self, self.find_bar.open_bar)
+        self.output_stack = QStackedWidget()
+        self.output_stack.addWidget(self.result_area)
+        self.output_stack.addWidget(self.find_bar.filter_view)
+        self.find_bar.filter_check.toggled.connect(
+            lambda checked: self.output_stack.setCurrentIndex(1 if checked else 0)
+        )
+        
+        scroll = QScrollArea()
+        scroll.setWidget(self.output_stack)
+        scroll.setWidgetResizable(True)
+        self.layout.addLayout(result_header)
+        self.layout.addWidget(self.find_bar)
+        self.layout.addWidget(scroll, stretch=1)
+
+        # Buttons
+        button_layout = QHBoxLayout()
+        button_layout.setSpacing(10)
+
+        self.execute_btn = QPushButton("Execute (Enter)")
+        self.execute_btn.clicked.connect(self.execute_command)
+
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.setEnabled(False)
+        self.stop_btn.clicked.connect(self.stop_command)
+
+        self.add_btn = QPushButton("Add")
+        self.add_btn.clicked.connect(self.add_command)
+
+        self.run_many_btn = QPushButton("Run several")
+        self.run_many_btn.clicked.connect(self.run_commands)
+
+        self.delete_btn = QPushButton("Delete")
+        self.delete_btn.clicked.connect(self.delete_command)
+
+        self.import_btn = QPushButton("Import")
+        self.import_btn.setToolTip("Save the most used commands of your shell history")
+        self.import_btn.clicked.connect(self.import_history)
+
+        self.schedule_btn = QPushButton("Schedule")
+        self.schedule_btn.setToolTip("Upcoming and last runs of the scheduled commands")
+        self.schedule_btn.clicked.connect(self.show_schedule)
+
+        self.stats_btn = QPushButton("Stats")
+        self.stats_btn.clicked.connect(self.show_stats)
+
+        self.history_btn = QPushButton("History")
+        self.history_btn.clicked.connect(self.show_output_history)
+
+        button_layout.addWidget(self.execute_btn)
+        button_layout.addWidget(self.stop_btn)
+        button_layout.addWidget(self.run_many_btn)
+        button_layout.addWidget(self.add_btn)
+        button_layout.addWidget(self.delete_btn)
+        button_layout.addWidget(self.import_btn)
+        button_layout.addWidget(self.schedule_btn)
+        button_layout.addWidget(self.stats_btn)
+        button_layout.addWidget(self.history_btn)
+
+        # Connect Enter key to execute button after defining it
+        self.input_line.returnPressed.connect(self.execute_btn.click)
+
+        # Wrap button_layout in a QWidget
+        button_widget = QWidget()
+        button_widget.setLayout(button_layout)
+        self.layout.addWidget(button_widget)
+
+        self.content.setLayout(self.layout)
+        self.main_layout.addWidget(self.content)
+        self.setLayout(self.main_layout)
+
+    def update_input(self, text):
+        if text:
+            self.input_line.setText(text)
+            self.input_line.setFocus()  # Ensure the input line gains focus
+
+    def watch_library(self):
+        # Other instances write to the same database; pick up their edits incrementally
+        self.store_watcher = QFileSystemWatcher(self)
+        self.store_watcher.fileChanged.connect(self.schedule_reload)
+        self.watch_store_files()
+
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(100)
+        self.reload_timer.timeout.connect(self.reload_library)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(LIBRARY_POLL_INTERVAL_MS)
+        self.poll_timer.timeout.connect(self.reload_library)
+        self.poll_timer.start()
+
+    def watch_store_files(self):
+        watched = set(self.store_watcher.files())
+        for path in (COMMAND_DB, COMMAND_DB + "-wal"):
+            if path not in watched and os.path.exists(path):
+                self.store_watcher.addPath(path)
+
+    def schedule_reload(self, path):
+        self.watch_store_files()
+        self.reload_timer.start()
+
+    def reload_library(self):
+        if not self.store.has_external_changes():
+            return
+        changed, deleted = self.store.changes_since()
+        self.apply_library_changes(changed, deleted)
+
+    def apply_library_changes(self, changed, deleted):
+        for name, data in changed.items():
+            if self.commands.get(name) == data:
+                continue
+            if name not in self.commands:
+                self.command_model.insert(name)
+            else:
+                invalidate_cached(self.cache, self.commands[name])
+            self.commands[name] = data
+            self.index.add(name, data)
+        for name in deleted:
+            old = self.commands.pop(name, None)
+            if old is not None:
+                invalidate_cached(self.cache, old)
+                self.command_model.remove(name)
+                self.index.remove(name)
+        self.scheduler.update(self.commands)
+
+    def update_suggestions(self, text):
+        self.completer_model.setStringList(self.index.search(text, SEARCH_RESULT_COUNT))
+        if text.strip():
+            self.completer.complete()
+
+    def execute_command(self):
+        name = self.input_line.text().strip()
+        if not name:
+            self.result_area.show_html("<span style='color: #ff5f56;'>Please enter or select a command.</span>")
+            return
+
+        if self.store is None:
+            self.result_area.show_html("<span style='color: #569cd6;'>Loading the command library…</span>")
+            return
+
+        if name not in self.commands:
+            suggestions = self.index.search(name, SUGGESTION_COUNT)
+            if suggestions:
+                suggested = "<br>".join(f"• <span style='color: #569cd6;'>{html.escape(cmd)}</span>" for cmd in suggestions)
+                suggested = f"<span style='color: #569cd6;'>Did you mean:</span><br>{suggested}"
+            else:
+                suggested = "<span style='color: #569cd6;'>No similar command found.</span>"
+            self.result_area.show_html(f"""
+                <span style='color: #ff5f56;'>❌ Command '{html.escape(name)}' not found.</span>
+                <br><br>
+                {suggested}
+            """)
+            return
+
+        self.history.touch(name)
+        self.command_model.bump(name)
+        if self.commands[name]["env"] == WORKFLOW_ENV:
+            self.run_workflow(name)
+            return
+        if is_template(self.commands[name]["command"]):
+            self.run_template(name)
+            return
+        self.start_command(name)
+
+    def run_workflow(self, name):
+        try:
+            # Checked before any window opens
+            steps = parse_workflow(self.commands[name]["command"])
+            worker = WorkflowWorker(steps, self.commands, None, self.history, self.archive)
+        except WorkflowError as e:
+            self.result_area.show_html(
+                f"<span style='color: #ff5f56;'>Workflow '{html.escape(name)}': {html.escape(str(e))}</span>"
+            )
+            return
+        WorkflowWindow(name, worker, self).show()
+
+    def run_template(self, name):
+        if self.template_dialog is None:
+            self.template_dialog = TemplateDialog(self.max_jobs, self)
+        dialog = self.template_dialog
+        dialog.set_template(name, self.commands[name]["command"])
+        if not dialog.exec_():
+            return
+        if not dialog.is_matrix():
+            self.start_command(name, values=dialog.runs[0][1])
+            return
+        self.max_jobs = dialog.get_max_jobs()
+        window = MatrixWindow(
+            name, self.commands[name], dialog.runs, self.max_jobs, self, self.sessions, self.history, self.archive
+        )
+        window.show()
+
+    def refresh_command(self):
+        if self.current_name in self.commands:
+            try:
+                invalidate_cached(self.cache, fill(self.commands[self.current_name], self.current_values or {}))
+            except TemplateError:
+                pass
+            self.start_command(self.current_name, use_cache=False, values=self.current_values)
+
+    def start_command(self, name, use_cache=True, values=None):
+        # values fill in the placeholders of a command template
+        self.stop_watch()
+        self.watch_status.setVisible(False)
+        try:
+            command_data = fill(self.commands[name], values or {})
+        except TemplateError as e:
+            self.result_area.show_html(f"<span style='color: #ff5f56;'>{html.escape(str(e))}</span>")
+            return
+        command = command_data["command"]
+        env = command_data["env"]
+        cache_ttl = command_data.get("cache_ttl", 0)
+        self.current_name = name
+        self.current_values = values
+
+        self.spill_btn.setVisible(False)
+        self.refresh_btn.setVisible(False)
+        self.result_area.show_html(f"""
+            <span style='color: #569cd6;'>Executing command: </span><span style='color: #fff;'>{html.escape(name)}</span>
+            <br><br>
+            <span style='color: #569cd6;'>Command:</span>
+            <div style='background-color: #252525; padding: 8px; border: 1px solid #569cd6;'>{html.escape(command)}</div>
+            <br>
+            <span style='color: #569cd6;'>Executed with:</span> <span style='color: #fff;'>{html.escape(env)}</span>
+            <br><br>
+            <span style='color: #569cd6;'>Result:</span>
+        """)
+
+        if self.watch_check.isChecked():
+            self.start_watch(command_data)
+            return
+
+        if cache_ttl and use_cache:
+            cached = self.cache.get(command, env, cache_ttl, *cache_decoding(command_data))
+            if cached is not None:
+                age = time.time() - cached.created
+                self.result_area.append_html(f"<span style='color: #569cd6;'>(cached {age:.0f}s ago)</span>")
+                self.result_area.appendPlainText("")
+                self.result_area.append_output(cached.output)
+                self.result_area.finish_output()
+                self.refresh_btn.setVisible(True)
+                return
+
+        self.result_area.appendPlainText("")
+        self.execute_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.worker = CommandWorker(
+            command, env, self, self.sessions, MAX_ENTRY_SIZE if cache_ttl else None, self.archive,
+            **command_options(command_data)
+        )
+        self.worker.output.connect(self.result_area.append_runs)
+        self.worker.finished.connect(self.command_finished)
+        self.worker.start()
+
+    def stop_command(self):
+        if self.watcher is not None:
+            self.watch_check.setChecked(False)
+        if self.worker is not None:
+            self.worker.stop()
+
+    def toggle_watch(self, checked):
+        if not checked:
+            self.stop_watch()
+        elif self.worker is None and self.current_name in self.commands:
+            # Starts watching the command shown in the result area
+            if self.commands[self.current_name]["env"] != WORKFLOW_ENV:
+                self.start_command(self.current_name, values=self.current_values)
+
+    def start_watch(self, data):
+        self.result_area.begin_watch()
+        self.watch_status.setText("Waiting for the first run…")
+        self.watch_status.setVisible(True)
+        self.stop_btn.setEnabled(True)
+        self.watcher = WatchWorker(data, self.watch_spin.value(), self, self.sessions)
+        self.watcher.updated.connect(self.watch_updated)
+        self.watcher.start()
+
+    def stop_watch(self):
+        if self.watcher is None:
+            return
+        self.watcher.stop()
+        self.watcher = None
+        self.watch_status.setText(self.watch_status.text() + " · stopped")
+        self.stop_btn.setEnabled(self.worker is not None)
+
+    def watch_updated(self, update, path):
+        if self.sender() is not self.watcher:
+            # A run that ended just as the watch was stopped or replaced
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return
+        self.result_area.apply_changes(update)
+        if path:
+            self.result_area.replace_transcript(path)
+        added, removed, changed = update.counts()
+        status = f"Run {update.number} · exit {update.exit_code} · {update.elapsed:.2f}s · +{added} -{removed} ~{changed}"
+        if update.skipped:
+            status += f" · {update.skipped} skipped"
+        if update.truncated:
+            status += f" · first {len(update.lines)} lines"
+        self.watch_status.setText(status)
+
+    def command_finished(self, exit_code):
+        run = self.worker.run
+        self.result_area.finish_output()
+        self.history.record(self.current_name, run)
+        reason = self.worker.end_reason()
+        if reason is not None:
+            self.result_area.append_html(f"<span style='color: #ff5f56;'>{reason}</span>")
+        elif exit_code != 0:
+            self.result_area.append_html(f"<span style='color: #ff5f56;'>Exited with code {exit_code}</span>")
+        elif self.commands.get(self.current_name, {}).get("cache_ttl") and not run.capture_overflow:
+            self.cache.put(
+                run.command, run.env, run.captured_output(), exit_code, *cache_decoding(self.commands[self.current_name])
+            )
+        self.execute_btn.setEnabled(True)
+        self.stop_btn.setEnabled(False)
+        self.worker = None
+
+    def run_commands(self):
+        # Dialogs are built on first use and reused afterwards
+        if self.run_dialog is None:
+            self.run_dialog = RunCommandsDialog(self.command_model, self.max_jobs, self)
+        dialog = self.run_dialog
+        dialog.list_view.clearSelection()
+        if dialog.exec_():
+            selected = [name for name in dialog.get_selected_commands() if name in self.commands]
+            if not selected:
+                return
+            self.max_jobs = dialog.get_max_jobs()
+            jobs = [(name, self.commands[name]) for name in selected]
+            window = JobsWindow(jobs, self.max_jobs, self, self.sessions, self.history, self.archive)
+            window.show()
+
+    def add_command(self):
+        if self.add_dialog is None:
+            self.add_dialog = AddCommandDialog(self)
+        dialog = self.add_dialog
+        dialog.reset()
+        if dialog.exec_():
+            name, cmd, env = dialog.get_command()
+            if name and cmd:
+                if name in self.commands:
+                    invalidate_cached(self.cache, self.commands[name])
+                self.commands[name] = {"command": cmd, "env": env, **dialog.get_options()}
+                self.store.put(name, self.commands[name])
+                self.command_model.insert(name)
+                self.index.add(name, self.commands[name])
+                self.scheduler.update(self.commands)
+
+    def import_history(self):
+        if self.import_dialog is None:
+            self.import_dialog = ImportHistoryDialog(self)
+        dialog = self.import_dialog
+        dialog.scan(self.commands)
+        if dialog.exec_():
+            entries = dialog.get_entries()
+            for name, data in entries.items():
+                self.commands[name] = data
+                self.command_model.insert(name)
+                self.index.add(name, data)
+            # One batched write for the whole import
+            self.store.put_many(entries)
+
+    def delete_command(self):
+        if self.delete_dialog is None:
+            self.delete_dialog = DeleteCommandDialog(self.command_model, self)
+        dialog = self.delete_dialog
+        dialog.list_view.clearSelection()
+        if dialog.exec_():
+            selected = dialog.get_selected_commands()
+            for name in selected:
+                if name in self.commands:
+                    invalidate_cached(self.cache, self.commands.pop(name))
+                    self.command_model.remove(name)
+                    self.index.remove(name)
+            self.store.delete_many(selected)
+            self.scheduler.update(self.commands)
+
+    def run_scheduled_job(self, job, on_run):
+        # On a scheduler thread; the output goes to the archive and run history
+        return run_scheduled(job, self.commands, self.history, self.archive, self.sessions, on_run)
+
+    def show_schedule(self):
+        if self.schedule_dialog is None:
+            self.schedule_dialog = ScheduleDialog(self.scheduler, self)
+        self.schedule_dialog.exec_()
+
+    def show_stats(self):
+        if self.stats_dialog is None:
+            self.stats_dialog = StatsDialog(self.history, self)
+        self.stats_dialog.refresh()
+        self.stats_dialog.exec_()
+
+    def show_output_history(self):
+        if self.output_history_dialog is None:
+            self.output_history_dialog = OutputHistoryDialog(self.history, self.archive, self)
+        self.output_history_dialog.refresh()
+        self.output_history_dialog.exec_()
+
+    def closeEvent(self, event):
+        # Child windows end their runs first; those are recorded in the history
+        # store and may use the shared sessions
+        for window in self.findChildren((JobsWindow, MatrixWindow, WorkflowWindow)):
+            window.close()
+        self.stop_watch()
+        self.scheduler.stop()
+        if self.worker is not None:
+            self.worker.stop()
+        if self.store is not None:
+            self.store.close()
+        self.history.close()
+        if self.sessions is not None:
+            self.sessions.close()
+        self.result_area.discard_transcript()
+        self.find_bar.filter_view.discard_transcript()
+        super().closeEvent(event)
+
+    def mousePressEvent(self, event):
+        # Allow window movement via the custom title bar
+        if event.button() == Qt.LeftButton:
+            self.drag_pos = event.globalPos() - self.frameGeometry().topLeft()
+            event.accept()
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() == Qt.LeftButton and hasattr(self, 'drag_pos'):
+            self.move(event.globalPos() - self.drag_pos)
+            event.accept()
+
+def main(argv=None, started_at=None, trace_startup=False):
+    startup = StartupTimer(started_at, trace_startup or TRACE_STARTUP)
+    startup.mark("qt imported")
+    app = QApplication(sys.argv if argv is None else argv)
+    app.setStyleSheet(APP_STYLESHEET)
+    startup.mark("application created")
+    window = CommandApp(startup)
+    startup.mark("window built")
+    window.show()
+    startup.mark("window shown")
+    return app.exec_()
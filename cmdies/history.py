@@ -0,0 +1,249 @@
+import atexit
+import contextlib
+import csv
+import json
+import math
+import sqlite3
+import threading
+import time
+
+from cmdies.frecency import logaddexp, use_score
+
+FLUSH_DELAY = 1.0  # Seconds of write-behind for run records
+BUSY_TIMEOUT = 5  # Seconds to wait for another instance's write lock
+MAX_RUNS = 100000  # Oldest records are pruned beyond this many
+
+FIELDS = [
+    "name", "command", "env", "started", "ended", "wall_time", "cpu_time", "peak_rss_kb", "output_bytes", "exit_code",
+    "output_id"
+]
+STATS_FIELDS = ["name", "runs", "failure_rate", "p50", "p95", "mean_cpu_time", "peak_rss_kb", "last_run"]
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return None
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+class HistoryStore:
+    # One row per finished run, kept in its own SQLite file so writing history
+    # never wakes the command library watchers. Records are queued and written
+    # behind in batches, like CommandStore edits. The frecency table holds one
+    # decaying usage score per command name (see FrecencyRanking). Every instance
+    # shares this file, so it also holds the scheduler's state: when each
+    # scheduled command last started, and a lease naming the one instance that
+    # runs the schedules.
+    def __init__(self, path, flush_delay=FLUSH_DELAY, max_runs=MAX_RUNS):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.max_runs = max_runs
+        self._lock = threading.RLock()
+        self._pending = []
+        self._pending_uses = []
+        self._timer = None
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.create_function("logaddexp", 2, logaddexp, deterministic=True)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, name TEXT, command TEXT NOT NULL, "
+            "env TEXT NOT NULL, started REAL NOT NULL, ended REAL NOT NULL, wall_time REAL NOT NULL, "
+            "cpu_time REAL, peak_rss_kb INTEGER, output_bytes INTEGER NOT NULL, exit_code INTEGER NOT NULL, "
+            "output_id TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "output_id" not in columns:
+            self._conn.execute("ALTER TABLE runs ADD COLUMN output_id TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS runs_name ON runs (name, wall_time)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS runs_started ON runs (started)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS frecency (name TEXT PRIMARY KEY, score REAL NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS schedule_starts (name TEXT PRIMARY KEY, started REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheduler_lease (id INTEGER PRIMARY KEY CHECK (id = 0), "
+            "owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        atexit.register(self.close)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def record(self, name, run):
+        if run.started_wall is None or run.exit_code is None:
+            return
+        wall_time = run.elapsed()
+        row = (
+            name, run.command, run.env, run.started_wall, run.started_wall + wall_time, wall_time,
+            run.cpu_time, run.peak_rss_kb, run.output_bytes, run.exit_code, run.output_id
+        )
+        with self._lock:
+            self._pending.append(row)
+            self._schedule_flush()
+
+    def touch(self, name, when=None):
+        # Counts one use of a command towards its frecency score
+        with self._lock:
+            self._pending_uses.append((name, use_score(when)))
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._timer = None
+            if not (self._pending or self._pending_uses) or self._conn is None:
+                return
+            pending, self._pending = self._pending, []
+            uses, self._pending_uses = self._pending_uses, []
+            try:
+                with self._transaction():
+                    self._conn.executemany(
+                        f"INSERT INTO runs ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})", pending
+                    )
+                    self._conn.execute("DELETE FROM runs WHERE id <= (SELECT MAX(id) FROM runs) - ?", (self.max_runs,))
+                    # Combined in SQL so uses recorded by other instances are not overwritten
+                    self._conn.executemany(
+                        "INSERT INTO frecency (name, score) VALUES (?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET score = logaddexp(score, excluded.score)",
+                        uses
+                    )
+            except sqlite3.Error as e:
+                print(f"Error while saving run history: {e}")
+
+    def frecency(self):
+        # {name: log score} for FrecencyRanking
+        self.flush()
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, score FROM frecency"))
+
+    def schedule_starts(self):
+        # {name: wall time} of the last start of each scheduled command
+        with self._lock:
+            if self._conn is None:
+                return {}
+            return dict(self._conn.execute("SELECT name, started FROM schedule_starts"))
+
+    def schedule_started(self, name, when):
+        # Written at once rather than behind, so a crash cannot make the next
+        # instance run the command again
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                with self._transaction():
+                    self._conn.execute(
+                        "INSERT INTO schedule_starts (name, started) VALUES (?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET started = MAX(started, excluded.started)",
+                        (name, when)
+                    )
+            except sqlite3.Error as e:
+                print(f"Error while saving run history: {e}")
+
+    def acquire_lease(self, owner, seconds, now=None):
+        # True when owner holds the scheduler lease for the next seconds. A free
+        # or expired lease is taken over; the owner's own lease is extended.
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._conn is None:
+                return False
+            with self._transaction():
+                row = self._conn.execute("SELECT owner, expires FROM scheduler_lease WHERE id = 0").fetchone()
+                if row is not None and row[0] != owner and row[1] > now:
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO scheduler_lease (id, owner, expires) VALUES (0, ?, ?)", (owner, now + seconds)
+                )
+                return True
+
+    def release_lease(self, owner):
+        with self._lock:
+            if self._conn is None:
+                return
+            with self._transaction():
+                self._conn.execute("DELETE FROM scheduler_lease WHERE id = 0 AND owner = ?", (owner,))
+
+    def runs(self, name=None, limit=None):
+        # Oldest first; with limit, only the newest runs
+        self.flush()
+        query = f"SELECT {', '.join(FIELDS)} FROM runs"
+        params = []
+        if name is not None:
+            query += " WHERE name = ?"
+            params.append(name)
+        query += " ORDER BY started DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(zip(FIELDS, row)) for row in reversed(rows)]
+
+    def stats(self):
+        # Per command: run count, failure rate, p50/p95 wall time, mean CPU time,
+        # largest peak RSS and the last run, slowest commands first
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, wall_time, exit_code, cpu_time, peak_rss_kb, started FROM runs "
+                "WHERE name IS NOT NULL ORDER BY name, wall_time"
+            ).fetchall()
+        stats = {}
+        for name, wall_time, exit_code, cpu_time, peak_rss_kb, started in rows:
+            entry = stats.setdefault(name, {"walls": [], "failures": 0, "cpu": [], "peak_rss_kb": None, "last_run": started})
+            entry["walls"].append(wall_time)
+            entry["failures"] += exit_code != 0
+            if cpu_time is not None:
+                entry["cpu"].append(cpu_time)
+            if peak_rss_kb is not None:
+                entry["peak_rss_kb"] = max(entry["peak_rss_kb"] or 0, peak_rss_kb)
+            entry["last_run"] = max(entry["last_run"], started)
+
+        result = []
+        for name, entry in stats.items():
+            walls = entry["walls"]
+            result.append({
+                "name": name,
+                "runs": len(walls),
+                "failure_rate": entry["failures"] / len(walls),
+                "p50": percentile(walls, 50),
+                "p95": percentile(walls, 95),
+                "mean_cpu_time": sum(entry["cpu"]) / len(entry["cpu"]) if entry["cpu"] else None,
+                "peak_rss_kb": entry["peak_rss_kb"],
+                "last_run": entry["last_run"],
+            })
+        result.sort(key=lambda item: item["p95"], reverse=True)
+        return result
+
+    def export(self, path, summary=False):
+        # Every run, or the per-command stats with summary; CSV or JSON by file extension
+        rows = self.stats() if summary else self.runs()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if path.lower().endswith(".json"):
+                json.dump(rows, f, indent=2)
+            else:
+                writer = csv.DictWriter(f, fieldnames=STATS_FIELDS if summary else FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
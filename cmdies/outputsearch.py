@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+
+BLOCK_SIZE = 1024 * 1024  # Bytes read and matched per step
+REPORT_INTERVAL = 0.1  # Seconds between progress callbacks while scanning
+IDLE_POLL = 0.25  # Seconds to wait for more output once everything fed was read
+
+
+def compile_pattern(pattern, regex=False, case_sensitive=False):
+    # Raises re.error for an invalid regular expression
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    return re.compile(pattern if regex else re.escape(pattern), flags)
+
+
+class OutputSearch:
+    # Scans an output for a compiled pattern on a background thread: the first
+    # size bytes of a file (all of it when size is None), then the text handed
+    # over through feed() as more output arrives. Matches are reported in batches
+    # through on_progress as (line numbers, line texts, total match count,
+    # finished); line numbers count from the first line of the file. The scan
+    # ends once notify(complete=True) has been called and everything fed was
+    # read, or when cancelled.
+    def __init__(self, path, pattern, on_progress, size=None):
+        self.path = path
+        self.size = size
+        self.pattern = pattern
+        self.on_progress = on_progress
+        self.match_count = 0
+        self._line = 0
+        self._lines = []
+        self._texts = []
+        self._chunks = []
+        self._lock = threading.Lock()
+        self._complete = False
+        self._cancelled = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def feed(self, text):
+        if text:
+            with self._lock:
+                self._chunks.append(text)
+
+    def notify(self, complete=False):
+        if complete:
+            self._complete = True
+        self._wakeup.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._wakeup.set()
+
+    def run(self):
+        carry = self._scan_file() if self.path else ""
+        if carry is None:
+            return
+        last_report = time.monotonic()
+        caught_up = False  # Reported since the last text was read
+        while not self._cancelled.is_set():
+            complete = self._complete
+            with self._lock:
+                chunks, self._chunks = self._chunks, []
+            if not chunks:
+                if complete:
+                    # The last line has no newline; nothing more will be appended to it
+                    if carry:
+                        self._scan(carry)
+                    self._report(True)
+                    return
+                if not caught_up:
+                    self._report(False)
+                    last_report = time.monotonic()
+                    caught_up = True
+                self._wakeup.wait(IDLE_POLL)
+                self._wakeup.clear()
+                continue
+
+            # Only whole lines are matched; a partial line waits for the rest
+            caught_up = False
+            data = carry + "".join(chunks)
+            end = data.rfind("\n") + 1
+            carry = data[end:]
+            if end:
+                self._scan(data[:end])
+            if time.monotonic() - last_report >= REPORT_INTERVAL:
+                self._report(False)
+                last_report = time.monotonic()
+
+    def _scan_file(self):
+        # Returns the unfinished last line of the file, or None when it cannot be read
+        carry = b""
+        remaining = self.size
+        last_report = time.monotonic()
+        try:
+            f = open(self.path, "rb")
+        except OSError as e:
+            print(f"Error while searching the output: {e}")
+            return None
+        with f:
+            while not self._cancelled.is_set() and remaining != 0:
+                data = f.read(BLOCK_SIZE if remaining is None else min(BLOCK_SIZE, remaining))
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                data = carry + data
+                end = data.rfind(b"\n") + 1
+                carry = data[end:]
+                if end:
+                    self._scan(data[:end].decode("utf-8", "replace"))
+                if time.monotonic() - last_report >= REPORT_INTERVAL:
+                    self._report(False)
+                    last_report = time.monotonic()
+        return carry.decode("utf-8", "replace")
+
+    def _scan(self, block):
+        line = self._line
+        position = 0
+        last_line = -1
+        for match in self.pattern.finditer(block):
+            start = match.start()
+            line += block.count("\n", position, start)
+            position = start
+            self.match_count += 1
+            if line != last_line:
+                line_start = block.rfind("\n", 0, start) + 1
+                line_end = block.find("\n", start)
+                self._lines.append(line)
+                self._texts.append(block[line_start:line_end if line_end >= 0 else len(block)])
+                last_line = line
+        self._line = line + block.count("\n", position)
+
+    def _report(self, finished):
+        if self._cancelled.is_set():
+            return
+        lines, self._lines = self._lines, []
+        texts, self._texts = self._texts, []
+        self.on_progress(lines, texts, self.match_count, finished)
@@ -0,0 +1,78 @@
+import os
+import signal
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LIMITS_SUPPORTED = resource is not None
+
+# Saved command options that become rlimits of the child: option -> (rlimit, scale)
+LIMIT_OPTIONS = {
+    "cpu_limit": ("RLIMIT_CPU", 1),  # Seconds of CPU time
+    "memory_limit": ("RLIMIT_AS", 1024 * 1024),  # Megabytes of address space
+    "file_limit": ("RLIMIT_NOFILE", 1),  # Open file descriptors
+}
+
+
+def group_popen_kwargs():
+    # Starts the child as the leader of its own process group, so the whole tree
+    # it spawns can be killed at once
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_tree(process):
+    if process.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def own_peak_rss():
+    # ru_maxrss of this process, in the units os.wait4 reports for its children
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def command_limits(data):
+    # The rlimit options set on a saved command
+    return {option: data[option] for option in LIMIT_OPTIONS if data.get(option)}
+
+
+def limits_preexec(limits):
+    # Returns a preexec_fn applying the limits in the child before exec. It only
+    # calls setrlimit, which is safe between fork and exec.
+    if not limits or not LIMITS_SUPPORTED:
+        return None
+    values = []
+    for option, value in limits.items():
+        name, scale = LIMIT_OPTIONS[option]
+        limit = getattr(resource, name)
+        soft = int(value) * scale
+        # The CPU limit sends SIGXCPU first, then SIGKILL a second later
+        hard = soft + 1 if name == "RLIMIT_CPU" else soft
+        # An unprivileged process cannot raise its own hard limit
+        current_hard = resource.getrlimit(limit)[1]
+        if current_hard != resource.RLIM_INFINITY:
+            hard = min(hard, current_hard)
+            soft = min(soft, hard)
+        values.append((limit, soft, hard))
+
+    def apply():
+        for limit, soft, hard in values:
+            resource.setrlimit(limit, (soft, hard))
+
+    return apply
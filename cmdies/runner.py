@@ -0,0 +1,414 @@
+import codecs
+import locale
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cmdies.cache import MAX_ENTRY_SIZE
+from cmdies.directexec import direct_args, programs
+from cmdies.processes import command_limits, group_popen_kwargs, kill_tree, limits_preexec, own_peak_rss
+from cmdies.sessions import SessionError, SessionUnavailable
+
+ENVIRONMENTS = ["CMD", "PowerShell", "Bash"]
+
+DEFAULT_MAX_JOBS = 4
+
+READ_SIZE = 64 * 1024  # Bytes taken from the child's output pipe per read
+DEFAULT_ENCODING = locale.getpreferredencoding(False)
+DECODE_ERRORS = ("replace", "backslashreplace", "ignore")
+
+
+def build_popen_args(command, env):
+    # Returns (args, shell) for subprocess.Popen, going through the environment's shell
+    if env == "CMD":
+        return command, True
+    if env == "PowerShell":
+        return ["powershell", "-Command", command], False
+    if env == "Bash":
+        return ["bash", "-c", command], False
+    raise ValueError(f"Unknown environment: {env}")
+
+
+def exit_code_from_status(status):
+    # Same convention as Popen.returncode: -N when killed by signal N
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def command_options(data):
+    # CommandRun keyword arguments from a saved command's options
+    return {
+        "timeout": data.get("timeout"), "limits": command_limits(data),
+        "encoding": data.get("encoding"), "errors": data.get("errors", "replace"),
+        "direct_exec": data.get("direct_exec", "auto"),
+    }
+
+
+class OutputDecoder:
+    # Decodes output bytes chunk by chunk: a character split between two reads is
+    # completed by the second, and \r\n and \r become \n like universal newlines
+    def __init__(self, encoding=None, errors="replace"):
+        if errors not in DECODE_ERRORS:
+            raise ValueError(f"Unknown decoding error policy: {errors}")
+        self._decoder = codecs.getincrementaldecoder(encoding or DEFAULT_ENCODING)(errors)
+        self._held_cr = False
+
+    def decode(self, data, final=False):
+        text = self._decoder.decode(data, final)
+        if self._held_cr:
+            text = "\r" + text
+            self._held_cr = False
+        # A \r at the end may be the first half of \r\n
+        if text.endswith("\r") and not final:
+            text = text[:-1]
+            self._held_cr = True
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class CommandRun:
+    # Runs one command in a child process and streams its merged stdout/stderr
+    # to on_output as it arrives. Callbacks are invoked from the reader thread.
+    # With a SessionPool, PowerShell/Bash commands go to a warm interpreter instead.
+    # With capture_limit, up to that many characters of output are also kept in
+    # self.captured; capture_overflow tells whether the output was longer.
+    # After the run, cpu_time and peak_rss_kb hold the child's resource usage
+    # where os.wait4 is available; runs in a warm session leave them as None, and
+    # so does a child whose peak RSS does not exceed this process's own.
+    # With an OutputArchive, the output is also compressed to disk under output_id.
+    # The child leads its own process group: stop() and the timeout kill the whole
+    # tree. Commands with rlimits always get a fresh process, never a session.
+    # stdin and stdout may be OS pipe descriptors, which are handed to the child
+    # and closed here once it has started; with stdout, only stderr is streamed.
+    # Output is read as raw bytes and decoded incrementally with encoding (the
+    # locale's by default) and the errors policy. Warm sessions decode with the
+    # locale, so commands with another encoding get a fresh process.
+    # A command that needs no shell features (see directexec) is started directly
+    # rather than through its shell or a session; direct_exec overrides that.
+    def __init__(self, command, env, on_output=None, on_finished=None, on_started=None, sessions=None,
+                 capture_limit=None, archive=None, timeout=None, limits=None, stdin=None, stdout=None,
+                 encoding=None, errors="replace", direct_exec="auto"):
+        self.command = command
+        self.env = env
+        self.direct_exec = direct_exec
+        self.direct = False  # Whether the last start bypassed the shell
+        self.encoding = encoding
+        self.errors = errors
+        self.sessions = sessions
+        self.stdin = stdin
+        self.stdout = stdout
+        self.timeout = timeout
+        self.limits = limits or {}
+        self.stopped = False
+        self.timed_out = False
+        self.session = None
+        self._stop_lock = threading.Lock()
+        self._timer = None
+        self.archive = archive
+        self.output_id = None
+        self._archive_writer = None
+        self.capture_limit = capture_limit
+        self.captured = []
+        self.captured_size = 0
+        self.capture_overflow = False
+        self.on_output = on_output
+        self.on_finished = on_finished
+        self.on_started = on_started
+        self.process = None
+        self.exit_code = None
+        self.started_at = None
+        self.ended_at = None
+        self.started_wall = None  # time.time() at start, for history records
+        self.output_bytes = 0
+        self.cpu_time = None
+        self.peak_rss_kb = None
+        self._spawn_rss = 0  # Our own ru_maxrss when the child was started
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.exit_code
+
+    def stop(self):
+        # Safe from any thread; the reader thread then sees EOF and finishes
+        with self._stop_lock:
+            if self.exit_code is not None:
+                return
+            self.stopped = True
+            if self.process is not None:
+                kill_tree(self.process)
+            elif self.session is not None:
+                self.session.kill()
+
+    def _expire(self):
+        self.timed_out = True
+        self.stop()
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.ended_at if self.ended_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def run(self):
+        self.started_at = time.monotonic()
+        self.started_wall = time.time()
+        if self.archive is not None:
+            self.output_id, self._archive_writer = self.archive.create()
+        if self.on_started is not None:
+            self.on_started()
+        if self.timeout:
+            self._timer = threading.Timer(self.timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        direct = direct_args(self.command, self.env, self.direct_exec)
+        fresh = self.limits or self.encoding or self.stdin is not None or self.stdout is not None
+        if self.sessions is not None and not fresh and direct is None and self.sessions.supports(self.env):
+            exit_code = self._run_in_session()
+            if exit_code is not None:
+                return self._finish(exit_code)
+        try:
+            decoder = OutputDecoder(self.encoding, self.errors)
+            with self._stop_lock:
+                if self.stopped:
+                    return self._finish(-1)
+                try:
+                    self.process = self._popen(direct)
+                except OSError:
+                    if direct is None:
+                        raise
+                    # A cached program was removed, is not executable or is a script
+                    # without a shebang (ENOEXEC), which the shell still runs
+                    programs.forget(direct[1])
+                    self.process = self._popen(None)
+        except (OSError, ValueError, LookupError, subprocess.SubprocessError) as e:
+            self._output(f"{e}\n")
+            return self._finish(-1)
+        finally:
+            self._close_pipes()
+
+        # read1 returns whatever the child has written so far, without waiting for a full buffer
+        stream = self.process.stdout if self.process.stdout is not None else self.process.stderr
+        while True:
+            data = stream.read1(READ_SIZE)
+            text = decoder.decode(data, final=not data)
+            if text:
+                self._output(text, len(data))
+            if not data:
+                break
+        stream.close()
+        return self._finish(self._reap())
+
+    def _popen(self, direct):
+        # direct is (args, executable) from direct_args, or None for the shell
+        if direct is not None:
+            args, shell = direct[0], False
+            executable = direct[1]
+        else:
+            args, shell = build_popen_args(self.command, self.env)
+            executable = None
+        self.direct = direct is not None
+        self._spawn_rss = own_peak_rss()
+        return subprocess.Popen(
+            args, shell=shell, executable=executable,
+            stdin=subprocess.DEVNULL if self.stdin is None else self.stdin,
+            stdout=subprocess.PIPE if self.stdout is None else self.stdout,
+            stderr=subprocess.STDOUT if self.stdout is None else subprocess.PIPE,
+            preexec_fn=limits_preexec(self.limits), **group_popen_kwargs()
+        )
+
+    def _close_pipes(self):
+        # The child holds its own copies; the next process in the pipe only sees
+        # EOF once every write end is closed
+        for fd in (self.stdin, self.stdout):
+            if fd is not None:
+                os.close(fd)
+        self.stdin = self.stdout = None
+
+    def _reap(self):
+        # os.wait4 reports the child's resource usage along with its exit status
+        if not hasattr(os, "wait4"):
+            return self.process.wait()
+        try:
+            _, status, usage = os.wait4(self.process.pid, 0)
+        except ChildProcessError:
+            return self.process.wait()
+        self.process.returncode = exit_code_from_status(status)
+        self.cpu_time = usage.ru_utime + usage.ru_stime
+        # The child starts out with our peak RSS, which exec carries over into its
+        # ru_maxrss (fork, vfork and posix_spawn alike), so a peak that is not above
+        # ours at spawn time says nothing about the command and stays unknown
+        if usage.ru_maxrss > self._spawn_rss:
+            # ru_maxrss is in bytes on macOS and KiB elsewhere
+            self.peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+        return self.process.returncode
+
+    def _run_in_session(self):
+        # The exit code, or None when the command never reached a session and
+        # should run in a fresh process instead
+        try:
+            session = self.sessions.acquire(self.env)
+        except (OSError, SessionError):
+            return None
+        with self._stop_lock:
+            self.session = session
+            if self.stopped:
+                session.kill()
+        try:
+            return session.run(self.command, self._output, self.timeout)
+        except (OSError, SessionError) as e:
+            # A stopped run kills its session, which is then replaced
+            if self.stopped:
+                return -1
+            # A dead or wedged session is thrown away by release
+            session.kill()
+            if isinstance(e, SessionUnavailable):
+                self._output(f"{e}; running the command in a new process\n")
+                return None
+            # The command may have run in part, so it is not run again
+            self._output(f"{e}\n")
+            return -1
+        finally:
+            with self._stop_lock:
+                self.session = None
+            self.sessions.release(session)
+
+    def captured_output(self):
+        return "".join(self.captured)
+
+    def _output(self, text, size=None):
+        self.output_bytes += len(text.encode("utf-8", "replace")) if size is None else size
+        if self._archive_writer is not None:
+            try:
+                self._archive_writer.write(text)
+            except OSError as e:
+                print(f"Error while archiving output: {e}")
+                self._archive_writer.abort()
+                self._archive_writer = None
+                self.output_id = None
+        if self.capture_limit is not None and not self.capture_overflow:
+            self.captured_size += len(text)
+            if self.captured_size > self.capture_limit:
+                self.capture_overflow = True
+                self.captured = []
+            else:
+                self.captured.append(text)
+        if self.on_output is not None:
+            self.on_output(text)
+
+    def _finish(self, exit_code):
+        if self._timer is not None:
+            self._timer.cancel()
+        self.ended_at = time.monotonic()
+        self.exit_code = exit_code
+        if self._archive_writer is not None:
+            try:
+                self._archive_writer.close()
+            except OSError as e:
+                print(f"Error while archiving output: {e}")
+                self._archive_writer.abort()
+                self.output_id = None
+            self._archive_writer = None
+            self.archive.prune()
+        if self.on_finished is not None:
+            self.on_finished(exit_code)
+        return exit_code
+
+
+def cache_decoding(data):
+    # (encoding, errors) part of a saved command's result cache key
+    options = command_options(data)
+    return options["encoding"], options["errors"]
+
+
+def invalidate_cached(cache, data):
+    # Drops the cached output of a saved command, e.g. once it was edited or deleted
+    if data.get("cache_ttl"):
+        cache.invalidate(data["command"], data["env"], *cache_decoding(data))
+
+
+def run_saved_command(data, on_output=None, sessions=None, cache=None, history=None, name=None, archive=None,
+                      on_run=None):
+    # Runs a saved command to completion on the calling thread, answering from
+    # the result cache when the command has a cache_ttl. Runs that actually
+    # execute are recorded in history under name, their output in archive.
+    # on_run gets the CommandRun before it starts, to stop it from elsewhere.
+    command, env = data["command"], data["env"]
+    cache_ttl = data.get("cache_ttl", 0) if cache is not None else 0
+    if cache_ttl:
+        cached = cache.get(command, env, cache_ttl, *cache_decoding(data))
+        if cached is not None:
+            if on_output is not None:
+                on_output(cached.output)
+            return cached.exit_code
+
+    run = CommandRun(
+        command, env, on_output=on_output, sessions=sessions,
+        capture_limit=MAX_ENTRY_SIZE if cache_ttl else None, archive=archive, **command_options(data)
+    )
+    if on_run is not None:
+        on_run(run)
+    try:
+        exit_code = run.run()
+    except KeyboardInterrupt:
+        # The child is in its own process group and did not get the Ctrl+C
+        run.stop()
+        raise
+    if run.timed_out and on_output is not None:
+        on_output(f"\nTimed out after {run.timeout}s\n")
+    if history is not None:
+        history.record(name, run)
+    if cache_ttl and exit_code == 0 and not run.capture_overflow:
+        cache.put(command, env, run.captured_output(), exit_code, *cache_decoding(data))
+    return exit_code
+
+
+class JobPool:
+    # Runs CommandRun jobs on a bounded set of worker threads, so at most
+    # max_workers child processes are alive at once; extra jobs wait in the queue
+    def __init__(self, max_workers=DEFAULT_MAX_JOBS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cmdies-job")
+        self._futures = set()  # Of the jobs not done yet
+        self._lock = threading.Lock()
+
+    def submit(self, run, on_done=None):
+        # on_done(run) is called on the worker thread once the job has run;
+        # shutdown(wait=True) returns after it
+        if on_done is None:
+            future = self._executor.submit(run.run)
+        else:
+            future = self._executor.submit(self._run, run, on_done)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _run(self, run, on_done):
+        try:
+            return run.run()
+        finally:
+            on_done(run)
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def shutdown(self, wait=False):
+        # Queued jobs are dropped, running ones finish
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,414 @@
+import collections
+import datetime
+import heapq
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from cmdies.runner import DEFAULT_MAX_JOBS, run_saved_command
+from cmdies.templates import fill
+from cmdies.workflow import WORKFLOW_ENV, run_workflow
+
+DEFAULT_JITTER = 10.0  # Seconds; each start is delayed by up to this much, at most a tenth of the period
+MISSED_GRACE = 60.0  # Seconds late after which an occurrence counts as missed, e.g. during sleep
+MAX_SLEEP = 30.0  # Longest wait before the wall clock is checked again (it jumps on wake and on clock changes)
+MAX_CRON_YEARS = 5  # How far ahead a cron expression is searched for its next match
+LEASE_SECONDS = 60.0  # How long the instance running the schedules holds on without renewing
+LEASE_RENEW = 20.0  # Seconds between renewals, and between attempts by the other instances
+STOP_TIMEOUT = 5.0  # Seconds stop() waits for killed runs to be recorded
+
+INTERVAL = re.compile(r"every\s+(\d+)\s*(s|sec|m|min|h|d)?", re.IGNORECASE)
+INTERVAL_UNITS = {None: 1, "s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "d": 86400}
+CRON_MACROS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+# (name, lowest, highest, names starting at lowest)
+CRON_FIELDS = [
+    ("minute", 0, 59, None),
+    ("hour", 0, 23, None),
+    ("day of month", 1, 31, None),
+    ("month", 1, 12, MONTH_NAMES),
+    ("day of week", 0, 7, DAY_NAMES),
+]
+
+
+class ScheduleError(Exception):
+    pass
+
+
+class IntervalSchedule:
+    def __init__(self, seconds, text):
+        self.seconds = seconds
+        self.text = text
+
+    def next_after(self, t):
+        return t + self.seconds
+
+
+class CronSchedule:
+    # Standard five-field cron expression in local time. As in cron, when both
+    # day of month and day of week are restricted, a day matching either runs.
+    def __init__(self, text):
+        self.text = text
+        fields = CRON_MACROS.get(text.lower(), text).split()
+        if len(fields) != 5:
+            raise ScheduleError("A cron schedule has five fields: minute hour day-of-month month day-of-week")
+        values = [parse_cron_field(field, *spec) for field, spec in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = values
+        self.weekdays = {day % 7 for day in self.weekdays}  # 7 is Sunday too
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def day_matches(self, moment):
+        in_month = moment.day in self.days
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, t):
+        # Jumps a month, day, hour or minute at a time rather than testing every minute
+        start = datetime.datetime.fromtimestamp(t).replace(second=0, microsecond=0)
+        moment = start + datetime.timedelta(minutes=1)
+        while moment.year <= start.year + MAX_CRON_YEARS:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self.day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ScheduleError(f"'{self.text}' never matches")
+
+
+def parse_cron_field(field, name, lowest, highest, names):
+    values = set()
+    for part in field.lower().split(","):
+        part, _, step = part.partition("/")
+        if part == "*":
+            first, last = lowest, highest
+        else:
+            first, _, last = part.partition("-")
+            first = cron_value(first, name, lowest, highest, names)
+            last = cron_value(last, name, lowest, highest, names) if last else (highest if step else first)
+        if step and not step.isdigit() or step == "0":
+            raise ScheduleError(f"Invalid step '{step}' in the {name} field")
+        if first > last:
+            raise ScheduleError(f"Invalid range '{part}' in the {name} field")
+        values.update(range(first, last + 1, int(step) if step else 1))
+    return values
+
+
+def cron_value(text, name, lowest, highest, names):
+    if names and text[:3] in names:
+        return names.index(text[:3]) + lowest
+    if not text.isdigit() or not lowest <= int(text) <= highest:
+        raise ScheduleError(f"'{text}' is not a valid {name} ({lowest}-{highest})")
+    return int(text)
+
+
+def parse_schedule(text):
+    # "every 10m" style intervals (s, m, h, d), cron expressions and @daily-style macros
+    text = " ".join(text.split())
+    match = INTERVAL.fullmatch(text)
+    if match:
+        seconds = int(match.group(1)) * INTERVAL_UNITS[match.group(2) and match.group(2).lower()]
+        if seconds <= 0:
+            raise ScheduleError("The interval must be at least one second")
+        return IntervalSchedule(seconds, text)
+    if text.lower().startswith("every"):
+        raise ScheduleError("Expected an interval like 'every 10m' (s, m, h or d)")
+    schedule = CronSchedule(text)
+    schedule.next_after(time.time())  # Rejects expressions like "0 0 30 2 *" that never match
+    return schedule
+
+
+class ScheduledJob:
+    # A saved command with a schedule option, and how its runs went
+    def __init__(self, name, data, schedule):
+        self.name = name
+        self.data = data
+        self.schedule = schedule
+        self.version = 0  # Queue entries of older versions are ignored
+        self.next_run = None
+        self.running = False
+        self.queued = False  # Due, waiting for a free slot
+        self.runs = 0
+        self.coalesced = 0  # Occurrences folded into another run
+        self.last_started = None
+        self.last_duration = None
+        self.last_exit_code = None
+        self.last_error = None
+
+
+class Scheduler:
+    # Starts saved commands on their schedules from one thread that sleeps until
+    # the earliest entry of a heap of (time, job) is due. At most max_running jobs
+    # run at once and the others queue in due order. An occurrence that comes while
+    # the same job is still running or queued is coalesced into that run, and
+    # occurrences missed while the machine slept become one catch-up run. Starts
+    # get a random delay of up to jitter seconds, so jobs sharing a schedule, or
+    # waking up together, do not all start in the same second. run_job(job, on_run)
+    # runs on a thread of its own, passes its CommandRun or WorkflowRun to on_run
+    # and returns the exit code; on_change(job) is called from the scheduler
+    # threads whenever a job starts, ends or is rescheduled.
+    #
+    # With a history store, each start is saved there and the next run is counted
+    # from the last saved start, so occurrences missed while no instance was
+    # running are caught up too. Of the instances sharing the store, only the one
+    # holding its scheduler lease starts jobs; the others keep their next runs up
+    # to date and take over when the lease expires.
+    def __init__(self, run_job, on_change=None, max_running=DEFAULT_MAX_JOBS, jitter=DEFAULT_JITTER, history=None):
+        self.run_job = run_job
+        self.on_change = on_change
+        self.max_running = max_running
+        self.jitter = jitter
+        self.history = history
+        self.owner = history is None  # Whether this instance starts jobs
+        self.jobs = {}
+        self._queue = []  # (time, sequence, name, version, nominal time or None for a catch-up run)
+        self._ready = collections.deque()
+        self._running = 0
+        self._active = {}  # name -> CommandRun or WorkflowRun of each running job
+        self._threads = set()
+        self._sequence = 0
+        self._stopped = False
+        self._thread = None
+        self._lease_id = uuid.uuid4().hex
+        self._lease_check = 0.0  # time.time() of the next lease renewal or attempt
+        self._changed = threading.Condition()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Nothing new starts, running jobs are killed with their process trees and
+        # the lease is handed back for another instance to take over
+        with self._changed:
+            self._stopped = True
+            runs = list(self._active.values())
+            threads = list(self._threads)
+            self._changed.notify_all()
+        for run in runs:
+            run.stop()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        if self.history is not None and self.owner:
+            try:
+                self.history.release_lease(self._lease_id)
+            except sqlite3.Error as e:
+                print(f"Error while releasing the scheduler lease: {e}")
+
+    def update(self, commands):
+        # Picks up added, changed and removed schedules from the library
+        now = time.time()
+        starts = None
+        with self._changed:
+            for name in list(self.jobs):
+                if not commands.get(name, {}).get("schedule"):
+                    del self.jobs[name]
+            for name, data in commands.items():
+                text = data.get("schedule")
+                if not text:
+                    continue
+                job = self.jobs.get(name)
+                if job is not None and job.schedule is not None and job.schedule.text == " ".join(text.split()):
+                    job.data = data
+                    continue
+                try:
+                    schedule = parse_schedule(text)
+                    error = None
+                except ScheduleError as e:
+                    schedule, error = None, str(e)
+                if job is None:
+                    job = self.jobs[name] = ScheduledJob(name, data, schedule)
+                    if starts is None:
+                        starts = self._saved_starts()
+                    job.last_started = starts.get(name)
+                job.data, job.schedule, job.last_error = data, schedule, error
+                self._anchor(job, now)
+            self._changed.notify_all()
+
+    def _saved_starts(self):
+        if self.history is None:
+            return {}
+        try:
+            return self.history.schedule_starts()
+        except sqlite3.Error as e:
+            print(f"Error while reading the scheduled runs: {e}")
+            return {}
+
+    def _anchor(self, job, now):
+        # Queues the first occurrence after the job's last start, which may be
+        # overdue, or after now for a job that never ran. Called with the lock held.
+        job.version += 1
+        job.next_run = None
+        if job.schedule is not None:
+            self._push(job, job.schedule.next_after(job.last_started or now))
+
+    def jobs_by_next_run(self):
+        with self._changed:
+            jobs = list(self.jobs.values())
+        return sorted(jobs, key=lambda job: (job.next_run is None, job.next_run or 0, job.name))
+
+    def _jitter(self, job, nominal):
+        period = job.schedule.next_after(nominal) - nominal
+        return random.uniform(0, min(self.jitter, period / 10))
+
+    def _push(self, job, nominal, catch_up=False):
+        # Called with the lock held
+        when = (time.time() if catch_up else nominal) + self._jitter(job, nominal)
+        if not catch_up:
+            job.next_run = when
+        self._sequence += 1
+        heapq.heappush(self._queue, (when, self._sequence, job.name, job.version, None if catch_up else nominal))
+
+    def _loop(self):
+        with self._changed:
+            while not self._stopped:
+                now = time.time()
+                if self.history is not None and now >= self._lease_check:
+                    self._renew_lease(now)
+                while self._queue and self._queue[0][0] <= now:
+                    _, _, name, version, nominal = heapq.heappop(self._queue)
+                    job = self.jobs.get(name)
+                    if job is not None and job.version == version:
+                        self._due(job, nominal, now)
+                self._start_ready()
+                timeout = min(self._queue[0][0] - now, MAX_SLEEP) if self._queue else MAX_SLEEP
+                if self.history is not None:
+                    timeout = min(timeout, self._lease_check - now)
+                self._changed.wait(max(timeout, 0))
+
+    def _renew_lease(self, now):
+        # Called with the lock held. An instance that just became the owner counts
+        # its jobs from the starts saved by the previous one.
+        self._lease_check = now + LEASE_RENEW
+        try:
+            owner = self.history.acquire_lease(self._lease_id, LEASE_SECONDS, now)
+        except sqlite3.Error as e:
+            print(f"Error while renewing the scheduler lease: {e}")
+            return
+        if owner and not self.owner:
+            starts = self._saved_starts()
+            for job in self.jobs.values():
+                if not job.running:
+                    job.last_started = max(job.last_started or 0, starts.get(job.name, 0)) or None
+                    self._anchor(job, now)
+        self.owner = owner
+
+    def _due(self, job, nominal, now):
+        if nominal is not None:
+            following = job.schedule.next_after(nominal)
+            if following <= now:
+                following = job.schedule.next_after(now)
+            self._push(job, following)
+            self._notify(job)
+            if not self.owner:
+                return
+            if now - nominal > MISSED_GRACE:
+                # Slept through it: one catch-up run for all the missed occurrences,
+                # spread over the jitter window like the other jobs waking up
+                job.coalesced += 1
+                self._push(job, nominal, catch_up=True)
+                return
+        if job.running or job.queued:
+            job.coalesced += 1
+            self._notify(job)
+            return
+        job.queued = True
+        self._ready.append(job)
+
+    def _start_ready(self):
+        while self._ready and self._running < self.max_running:
+            job = self._ready.popleft()
+            job.queued = False
+            if self.jobs.get(job.name) is not job or self._stopped:
+                continue
+            job.running = True
+            job.last_started = time.time()
+            self._running += 1
+            thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+            self._threads.add(thread)
+            thread.start()
+            self._notify(job)
+
+    def _run(self, job):
+        started = time.monotonic()
+        exit_code, error = None, None
+        if self.history is not None:
+            self.history.schedule_started(job.name, job.last_started)
+        try:
+            exit_code = self.run_job(job, lambda run: self._track(job, run))
+        except Exception as e:
+            error = str(e)
+            print(f"Error while running scheduled command {job.name}: {e}")
+        with self._changed:
+            job.running = False
+            job.runs += 1
+            job.last_duration = time.monotonic() - started
+            job.last_exit_code = exit_code
+            job.last_error = error
+            self._running -= 1
+            self._active.pop(job.name, None)
+            self._threads.discard(threading.current_thread())
+            self._changed.notify_all()
+        self._notify(job)
+
+    def _track(self, job, run):
+        with self._changed:
+            self._active[job.name] = run
+            stopped = self._stopped
+        if stopped:
+            run.stop()
+
+    def _notify(self, job):
+        if self.on_change is not None:
+            self.on_change(job)
+
+
+def format_delay(seconds):
+    # "45s", "4m 10s", "3h 5m", "2d 4h"
+    seconds = max(0, int(seconds))
+    for unit, size, sub_unit, sub_size in (("d", 86400, "h", 3600), ("h", 3600, "m", 60), ("m", 60, "s", 1)):
+        if seconds >= size:
+            return f"{seconds // size}{unit} {seconds % size // sub_size}{sub_unit}"
+    return f"{seconds}s"
+
+
+def last_result(job):
+    if job.running:
+        return "running"
+    if job.queued:
+        return "waiting for a free slot"
+    if job.last_error is not None:
+        return f"error: {job.last_error}"
+    if job.last_exit_code is None:
+        return "not run yet"
+    return f"exit {job.last_exit_code} in {job.last_duration:.1f}s"
+
+
+def run_scheduled(job, commands, history=None, archive=None, sessions=None, on_run=None):
+    # Runs a scheduled job to completion like 'run <name>' does, without showing
+    # its output; the output and timings go to the archive and run history
+    data = job.data
+    if data["env"] == WORKFLOW_ENV:
+        return run_workflow(data, commands, lambda text: None, history, archive, on_run)
+    return run_saved_command(fill(data, {}), None, sessions, None, history, job.name, archive, on_run)
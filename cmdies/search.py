@@ -0,0 +1,168 @@
+import bisect
+import heapq
+import itertools
+from collections import Counter, defaultdict
+
+from cmdies.frecency import FrecencyRanking
+
+MIN_SIMILARITY = 0.5  # Share of the query's trigrams a fuzzy match must contain
+POSTING_BUDGET = 60000  # Posting entries counted by the fuzzy pass; rare trigrams go first
+RESCORE_LIMIT = 200  # Candidates per tier that get an exact score
+PREFIX_END = "\U0010ffff"  # Appended to a prefix, sorts after every name that starts with it
+
+
+def trigrams(text):
+    return padded_trigrams(f" {text} ")
+
+
+def padded_trigrams(padded):
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CommandIndex:
+    # Type-ahead index over command names, bodies and environments. Results come
+    # in tiers, each cheaper than the next: name prefixes (sorted list), names
+    # containing every query trigram, bodies containing every query trigram, and
+    # finally a fuzzy pass that tolerates typos. Within a tier, the commands run
+    # most often and most recently come first. Indexed names are added to the
+    # ranking's order, which is shared with the command list model.
+    def __init__(self, commands=None, ranking=None):
+        self._ids = {}  # name -> id
+        self._docs = {}  # id -> (name, lowercase name, padded lowercase haystack)
+        self._name_postings = defaultdict(set)  # trigram -> ids whose name contains it
+        self._body_postings = defaultdict(set)  # trigram -> ids whose name/command/env contains it
+        self._sorted_names = []  # (lowercase name, name)
+        self._next_id = 0
+        self.ranking = ranking if ranking is not None else FrecencyRanking()
+        if commands:
+            self.build(commands)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self, commands):
+        self._ids.clear()
+        self._docs.clear()
+        self._name_postings.clear()
+        self._body_postings.clear()
+        for name, data in commands.items():
+            self._index(name, data)
+        self._sorted_names = sorted((doc[1], doc[0]) for doc in self._docs.values())
+        self.ranking.reset(commands)
+
+    def add(self, name, data):
+        # An edit keeps the name where it is in the ranking
+        if not self._unindex(name):
+            bisect.insort(self._sorted_names, (name.lower(), name))
+        self._index(name, data)
+        self.ranking.add(name)
+
+    def remove(self, name):
+        if not self._unindex(name):
+            return
+        entry = (name.lower(), name)
+        index = bisect.bisect_left(self._sorted_names, entry)
+        if index < len(self._sorted_names) and self._sorted_names[index] == entry:
+            del self._sorted_names[index]
+        self.ranking.discard(name)
+
+    def _unindex(self, name):
+        # Drops name from the trigram postings; False when it was not indexed
+        doc_id = self._ids.pop(name, None)
+        if doc_id is None:
+            return False
+        _, lower, haystack = self._docs.pop(doc_id)
+        for postings, grams in ((self._name_postings, trigrams(lower)), (self._body_postings, padded_trigrams(haystack))):
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is not None:
+                    posting.discard(doc_id)
+                    if not posting:
+                        del postings[gram]
+        return True
+
+    def _index(self, name, data):
+        doc_id = self._next_id
+        self._next_id += 1
+        lower = name.lower()
+        haystack = f" {lower} {data['command']} {data['env']} ".lower()
+        self._ids[name] = doc_id
+        self._docs[doc_id] = (name, lower, haystack)
+        for gram in trigrams(lower):
+            self._name_postings[gram].add(doc_id)
+        for gram in padded_trigrams(haystack):
+            self._body_postings[gram].add(doc_id)
+
+    def search(self, query, k=10):
+        query = query.strip().lower()
+        if not query:
+            return []
+        results = self._prefix_matches(query, k)
+        if len(results) >= k or len(query) < 3:
+            return results
+
+        # The query is not padded: it may start or end mid-word
+        grams = padded_trigrams(query)
+        seen = set(self._ids[name] for name in results)
+        for candidates in (self._all_grams(self._name_postings, grams), self._all_grams(self._body_postings, grams)):
+            results.extend(self._rank(candidates - seen, query, grams, k - len(results)))
+            seen.update(self._ids[name] for name in results)
+            if len(results) >= k:
+                return results
+        results.extend(self._rank(self._fuzzy(grams) - seen, query, grams, k - len(results), fuzzy=True))
+        return results
+
+    def _prefix_matches(self, query, k):
+        # The k best ranked names starting with the query. When more than k names
+        # match, walking the ranking from the top finds k of them after about
+        # k * n / count names, so it is tried first; sorting the matches by rank
+        # bounds the work at count names either way.
+        start = bisect.bisect_left(self._sorted_names, (query, ""))
+        end = bisect.bisect_left(self._sorted_names, (query + PREFIX_END,), start)
+        count = end - start
+        if count > k:
+            results = []
+            for _, lower, name in itertools.islice(self.ranking.order, count):
+                if lower.startswith(query):
+                    results.append(name)
+                    if len(results) == k:
+                        return results
+        keys = heapq.nsmallest(k, (self.ranking.sort_key(name) for _, name in self._sorted_names[start:end]))
+        return [name for _, _, name in keys]
+
+    def _all_grams(self, postings, grams):
+        sets = sorted((postings.get(gram, set()) for gram in grams), key=len)
+        if not sets or not sets[0]:
+            return set()
+        return sets[0].intersection(*sets[1:])
+
+    def _fuzzy(self, grams):
+        # Counts trigram hits over the rarest postings that fit in the budget
+        sets = sorted((self._body_postings[gram] for gram in grams if gram in self._body_postings), key=len)
+        used = []
+        scanned = 0
+        for posting in sets:
+            if used and scanned + len(posting) > POSTING_BUDGET:
+                break
+            used.append(posting)
+            scanned += len(posting)
+        needed = max(1, int(len(grams) * MIN_SIMILARITY) - (len(sets) - len(used)))
+        hits = Counter(itertools.chain.from_iterable(used))
+        return {doc_id for doc_id, count in hits.items() if count >= needed}
+
+    def _rank(self, candidates, query, grams, k, fuzzy=False):
+        if k <= 0 or not candidates:
+            return []
+        if len(candidates) > RESCORE_LIMIT:
+            candidates = sorted(candidates)[:RESCORE_LIMIT]
+        scored = []
+        for doc_id in candidates:
+            name, lower, haystack = self._docs[doc_id]
+            if fuzzy:
+                score = sum(gram in haystack for gram in grams) / len(grams)
+                if score < MIN_SIMILARITY:
+                    continue
+            else:
+                score = 2.0 if query in lower else 1.0 if query in haystack else 0.5
+            scored.append((score, self.ranking.score(name), -len(lower), name))
+        return [name for _, _, _, name in heapq.nlargest(k, scored)]
@@ -0,0 +1,209 @@
+import base64
+import queue
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+
+from cmdies.processes import group_popen_kwargs, kill_tree
+
+SESSION_ENVIRONMENTS = ("PowerShell", "Bash")
+
+MAX_IDLE_SESSIONS = 4  # Warm sessions kept per environment between runs
+SESSION_START_TIMEOUT = 15  # Seconds a fresh interpreter gets to answer its first ping
+SESSION_PING_AFTER = 60  # Idle seconds after which a session is probed before reuse
+SESSION_PING_TIMEOUT = 2
+
+PING_COMMANDS = {"Bash": ":", "PowerShell": "$null"}
+
+
+class SessionError(Exception):
+    pass
+
+
+class SessionUnavailable(SessionError):
+    # The command never reached the session, so it can safely run elsewhere
+    pass
+
+
+def session_argv(env):
+    if env == "Bash":
+        return ["bash", "--noprofile", "--norc"]
+    if env == "PowerShell":
+        return ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"]
+    raise ValueError(f"No persistent session for environment: {env}")
+
+
+def wrap_command(command, env, marker):
+    # Runs the command and then prints "<marker><exit code>" on a line of its own
+    if env == "Bash":
+        # The command is handed to eval as one quoted word, so a syntax error in it
+        # is reported by eval and cannot swallow the sentinel. The subshell keeps
+        # cd/exit/variables from leaking into the session and stdin is detached so
+        # the command cannot swallow the next request.
+        return f"( eval {shlex.quote(command)} ) < /dev/null 2>&1; printf '\\n{marker}%s\\n' \"$?\"\n"
+    if env == "PowerShell":
+        # The command is base64-encoded so multi-line scripts fit on one stdin line
+        encoded = base64.b64encode(command.encode("utf-8")).decode("ascii")
+        return (
+            "$global:LASTEXITCODE = 0; $cmdiesOk = $true; "
+            f"try {{ Invoke-Expression ([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{encoded}'))) 2>&1 | Out-String -Stream }} "
+            "catch { $_ | Out-String -Stream; $cmdiesOk = $false }; "
+            "$cmdiesCode = if (-not $cmdiesOk) { 1 } elseif ($LASTEXITCODE) { $LASTEXITCODE } else { 0 }; "
+            f"[Console]::Out.Write(\"`n{marker}$cmdiesCode`n\"); [Console]::Out.Flush()\n"
+        )
+    raise ValueError(f"No persistent session for environment: {env}")
+
+
+class ShellSession:
+    # A long-lived interpreter fed over stdin; each command's output ends with a
+    # sentinel line carrying its exit code
+    def __init__(self, env):
+        self.env = env
+        self.broken = False
+        self.last_used = time.monotonic()
+        self.process = subprocess.Popen(
+            session_argv(env),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True, errors="replace", bufsize=1, **group_popen_kwargs()
+        )
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def is_alive(self):
+        return not self.broken and self.process.poll() is None
+
+    def ping(self, timeout):
+        try:
+            return self.run(PING_COMMANDS[self.env], timeout=timeout) == 0
+        except SessionError:
+            return False
+
+    def run(self, command, on_output=None, timeout=None):
+        marker = f"__CMDIES_{uuid.uuid4().hex}__"
+        try:
+            self.process.stdin.write(wrap_command(command, self.env, marker))
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self.broken = True
+            raise SessionUnavailable(f"{self.env} session is not accepting commands: {e}")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # The sentinel is printed after a newline of its own, so the last newline
+        # read before it does not belong to the command output
+        held_newline = False
+        while True:
+            try:
+                remaining = None if deadline is None else max(0, deadline - time.monotonic())
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                self.broken = True
+                raise SessionError(f"{self.env} session did not answer in time")
+            if line is None:
+                self.broken = True
+                raise SessionError(f"{self.env} session exited unexpectedly")
+
+            if line.startswith(marker):
+                self.last_used = time.monotonic()
+                try:
+                    return int(line[len(marker):].strip())
+                except ValueError:
+                    return 1
+
+            text = "\n" if held_newline else ""
+            held_newline = line.endswith("\n")
+            text += line[:-1] if held_newline else line
+            if text and on_output is not None:
+                on_output(text)
+
+    def kill(self):
+        # Kills the interpreter and everything the current command started
+        self.broken = True
+        kill_tree(self.process)
+
+    def close(self):
+        self.broken = True
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        kill_tree(self.process)
+        self.process.wait()
+
+
+class SessionPool:
+    # Hands out warm sessions per environment and replaces dead or wedged ones
+    def __init__(self, max_idle=MAX_IDLE_SESSIONS):
+        self.max_idle = max_idle
+        self._idle = {env: [] for env in SESSION_ENVIRONMENTS}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def supports(self, env):
+        return env in SESSION_ENVIRONMENTS and shutil.which(session_argv(env)[0]) is not None
+
+    def warm(self, envs):
+        # Starts one idle session per environment in the background
+        for env in envs:
+            if self.supports(env):
+                threading.Thread(target=self._warm_one, args=(env,), daemon=True).start()
+
+    def _warm_one(self, env):
+        try:
+            session = self._start(env)
+        except (OSError, SessionError):
+            return
+        self.release(session)
+
+    def _start(self, env):
+        session = ShellSession(env)
+        if not session.ping(SESSION_START_TIMEOUT):
+            session.close()
+            raise SessionError(f"{env} session failed to start")
+        return session
+
+    def acquire(self, env):
+        while True:
+            with self._lock:
+                idle = self._idle[env]
+                session = idle.pop() if idle else None
+            if session is None:
+                return self._start(env)
+            if not session.is_alive():
+                session.close()
+                continue
+            if time.monotonic() - session.last_used > SESSION_PING_AFTER and not session.ping(SESSION_PING_TIMEOUT):
+                session.close()
+                continue
+            return session
+
+    def release(self, session):
+        with self._lock:
+            if not self._closed and session.is_alive() and len(self._idle[session.env]) < self.max_idle:
+                self._idle[session.env].append(session)
+                return
+        session.close()
+
+    def run(self, command, env, on_output=None, timeout=None):
+        session = self.acquire(env)
+        try:
+            return session.run(command, on_output, timeout)
+        finally:
+            self.release(session)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            sessions = [session for idle in self._idle.values() for session in idle]
+            for idle in self._idle.values():
+                idle.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,157 @@
+import hashlib
+import heapq
+import os
+import re
+
+MAX_TRACKED = 5000  # Distinct commands counted at once; memory stays bounded by this
+DEFAULT_PROPOSALS = 50
+MAX_COMMAND_LENGTH = 2000  # Longer entries are pasted scripts, not commands worth saving
+NAME_WORDS = 4  # Words of the command used for an automatic name
+MAX_NAME_LENGTH = 40
+
+# Commands that are typed constantly but never worth saving
+TRIVIAL_COMMANDS = {"cd", "ls", "ll", "la", "dir", "pwd", "clear", "cls", "exit", "history", "man", "help"}
+PREFIXES = {"sudo", "doas", "time", "nohup", "env"}  # Skipped when naming
+
+BASH_TIMESTAMP = re.compile(r"#\d{9,}$")
+NAME_WORD = re.compile(r"[A-Za-z0-9][\w.+-]*")
+
+
+def default_history_files():
+    # [(path, env)] for the Bash and PSReadLine histories that exist on this machine
+    home = os.path.expanduser("~")
+    candidates = [(os.environ.get("HISTFILE") or os.path.join(home, ".bash_history"), "Bash")]
+    if os.name == "nt":
+        appdata = os.environ.get("APPDATA", os.path.join(home, "AppData", "Roaming"))
+        candidates.append(
+            (os.path.join(appdata, "Microsoft", "Windows", "PowerShell", "PSReadLine", "ConsoleHost_history.txt"), "PowerShell")
+        )
+    else:
+        candidates.append(
+            (os.path.join(home, ".local", "share", "powershell", "PSReadLine", "ConsoleHost_history.txt"), "PowerShell")
+        )
+    return [(path, env) for path, env in candidates if os.path.isfile(path)]
+
+
+def guess_env(path):
+    return "PowerShell" if "psreadline" in path.lower() or path.lower().endswith("_history.txt") else "Bash"
+
+
+def read_history(path, env):
+    # Yields commands one at a time without loading the file. Bash timestamp
+    # comments are skipped; PSReadLine continues a command on the next line
+    # when a line ends with a backtick.
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        continued = []
+        for line in f:
+            line = line.rstrip("\r\n")
+            if env == "PowerShell":
+                if line.endswith("`"):
+                    continued.append(line[:-1])
+                    continue
+                if continued:
+                    continued.append(line)
+                    line = "\n".join(continued)
+                    continued = []
+            elif BASH_TIMESTAMP.match(line):
+                continue
+            yield line
+        if continued:
+            yield "\n".join(continued)
+
+
+def worth_saving(command):
+    words = command.split(None, 1)
+    return bool(words) and words[0] not in TRIVIAL_COMMANDS and len(command) <= MAX_COMMAND_LENGTH
+
+
+class HistoryCounter:
+    # Counts how often and how recently each distinct command was run. Entries are
+    # keyed by a hash of the command text; when more than twice max_tracked
+    # commands are counted, only the max_tracked most frequent are kept, so memory
+    # stays bounded and the counts of rare commands are approximate.
+    def __init__(self, max_tracked=MAX_TRACKED):
+        self.max_tracked = max_tracked
+        self.entries = {}  # digest -> [count, last position, command, env]
+        self.position = 0
+        self.lines = 0
+
+    def add(self, command, env):
+        self.lines += 1
+        command = command.strip()
+        if not worth_saving(command):
+            return
+        self.position += 1
+        digest = hashlib.blake2b(f"{env}\0{command}".encode("utf-8", "replace"), digest_size=16).digest()
+        entry = self.entries.get(digest)
+        if entry is not None:
+            entry[0] += 1
+            entry[1] = self.position
+            return
+        self.entries[digest] = [1, self.position, command, env]
+        if len(self.entries) > 2 * self.max_tracked:
+            self._prune()
+
+    def _prune(self):
+        kept = heapq.nlargest(self.max_tracked, self.entries.items(), key=lambda item: (item[1][0], item[1][1]))
+        self.entries = dict(kept)
+
+    def add_file(self, path, env):
+        for command in read_history(path, env):
+            self.add(command, env)
+
+    def top(self, limit):
+        # [{"command", "env", "count", "ago"}], most frequent first, ties by most
+        # recent; ago counts the commands run since the last use
+        ranked = sorted(self.entries.values(), key=lambda entry: (entry[0], entry[1]), reverse=True)
+        return [
+            {"command": command, "env": env, "count": count, "ago": self.position - position}
+            for count, position, command, env in ranked[:limit]
+        ]
+
+
+def auto_name(command, taken):
+    # A short slug from the program and its first plain arguments, e.g.
+    # "sudo apt-get update" -> "apt-get-update", made unique against taken
+    words = []
+    for word in command.split():
+        if not words and (word in PREFIXES or "=" in word):
+            continue
+        if word.startswith("-") or word in ("|", "&&", "||", ";", ">", ">>", "<"):
+            if words:
+                break
+            continue
+        # Programs given by path are named by their file name
+        word = os.path.splitext(os.path.basename(word.rstrip("/\\")))[0] if not words else word
+        match = NAME_WORD.match(word)
+        if match is None or match.end() != len(word):
+            if words:
+                break
+            continue
+        words.append(word.lower())
+        if len(words) == NAME_WORDS:
+            break
+    base = "-".join(words)[:MAX_NAME_LENGTH].strip("-") or "command"
+    name = base
+    suffix = 2
+    while name in taken:
+        name = f"{base}-{suffix}"
+        suffix += 1
+    return name
+
+
+def propose(counter, commands, limit=DEFAULT_PROPOSALS):
+    # [(name, data, count, ago)] for the most used commands that are not in
+    # the library yet, with automatic names that do not clash with it
+    saved = {(data["command"].strip(), data["env"]) for data in commands.values()}
+    taken = set(commands)
+    proposals = []
+    for entry in counter.top(limit + len(saved)):
+        if (entry["command"], entry["env"]) in saved:
+            continue
+        name = auto_name(entry["command"], taken)
+        taken.add(name)
+        proposals.append((name, {"command": entry["command"], "env": entry["env"]}, entry["count"], entry["ago"]))
+        if len(proposals) == limit:
+            break
+    return proposals
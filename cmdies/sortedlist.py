@@ -0,0 +1,142 @@
+import bisect
+import itertools
+
+BLOCK_SIZE = 1000  # Items per block after a split; a block splits at twice this
+
+
+class SortedList:
+    # A sorted sequence stored as a list of blocks, as in sortedcontainers:
+    # an add or remove bisects the block maxima and then shifts the items of a
+    # single block. A Fenwick tree over the block sizes maps positions to
+    # (block, offset) and back in O(log n). Splitting a block or dropping an
+    # empty one rebuilds the tree, once every BLOCK_SIZE changes at most.
+    def __init__(self, values=()):
+        values = sorted(values)
+        self._blocks = [values[i:i + BLOCK_SIZE] for i in range(0, len(values), BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(values)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._blocks)
+
+    def __contains__(self, value):
+        block = bisect.bisect_left(self._maxes, value)
+        if block == len(self._maxes):
+            return False
+        items = self._blocks[block]
+        return items[bisect.bisect_left(items, value)] == value
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("SortedList index out of range")
+        block, offset = self._locate(index)
+        return self._blocks[block][offset]
+
+    def add(self, value):
+        if not self._blocks:
+            self._blocks.append([value])
+            self._maxes.append(value)
+            self._len = 1
+            self._build_tree()
+            return
+        block = bisect.bisect_right(self._maxes, value)
+        if block == len(self._maxes):
+            block -= 1
+            self._blocks[block].append(value)
+            self._maxes[block] = value
+        else:
+            bisect.insort(self._blocks[block], value)
+        self._len += 1
+        if len(self._blocks[block]) > 2 * BLOCK_SIZE:
+            items = self._blocks[block]
+            self._blocks[block:block + 1] = [items[:BLOCK_SIZE], items[BLOCK_SIZE:]]
+            self._maxes[block:block + 1] = [items[BLOCK_SIZE - 1], items[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(block, 1)
+
+    def remove(self, value):
+        block = bisect.bisect_left(self._maxes, value)
+        items = self._blocks[block] if block < len(self._blocks) else []
+        offset = bisect.bisect_left(items, value)
+        if offset == len(items) or items[offset] != value:
+            raise ValueError(f"{value!r} not in SortedList")
+        del items[offset]
+        self._len -= 1
+        if items:
+            self._maxes[block] = items[-1]
+            self._tree_add(block, -1)
+        else:
+            del self._blocks[block]
+            del self._maxes[block]
+            self._build_tree()
+
+    def discard(self, value):
+        try:
+            self.remove(value)
+        except ValueError:
+            pass
+
+    def bisect_left(self, value):
+        block = bisect.bisect_left(self._maxes, value)
+        if block == len(self._maxes):
+            return self._len
+        return self._position(block) + bisect.bisect_left(self._blocks[block], value)
+
+    def index(self, value):
+        position = self.bisect_left(value)
+        if position == self._len or self[position] != value:
+            raise ValueError(f"{value!r} not in SortedList")
+        return position
+
+    def islice(self, start=0):
+        # The items from position start on, without copying
+        if start >= self._len:
+            return iter(())
+        block, offset = self._locate(start)
+        return itertools.chain(
+            itertools.islice(self._blocks[block], offset, None),
+            itertools.chain.from_iterable(itertools.islice(self._blocks, block + 1, None))
+        )
+
+    def _build_tree(self):
+        # tree[i] holds the sizes of blocks (i - lowbit(i), i], 1-based
+        tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, block, delta):
+        i = block + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _position(self, block):
+        # Number of items in the blocks before block
+        total = 0
+        i = block
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        # Skips whole blocks for as long as they end at or before index
+        block = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            following = block + step
+            if following < len(self._tree) and self._tree[following] <= index:
+                block = following
+                index -= self._tree[following]
+            step >>= 1
+        return block, index
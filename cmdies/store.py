@@ -0,0 +1,240 @@
+import atexit
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+
+FLUSH_DELAY = 0.5  # Seconds of write-behind: edits made within this window share one transaction
+BUSY_TIMEOUT = 5  # Seconds to wait for another instance's write lock
+
+SCHEMA_VERSION = 2
+
+
+def parse_legacy_line(line):
+    # Legacy commandes.txt format: "<name>:<command>|<env>"
+    line = line.strip()
+    if not line or ":" not in line:
+        return None
+    name, cmd_env = line.split(":", 1)
+    if "|" not in cmd_env:
+        return None
+    cmd, env = cmd_env.rsplit("|", 1)
+    return name.strip(), {"command": cmd.strip(), "env": env.strip()}
+
+
+def split_options(data):
+    options = {key: value for key, value in data.items() if key not in ("command", "env")}
+    return data["command"], data["env"], json.dumps(options) if options else "{}"
+
+
+def join_options(command, env, options):
+    data = {"command": command, "env": env}
+    if options != "{}":
+        data.update(json.loads(options))
+    return data
+
+
+class CommandStore:
+    # SQLite-backed command library. Each add/delete touches only its own row;
+    # edits are queued and written behind in one atomic transaction. Every write
+    # bumps a revision counter so other instances can fetch just what changed.
+    # Opening is cheap; the legacy text file is imported on the first load().
+    def __init__(self, path, legacy_path=None, flush_delay=FLUSH_DELAY):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.flush_delay = flush_delay
+        self.seen_rev = 0  # Newest revision this instance has applied
+        self._lock = threading.RLock()
+        self._pending = {}  # name -> data, or None for a delete
+        self._timer = None
+        self._data_version = None
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        atexit.register(self.close)
+
+    def _migrate(self):
+        with self._transaction():
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS commands ("
+                    "name TEXT PRIMARY KEY, command TEXT NOT NULL, env TEXT NOT NULL, "
+                    "options TEXT NOT NULL DEFAULT '{}')"
+                )
+                self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            if version < 2:
+                # Revisions and tombstones for incremental reloads across instances
+                self._conn.execute("ALTER TABLE commands ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS commands_rev ON commands (rev)")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS deleted (name TEXT PRIMARY KEY, rev INTEGER NOT NULL)")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS deleted_rev ON deleted (rev)")
+                self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('rev', '0')")
+            if version < SCHEMA_VERSION:
+                self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    @contextlib.contextmanager
+    def _transaction(self, write=True):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _import_legacy(self, legacy_path):
+        # Imports the old text library once; rows already in the database win
+        if not os.path.exists(legacy_path):
+            return
+        key = f"legacy_imported:{os.path.abspath(legacy_path)}"
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return
+            rows = []
+            try:
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        entry = parse_legacy_line(line)
+                        if entry is not None:
+                            rows.append((entry[0],) + split_options(entry[1]))
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error while importing {legacy_path}: {e}")
+                return
+            with self._transaction():
+                # Another instance may have imported it while this one was reading
+                if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                    return
+                rev = self._next_rev()
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO commands (name, command, env, options, rev) VALUES (?, ?, ?, ?, ?)",
+                    [row + (rev,) for row in rows]
+                )
+                self._conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(len(rows))))
+
+    def _current_rev(self):
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = 'rev'").fetchone()[0])
+
+    def _next_rev(self):
+        rev = self._current_rev() + 1
+        self._conn.execute("UPDATE meta SET value = ? WHERE key = 'rev'", (str(rev),))
+        return rev
+
+    def load(self):
+        commands = {}
+        with self._lock:
+            if self.legacy_path:
+                self._import_legacy(self.legacy_path)
+                self.legacy_path = None
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            with self._transaction(write=False):
+                self.seen_rev = self._current_rev()
+                rows = self._conn.execute("SELECT name, command, env, options FROM commands").fetchall()
+            for name, command, env, options in rows:
+                commands[name] = join_options(command, env, options)
+            for name, data in self._pending.items():
+                if data is None:
+                    commands.pop(name, None)
+                else:
+                    commands[name] = dict(data)
+        return commands
+
+    def put(self, name, data):
+        self.put_many({name: data})
+
+    def put_many(self, entries):
+        with self._lock:
+            for name, data in entries.items():
+                self._pending[name] = dict(data)
+            self._schedule_flush()
+
+    def delete(self, name):
+        self.delete_many([name])
+
+    def delete_many(self, names):
+        with self._lock:
+            for name in names:
+                self._pending[name] = None
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._timer = None
+            if not self._pending or self._conn is None:
+                return
+            pending, self._pending = self._pending, {}
+            upserts = [(name,) + split_options(data) for name, data in pending.items() if data is not None]
+            deletes = [(name,) for name, data in pending.items() if data is None]
+            try:
+                with self._transaction():
+                    rev = self._next_rev()
+                    self._conn.executemany(
+                        "INSERT INTO commands (name, command, env, options, rev) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET command = excluded.command, env = excluded.env, "
+                        "options = excluded.options, rev = excluded.rev",
+                        [row + (rev,) for row in upserts]
+                    )
+                    self._conn.executemany("DELETE FROM deleted WHERE name = ?", [row[:1] for row in upserts])
+                    self._conn.executemany("DELETE FROM commands WHERE name = ?", deletes)
+                    self._conn.executemany(
+                        "INSERT INTO deleted (name, rev) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET rev = excluded.rev",
+                        [row + (rev,) for row in deletes]
+                    )
+                # Nothing foreign was committed in between, so our own write needs no reload
+                if rev == self.seen_rev + 1:
+                    self.seen_rev = rev
+            except sqlite3.Error as e:
+                print(f"Error while saving commands: {e}")
+                # Keep the failed edits queued unless they were superseded meanwhile
+                for name, data in pending.items():
+                    self._pending.setdefault(name, data)
+                self._schedule_flush()
+
+    def has_external_changes(self):
+        # data_version only moves when another connection commits, so polling is cheap
+        with self._lock:
+            if self._conn is None:
+                return False
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = version != self._data_version
+            self._data_version = version
+            return changed
+
+    def changes_since(self, rev=None):
+        # Returns ({name: data} added or changed, [deleted names]) since rev and
+        # marks them as seen. Names with unsaved local edits are left out.
+        with self._lock:
+            if rev is None:
+                rev = self.seen_rev
+            with self._transaction(write=False):
+                current = self._current_rev()
+                rows = self._conn.execute(
+                    "SELECT name, command, env, options FROM commands WHERE rev > ?", (rev,)
+                ).fetchall()
+                deleted = [row[0] for row in self._conn.execute("SELECT name FROM deleted WHERE rev > ?", (rev,))]
+            self.seen_rev = max(self.seen_rev, current)
+            changed = {
+                name: join_options(command, env, options)
+                for name, command, env, options in rows if name not in self._pending
+            }
+            deleted = [name for name in deleted if name not in self._pending]
+        return changed, deleted
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
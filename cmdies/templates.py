@@ -0,0 +1,82 @@
+import csv
+import json
+import re
+
+# {{name}} or {{name|default}}
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*(?:\|([^{}]*))?\}\}")
+
+
+class TemplateError(Exception):
+    pass
+
+
+def is_template(command):
+    return PLACEHOLDER.search(command) is not None
+
+
+def placeholders(command):
+    # [(name, default or None)] in order of first appearance
+    found = {}
+    for match in PLACEHOLDER.finditer(command):
+        found.setdefault(match.group(1), match.group(2).strip() if match.group(2) is not None else None)
+    return list(found.items())
+
+
+def render(command, values):
+    def replace(match):
+        name, default = match.group(1), match.group(2)
+        value = values.get(name)
+        if value is None or value == "":
+            if default is None:
+                raise TemplateError(f"No value for {{{{{name}}}}}")
+            return default.strip()
+        return value
+
+    return PLACEHOLDER.sub(replace, command)
+
+
+def parse_matrix(text, names):
+    # One row of values per line: CSV whose header names the placeholders, CSV
+    # in placeholder order, or a bare value per line for a single placeholder
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+    rows = list(csv.reader(lines, skipinitialspace=True))
+    header = [field.strip() for field in rows[0]]
+    if header and all(field in names for field in header):
+        columns, rows = header, rows[1:]
+    elif len(names) == 1:
+        return [{names[0]: line.strip()} for line in lines]
+    else:
+        columns = names
+    items = []
+    for number, row in enumerate(rows, 2 if columns is header else 1):
+        if len(row) > len(columns):
+            raise TemplateError(f"Line {number}: {len(row)} values for {len(columns)} placeholders")
+        items.append({column: value.strip() for column, value in zip(columns, row)})
+    return items
+
+
+def item_label(values):
+    if len(values) == 1:
+        return next(iter(values.values()))
+    return ", ".join(f"{name}={value}" for name, value in values.items())
+
+
+def fill(data, values):
+    # A copy of a saved command with its placeholders filled in
+    if not is_template(data["command"]):
+        return data
+    return dict(data, command=render(data["command"], values))
+
+
+def export_results(path, rows):
+    # Per-item results of a matrix run; CSV or JSON by file extension
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".json"):
+            json.dump(rows, f, indent=2)
+        else:
+            fields = list(dict.fromkeys(key for row in rows for key in row))
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
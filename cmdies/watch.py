@@ -0,0 +1,114 @@
+import difflib
+import threading
+import time
+
+from cmdies.ansi import strip_ansi
+from cmdies.runner import CommandRun, command_options
+
+DEFAULT_INTERVAL = 2.0  # Seconds between the starts of two watch runs
+MAX_WATCH_LINES = 10000  # Lines of each run that are compared and shown
+
+
+def line_changes(old, new):
+    # [(tag, i1, i2, j1, j2)] turning old lines into new ones, like difflib's
+    # opcodes without the "equal" runs
+    if old == new:
+        return []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [opcode for opcode in matcher.get_opcodes() if opcode[0] != "equal"]
+
+
+class WatchUpdate:
+    # The result of one watch run and how its lines differ from the run before
+    def __init__(self, number, lines, changes, exit_code, elapsed, skipped, truncated):
+        self.number = number
+        self.lines = lines
+        self.changes = changes
+        self.exit_code = exit_code
+        self.elapsed = elapsed
+        self.skipped = skipped  # Ticks skipped so far because a run was still going
+        self.truncated = truncated
+
+    def counts(self):
+        # (lines added, removed, changed)
+        added = removed = changed = 0
+        for tag, i1, i2, j1, j2 in self.changes:
+            common = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+            changed += common
+            added += j2 - j1 - common
+            removed += i2 - i1 - common
+        return added, removed, changed
+
+
+class CommandWatch:
+    # Re-runs a saved command every interval seconds, measured from start to
+    # start. A tick that comes while the previous run is still going is skipped
+    # rather than queued. Once a run ends, its output is compared line by line
+    # with the previous one on the run's reader thread, and on_update gets a
+    # WatchUpdate there. Colors are dropped so only the text is compared.
+    def __init__(self, data, on_update, interval=DEFAULT_INTERVAL, sessions=None, max_lines=MAX_WATCH_LINES):
+        self.data = data
+        self.on_update = on_update
+        self.interval = interval
+        self.sessions = sessions
+        self.max_lines = max_lines
+        self.run = None
+        self.runs = 0
+        self.skipped = 0
+        self._previous = []
+        self._chunks = []
+        self._in_flight = False  # Until the run's output has been compared, not just until it exits
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Stops the ticks and the run in flight
+        self._stopped.set()
+        run = self.run
+        if run is not None:
+            run.stop()
+
+    def is_active(self):
+        return not self._stopped.is_set()
+
+    def _loop(self):
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            if self._in_flight:
+                self.skipped += 1
+            else:
+                self._start_run()
+            next_tick += self.interval
+            # A stalled loop ticks once right away rather than once per missed tick
+            next_tick = max(next_tick, time.monotonic())
+            self._stopped.wait(next_tick - time.monotonic())
+
+    def _start_run(self):
+        self._chunks = []
+        self._in_flight = True
+        self.run = CommandRun(
+            self.data["command"], self.data["env"], on_output=self._chunks.append, on_finished=self._finished,
+            sessions=self.sessions, **command_options(self.data)
+        )
+        self.run.start()
+
+    def _finished(self, exit_code):
+        try:
+            if not self._stopped.is_set():
+                self._compare(exit_code)
+        finally:
+            self._in_flight = False
+
+    def _compare(self, exit_code):
+        lines = strip_ansi("".join(self._chunks)).splitlines()
+        truncated = len(lines) > self.max_lines
+        if truncated:
+            lines = lines[:self.max_lines]
+        changes = line_changes(self._previous, lines)
+        self._previous = lines
+        self.runs += 1
+        self.on_update(WatchUpdate(self.runs, lines, changes, exit_code, self.run.elapsed(), self.skipped, truncated))
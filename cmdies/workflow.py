@@ -0,0 +1,325 @@
+import os
+import re
+import shlex
+import threading
+import time
+
+from cmdies.runner import CommandRun, command_options
+from cmdies.templates import TemplateError, fill
+
+WORKFLOW_ENV = "Workflow"  # Saved commands with this environment hold a workflow definition
+DEFAULT_MAX_STEPS = 4  # Steps running at once; a pipe always starts whole
+
+STEP_ID = re.compile(r"[\w.-]+")
+KEYWORDS = ("after", "on-failure", "<")
+
+WAITING = "Waiting"
+RUNNING = "Running"
+OK = "OK"
+FAILED = "Failed"
+SKIPPED = "Skipped"
+STOPPED = "Stopped"
+FINAL_STATES = (OK, FAILED, SKIPPED, STOPPED)
+
+
+class WorkflowError(Exception):
+    pass
+
+
+class Step:
+    # One line of a workflow: step = command [after a, b] [on-failure c] [< d]
+    def __init__(self, step_id, command_name, line):
+        self.id = step_id
+        self.command_name = command_name
+        self.line = line
+        self.after = []  # Steps that must succeed first
+        self.on_failure = []  # Steps that must fail first
+        self.stdin_from = None  # Step whose stdout is piped into this one
+        self.consumer = None  # Step reading this one's stdout
+        self.stage = 0  # Longest chain of dependencies before this step
+        self.mid_line = False  # The last output chunk did not end a line
+        self.state = WAITING
+        self.run = None
+
+    def prefix_lines(self, text):
+        # Prefixes each output line with the step id; a chunk may continue the last line
+        lines = text.splitlines(True)
+        prefixed = "".join(
+            line if index == 0 and self.mid_line else f"[{self.id}] {line}" for index, line in enumerate(lines)
+        )
+        self.mid_line = not text.endswith("\n")
+        return prefixed
+
+    def depends_text(self):
+        parts = []
+        if self.after:
+            parts.append("after " + ", ".join(self.after))
+        if self.on_failure:
+            parts.append("on failure of " + ", ".join(self.on_failure))
+        if self.stdin_from:
+            parts.append("reads " + self.stdin_from)
+        return "; ".join(parts)
+
+
+def parse_workflow(text):
+    # Returns the steps in dependency order. Blank lines and # comments are
+    # ignored; command names with spaces can be quoted.
+    steps = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.strip().startswith("#"):
+            continue
+        step_id, sep, rest = line.partition("=")
+        step_id = step_id.strip()
+        if not sep or not STEP_ID.fullmatch(step_id):
+            raise WorkflowError(f"Line {number}: expected 'step = command [after a, b] [on-failure c] [< d]'")
+        if step_id in steps:
+            raise WorkflowError(f"Line {number}: step '{step_id}' is defined twice")
+        try:
+            tokens = shlex.split(rest, comments=True)
+        except ValueError as e:
+            raise WorkflowError(f"Line {number}: {e}")
+        if not tokens or tokens[0] in KEYWORDS:
+            raise WorkflowError(f"Line {number}: step '{step_id}' has no command")
+
+        step = Step(step_id, tokens[0], number)
+        clause = None
+        for token in tokens[1:]:
+            if token in KEYWORDS:
+                clause = token
+                continue
+            if token.startswith("<"):
+                clause, token = "<", token[1:]
+            if clause is None:
+                raise WorkflowError(f"Line {number}: unexpected '{token}'")
+            names = [name for name in token.split(",") if name]
+            if clause == "after":
+                step.after += names
+            elif clause == "on-failure":
+                step.on_failure += names
+            elif step.stdin_from is not None or len(names) != 1:
+                raise WorkflowError(f"Line {number}: a step reads the output of a single step")
+            else:
+                step.stdin_from = names[0]
+        steps[step_id] = step
+    if not steps:
+        raise WorkflowError("The workflow has no steps.")
+    return order_steps(steps)
+
+
+def order_steps(steps):
+    for step in steps.values():
+        for name in step.after + step.on_failure + ([step.stdin_from] if step.stdin_from else []):
+            if name not in steps:
+                raise WorkflowError(f"Line {step.line}: unknown step '{name}'")
+            if name == step.id:
+                raise WorkflowError(f"Line {step.line}: step '{step.id}' depends on itself")
+        if step.stdin_from is not None:
+            if step.after or step.on_failure:
+                raise WorkflowError(
+                    f"Line {step.line}: '{step.id}' starts together with '{step.stdin_from}'; "
+                    "put its dependencies on the first step of the pipe"
+                )
+            source = steps[step.stdin_from]
+            if source.consumer is not None:
+                raise WorkflowError(f"Line {step.line}: the output of '{source.id}' already goes to '{source.consumer}'")
+            source.consumer = step.id
+
+    # Kahn's algorithm, keeping the definition order among ready steps
+    dependents = {name: [] for name in steps}
+    missing = {}
+    for step in steps.values():
+        parents = set(step.after + step.on_failure + ([step.stdin_from] if step.stdin_from else []))
+        missing[step.id] = len(parents)
+        for parent in parents:
+            dependents[parent].append(step.id)
+    ready = [name for name in steps if not missing[name]]
+    ordered = []
+    while ready:
+        step = steps[ready.pop(0)]
+        ordered.append(step)
+        for name in dependents[step.id]:
+            child = steps[name]
+            # A piped step runs alongside its source, not after it
+            child.stage = max(child.stage, step.stage + (0 if child.stdin_from == step.id else 1))
+            missing[name] -= 1
+            if not missing[name]:
+                ready.append(name)
+    if len(ordered) < len(steps):
+        cycle = sorted(name for name in steps if missing[name])
+        raise WorkflowError(f"The steps {', '.join(cycle)} depend on each other in a cycle")
+    return ordered
+
+
+class WorkflowRun:
+    # Runs the steps of a workflow. A step starts once every 'after' step succeeded
+    # and every 'on-failure' step failed, and is skipped when that can no longer
+    # happen. A step reading another's output starts together with it, joined by
+    # an OS pipe, so the data never passes through this process. At most
+    # max_parallel steps run at once. Callbacks come from the step threads:
+    # on_output(step, text) for output and stderr of piped steps, on_state(step).
+    def __init__(self, steps, commands, on_output=None, on_state=None, history=None, archive=None,
+                 max_parallel=DEFAULT_MAX_STEPS):
+        self.steps = steps
+        self.by_id = {step.id: step for step in steps}
+        self.on_output = on_output
+        self.on_state = on_state
+        self.history = history
+        self.archive = archive
+        self.max_parallel = max_parallel
+        self.stopped = False
+        self.started_at = None
+        self.ended_at = None
+        self._running = 0
+        self._changed = threading.Condition()
+
+        # Every step is checked before anything runs
+        self.data = {}
+        for step in steps:
+            data = commands.get(step.command_name)
+            if data is None:
+                raise WorkflowError(f"Line {step.line}: command '{step.command_name}' not found")
+            if data["env"] == WORKFLOW_ENV:
+                raise WorkflowError(f"Line {step.line}: '{step.command_name}' is a workflow; workflows cannot be nested")
+            try:
+                self.data[step.id] = fill(data, {})
+            except TemplateError as e:
+                raise WorkflowError(f"Line {step.line}: {e}")
+
+    def run(self):
+        # Blocks until every step has finished or been skipped; returns 0 when none failed
+        self.started_at = time.monotonic()
+        with self._changed:
+            try:
+                while True:
+                    self._start_ready()
+                    if all(step.state in FINAL_STATES for step in self.steps):
+                        break
+                    self._changed.wait()
+            except KeyboardInterrupt:
+                # The steps are in their own process groups and did not get the Ctrl+C
+                self.stop()
+                raise
+        self.ended_at = time.monotonic()
+        return self.exit_code()
+
+    def stop(self):
+        with self._changed:
+            self.stopped = True
+            for step in self.steps:
+                if step.state == WAITING:
+                    self._set_state(step, STOPPED)
+                elif step.state == RUNNING:
+                    step.run.stop()
+            self._changed.notify_all()
+
+    def exit_code(self):
+        return 0 if all(step.state in (OK, SKIPPED) for step in self.steps) else 1
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.ended_at if self.ended_at is not None else time.monotonic()) - self.started_at
+
+    def _decide(self, step):
+        # True to start, False to skip, None to keep waiting
+        for name in step.after:
+            state = self.by_id[name].state
+            if state not in FINAL_STATES:
+                return None
+            if state != OK:
+                return False
+        for name in step.on_failure:
+            state = self.by_id[name].state
+            if state not in FINAL_STATES:
+                return None
+            if state != FAILED:
+                return False
+        return True
+
+    def _pipe(self, step):
+        group = [step]
+        while group[-1].consumer is not None:
+            group.append(self.by_id[group[-1].consumer])
+        return group
+
+    def _start_ready(self):
+        # Skipping a step can settle the steps behind it, so repeat until nothing changes
+        changed = True
+        while changed and not self.stopped:
+            changed = False
+            for step in self.steps:
+                if step.state != WAITING or step.stdin_from is not None:
+                    continue
+                decision = self._decide(step)
+                if decision is None:
+                    continue
+                group = self._pipe(step)
+                if decision is False:
+                    for member in group:
+                        self._set_state(member, SKIPPED)
+                    changed = True
+                elif not self._running or self._running + len(group) <= self.max_parallel:
+                    self._start(group)
+
+    def _start(self, group):
+        stdin = None
+        for index, step in enumerate(group):
+            stdout = next_stdin = None
+            if index + 1 < len(group):
+                next_stdin, stdout = os.pipe()
+            data = self.data[step.id]
+            step.run = CommandRun(
+                data["command"], data["env"],
+                on_output=lambda text, step=step: self._output(step, text),
+                on_finished=lambda exit_code, step=step: self._finished(step),
+                archive=self.archive, stdin=stdin, stdout=stdout, **command_options(data)
+            )
+            stdin = next_stdin
+            self._running += 1
+            self._set_state(step, RUNNING)
+        for step in group:
+            step.run.start()
+
+    def _output(self, step, text):
+        if self.on_output is not None:
+            self.on_output(step, text)
+
+    def _finished(self, step):
+        run = step.run
+        if self.history is not None:
+            self.history.record(step.command_name, run)
+        with self._changed:
+            self._running -= 1
+            if run.stopped and not run.timed_out:
+                self._set_state(step, STOPPED)
+            else:
+                self._set_state(step, OK if run.exit_code == 0 else FAILED)
+            self._changed.notify_all()
+
+    def _set_state(self, step, state):
+        step.state = state
+        if self.on_state is not None:
+            self.on_state(step)
+
+
+def run_workflow(data, commands, on_output, history=None, archive=None, on_run=None):
+    # Runs a saved workflow on the calling thread, writing every line of output
+    # prefixed with its step id, and returns its exit code. on_run gets the
+    # WorkflowRun before it starts, to stop it from elsewhere.
+    def step_output(step, text):
+        on_output(step.prefix_lines(text))
+
+    def step_state(step):
+        if step.state == RUNNING:
+            on_output(f"[{step.id}] started: {step.command_name}\n")
+        elif step.state in (OK, FAILED) and step.run is not None:
+            on_output(f"[{step.id}] {step.state.lower()}, exit code {step.run.exit_code} in {step.run.elapsed():.2f}s\n")
+        else:
+            on_output(f"[{step.id}] {step.state.lower()}\n")
+
+    run = WorkflowRun(parse_workflow(data["command"]), commands, step_output, step_state, history, archive)
+    if on_run is not None:
+        on_run(run)
+    exit_code = run.run()
+    on_output(f"Workflow {'succeeded' if exit_code == 0 else 'failed'} in {run.elapsed():.2f}s\n")
+    return exit_code
@@ -0,0 +1,60 @@
+from cmdies.ansi import PALETTE, AnsiParser, color_256, strip_ansi
+
+RED = (PALETTE[1], None, False, False, False)
+
+
+def feed_all(chunks):
+    parser = AnsiParser()
+    runs = []
+    for chunk in chunks:
+        runs.extend(parser.feed(chunk))
+    return runs
+
+
+def test_plain_text_passes_through():
+    assert AnsiParser().feed("hello\n") == [("hello\n", None)]
+    assert AnsiParser().feed("") == []
+
+
+def test_sgr_state_carries_over_chunks():
+    assert feed_all(["\x1b[31mred", " still red", "\x1b[0m plain"]) == [
+        ("red", RED), (" still red", RED), (" plain", None)
+    ]
+
+
+def test_csi_split_by_a_chunk_boundary():
+    sequence = "a\x1b[31mb"
+    for split in range(2, len(sequence) - 1):
+        assert feed_all([sequence[:split], sequence[split:]]) == [("a", None), ("b", RED)]
+
+
+def test_osc_split_by_a_chunk_boundary():
+    # A window title must not leak into the text, whichever chunk its end is in
+    assert feed_all(["a\x1b]0;my title", " more\x07b"]) == [("a", None), ("b", None)]
+    assert feed_all(["a\x1b]8;;http://x\x1b", "\\link\x1b]8;;\x1b\\c"]) == [("a", None), ("link", None), ("c", None)]
+
+
+def test_other_escapes_are_dropped():
+    assert feed_all(["x\x1b(B", "y\x1b=z\x1b[2K\x1b[1;1H!"]) == [("x", None), ("y", None), ("z", None), ("!", None)]
+
+
+def test_unfinished_escape_is_released_at_a_newline():
+    assert feed_all(["a\x1b", "\n"]) == [("a", None), ("\n", None)]
+
+
+def test_extended_colors_and_attributes():
+    parser = AnsiParser()
+    assert parser.feed("\x1b[1;38;5;196;48;2;1;2;3mx") == [("x", ("#ff0000", "#010203", True, False, False))]
+    assert parser.feed("\x1b[22;39;49;4my") == [("y", (None, None, False, False, True))]
+    assert parser.feed("\x1b[0;7mz") == [("z", ("#1e1e1e", "#ffffff", False, False, False))]
+
+
+def test_color_256():
+    assert color_256(9) == PALETTE[9]
+    assert color_256(16) == "#000000"
+    assert color_256(231) == "#ffffff"
+    assert color_256(232) == "#080808"
+
+
+def test_strip_ansi():
+    assert strip_ansi("\x1b[1;32mok\x1b[0m \x1b]0;title\x07done\x1b") == "ok done"
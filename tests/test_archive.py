@@ -0,0 +1,74 @@
+import os
+import time
+
+import pytest
+
+from cmdies import archive
+from cmdies.archive import ArchiveError, OutputArchive
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Outputs span many chunks, some cut in the middle of a line or a character
+    monkeypatch.setattr(archive, "CHUNK_SIZE", 64)
+
+
+def archived(output_archive, *texts):
+    output_id, writer = output_archive.create()
+    for text in texts:
+        writer.write(text)
+    writer.close()
+    return output_id
+
+
+def test_lines_round_trip_across_chunks(tmp_path):
+    lines = [f"line {i} " + "é" * (i % 7 * 9) for i in range(200)] + ["x" * 300, "", "last"]
+    text = "\n".join(lines) + "\n"
+    output_archive = OutputArchive(str(tmp_path))
+    output = output_archive.open(archived(output_archive, *[text[i:i + 50] for i in range(0, len(text), 50)]))
+    try:
+        assert len(output.chunks) > 10
+        assert output.line_count == len(lines)
+        assert output.size == len(text.encode("utf-8"))
+        assert output.read_text() == text
+        for start in range(0, len(lines), 13):
+            assert output.read_lines(start, 17) == lines[start:start + 17]
+        assert output.read_lines(len(lines) - 1, 10) == ["last"]
+        assert output.read_lines(len(lines), 10) == []
+    finally:
+        output.close()
+
+
+def test_last_line_without_a_line_break_and_empty_output(tmp_path):
+    output_archive = OutputArchive(str(tmp_path))
+    output = output_archive.open(archived(output_archive, "a\n", "b"))
+    assert (output.line_count, output.read_lines(0, 5), output.read_text()) == (2, ["a", "b"], "a\nb")
+    output.close()
+    output = output_archive.open(archived(output_archive))
+    assert (output.line_count, output.read_lines(0, 5), output.read_text()) == (0, [], "")
+    output.close()
+
+
+def test_unreadable_and_aborted_outputs(tmp_path):
+    output_archive = OutputArchive(str(tmp_path))
+    with pytest.raises(ArchiveError):
+        output_archive.open("missing")
+    (tmp_path / ("broken" + archive.SUFFIX)).write_bytes(b"not an output archive")
+    with pytest.raises(ArchiveError):
+        output_archive.open("broken")
+    output_id, writer = output_archive.create()
+    writer.write("partial")
+    writer.abort()
+    assert not output_archive.exists(output_id)
+    assert os.listdir(tmp_path) == ["broken" + archive.SUFFIX]
+
+
+def test_prune_drops_expired_outputs_then_the_oldest_over_the_size_limit(tmp_path):
+    output_archive = OutputArchive(str(tmp_path), max_age_days=1)
+    output_ids = [archived(output_archive, f"run {i}\n") for i in range(4)]
+    now = time.time()
+    for age, output_id in zip([3 * 24 * 3600, 300, 200, 100], output_ids):
+        os.utime(output_archive.path(output_id), (now - age, now - age))
+    output_archive.max_bytes = 2 * os.path.getsize(output_archive.path(output_ids[0]))
+    output_archive.prune()
+    assert [output_archive.exists(output_id) for output_id in output_ids] == [False, False, True, True]
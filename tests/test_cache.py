@@ -0,0 +1,46 @@
+from cmdies.cache import ResultCache
+from cmdies.runner import cache_decoding, invalidate_cached
+
+
+def test_entries_expire_by_the_ttl_asked_for(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put("df -h", "Bash", "out", 0)
+    assert cache.get("df -h", "Bash", 60).output == "out"
+    assert cache.get("df -h", "Bash", -1) is None
+    assert cache.get("df -h", "Bash", 60) is None
+
+
+def test_entries_survive_a_restart(tmp_path):
+    ResultCache(str(tmp_path)).put("df -h", "Bash", "out", 0)
+    assert ResultCache(str(tmp_path)).get("df -h", "Bash", 60).output == "out"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    # Room for two entries on disk and only the latest one in memory
+    cache = ResultCache(str(tmp_path), memory_budget=0, disk_budget=250)
+    cache.put("echo a", "Bash", "a" * 50, 0)
+    cache.put("echo b", "Bash", "b" * 50, 0)
+    assert cache.get("echo a", "Bash", 60).output == "a" * 50
+    cache.put("echo c", "Bash", "c" * 50, 0)
+    for instance in [cache, ResultCache(str(tmp_path))]:
+        assert instance.get("echo b", "Bash", 60) is None
+        assert instance.get("echo a", "Bash", 60).exit_code == 0
+        assert instance.get("echo c", "Bash", 60).exit_code == 0
+
+
+def test_output_decoded_another_way_is_a_separate_entry(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    data = {"command": "dir", "env": "CMD", "cache_ttl": 60, "encoding": "cp850"}
+    cache.put("dir", "CMD", "out", 0, *cache_decoding(data))
+    assert cache.get("dir", "CMD", 60) is None
+    assert cache.get("dir", "CMD", 60, *cache_decoding(dict(data, errors="strict"))) is None
+    assert cache.get("dir", "CMD", 60, *cache_decoding(data)).output == "out"
+
+
+def test_invalidate_cached_drops_memory_and_disk(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    data = {"command": "df -h", "env": "Bash", "cache_ttl": 60}
+    cache.put("df -h", "Bash", "out", 0, *cache_decoding(data))
+    invalidate_cached(cache, data)
+    assert cache.get("df -h", "Bash", 60, *cache_decoding(data)) is None
+    assert ResultCache(str(tmp_path)).get("df -h", "Bash", 60, *cache_decoding(data)) is None
@@ -0,0 +1,13 @@
+import pytest
+
+from cmdies.cli import build_parser
+
+
+@pytest.mark.parametrize("action", [["run", "name"], ["schedule"]])
+def test_jobs_must_be_positive(action, capsys):
+    assert build_parser().parse_args(action + ["-j", "2"]).jobs == 2
+    for value in ["0", "-3", "two"]:
+        with pytest.raises(SystemExit) as error:
+            build_parser().parse_args(action + ["-j", value])
+        assert error.value.code == 2
+        assert "--jobs" in capsys.readouterr().err
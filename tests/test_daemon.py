@@ -0,0 +1,125 @@
+import getpass
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+from cmdies.store import CommandStore
+
+pytestmark = pytest.mark.skipif(os.name == "nt" or shutil.which("bash") is None, reason="needs bash and Unix sockets")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "iknowmycmdies.py")
+
+
+@pytest.fixture
+def library(tmp_path):
+    # A library in its own directory, with a daemon info directory of its own
+    store = CommandStore(str(tmp_path / "commandes.db"))
+    store.load()
+    store.put_many({
+        "hello": {"command": "echo hi", "env": "Bash"},
+        "fail": {"command": "echo oops; exit 3", "env": "Bash"},
+        "slow": {"command": "echo started; sleep 2; touch finished", "env": "Bash"},
+    })
+    store.close()
+    runtime = tmp_path / "run"
+    runtime.mkdir(mode=0o700)
+    env = dict(os.environ, XDG_RUNTIME_DIR=str(runtime))
+    return tmp_path, env
+
+
+def cli(library, *args, timeout=20):
+    cwd, env = library
+    return subprocess.run(
+        [sys.executable, SCRIPT, *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=timeout
+    )
+
+
+def request(library, payload):
+    # Asks the daemon itself; unlike the CLI, this fails when no daemon answers
+    cwd, env = library
+    script = f"import json\nfrom cmdies.daemon import request\nrequest({payload!r}, lambda m: print(json.dumps(m)))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=cwd, env=dict(env, PYTHONPATH=ROOT),
+        capture_output=True, text=True, timeout=20, check=True
+    )
+    return [json.loads(line) for line in result.stdout.splitlines()]
+
+
+@pytest.fixture
+def daemon(library):
+    cwd, env = library
+    process = subprocess.Popen(
+        [sys.executable, SCRIPT, "daemon"], cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 20
+    while not glob.glob(os.path.join(env["XDG_RUNTIME_DIR"], "cmdies-*", "daemon-*.json")):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.05)
+    yield process
+    cli(library, "daemon", "--stop")
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def test_run_through_the_daemon_returns(library, daemon):
+    result = cli(library, "run", "hello")
+    assert (result.returncode, result.stdout) == (0, "hi\n")
+    result = cli(library, "run", "fail")
+    assert (result.returncode, result.stdout) == (3, "oops\n")
+    assert daemon.poll() is None
+
+
+def test_list_and_search_through_the_daemon(library, daemon):
+    assert sorted(request(library, {"op": "list"})[-1]["commands"]) == ["fail", "hello", "slow"]
+    assert request(library, {"op": "search", "query": "hel", "limit": 10}) == [{"names": ["hello"]}]
+    assert cli(library, "list").stdout == "fail\nhello\nslow\n"
+    assert cli(library, "search", "hel").stdout == "hello\n"
+
+
+def test_library_edits_reach_the_daemon(library, daemon):
+    cwd, _ = library
+    store = CommandStore(str(cwd / "commandes.db"))
+    store.load()
+    store.put("disk", {"command": "df -h", "env": "Bash"})
+    store.delete("slow")
+    store.close()
+    assert request(library, {"op": "list"})[-1]["commands"]["disk"] == {"command": "df -h", "env": "Bash"}
+    assert sorted(request(library, {"op": "list"})[-1]["commands"]) == ["disk", "fail", "hello"]
+
+
+def test_unknown_command_is_an_error(library, daemon):
+    result = cli(library, "run", "missing")
+    assert result.returncode == 2
+    assert "Command 'missing' not found." in result.stderr
+
+
+def test_client_going_away_stops_the_run(library, daemon):
+    cwd, env = library
+    client = subprocess.Popen([sys.executable, SCRIPT, "run", "slow"], cwd=cwd, env=env, stdout=subprocess.PIPE)
+    assert client.stdout.read(7) == b"started"
+    client.kill()
+    client.wait()
+    client.stdout.close()
+    time.sleep(3)
+    assert not (cwd / "finished").exists()
+    assert cli(library, "run", "hello").stdout == "hi\n"
+
+
+def test_info_directory_open_to_others_is_refused(library):
+    _, env = library
+    info_dir = os.path.join(env["XDG_RUNTIME_DIR"], f"cmdies-{getpass.getuser()}")
+    os.mkdir(info_dir)
+    os.chmod(info_dir, 0o755)
+    result = cli(library, "daemon")
+    assert result.returncode == 1
+    assert "accessible to other users (mode 755)" in result.stdout
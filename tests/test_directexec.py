@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import pytest
+
+from cmdies.directexec import ProgramCache, direct_args, needs_bash
+
+
+@pytest.mark.parametrize("command", [
+    "ls -l",
+    "git log --oneline -n 5",
+    "python3 -c 'print(1)'",
+    "grep 'a|b' file.txt",
+    'echo "plain words"',
+    "printf '%s\\n' 'a;b'",
+])
+def test_plain_commands_do_not_need_bash(command):
+    assert not needs_bash(command)
+
+
+@pytest.mark.parametrize("command", [
+    "ls | wc -l",
+    "make && make install",
+    "echo hi > out.txt",
+    "ls *.py",
+    "echo $HOME",
+    'echo "$HOME"',
+    'echo "`date`"',
+    "cd ~",
+    "echo {a,b}",
+    "sleep 1 &",
+    "echo 'unterminated",
+    "ls # comment",
+    "echo a\necho b",
+])
+def test_shell_syntax_needs_bash(command):
+    assert needs_bash(command)
+
+
+posix_only = pytest.mark.skipif(os.name == "nt" or shutil.which("ls") is None, reason="needs a POSIX ls")
+
+
+@posix_only
+def test_direct_args_split_plain_commands():
+    argv, executable = direct_args("ls -l 'a b'", "Bash")
+    assert argv == ["ls", "-l", "a b"]
+    assert executable == shutil.which("ls")
+
+
+@posix_only
+def test_direct_args_keep_the_shell_when_needed():
+    assert direct_args("ls | wc -l", "Bash") is None
+    assert direct_args("echo hi", "Bash") is None  # Builtin
+    assert direct_args("FOO=1 ls", "Bash") is None  # Assignment
+    assert direct_args("no-such-program-cmdies", "Bash") is None
+    assert direct_args("ls -l", "Bash", "never") is None
+    assert direct_args("ls -l", "PowerShell") is None
+
+
+@posix_only
+def test_always_mode_passes_shell_characters_literally():
+    argv, _ = direct_args("ls '*.py' >out", "Bash", "always")
+    assert argv == ["ls", "*.py", ">out"]
+
+
+def test_program_cache_follows_path(tmp_path, monkeypatch):
+    program = tmp_path / "cmdies-test-tool"
+    program.write_text("#!/bin/sh\n", encoding="utf-8")
+    program.chmod(0o755)
+    cache = ProgramCache()
+    monkeypatch.setenv("PATH", "")
+    assert cache.resolve("cmdies-test-tool") is None
+    monkeypatch.setenv("PATH", str(tmp_path))
+    if os.name != "nt":
+        assert cache.resolve("cmdies-test-tool") == str(program)
+        cache.forget(str(program))
+        assert cache._paths == {}
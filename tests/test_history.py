@@ -0,0 +1,90 @@
+import csv
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from cmdies.history import HistoryStore, percentile
+
+# Long enough that nothing is written until the test flushes
+NO_AUTO_FLUSH = 3600
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+@pytest.fixture
+def history(db_path):
+    history = HistoryStore(db_path, flush_delay=NO_AUTO_FLUSH)
+    yield history
+    history.close()
+
+
+def finished_run(started, wall_time, exit_code=0, cpu_time=None, peak_rss_kb=None):
+    return SimpleNamespace(
+        command="make", env="Bash", started_wall=started, exit_code=exit_code, cpu_time=cpu_time,
+        peak_rss_kb=peak_rss_kb, output_bytes=10, output_id=None, elapsed=lambda: wall_time
+    )
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 95) == 4
+    assert percentile([5], 95) == 5
+
+
+def test_stats_per_command_slowest_first(history):
+    for i, wall_time in enumerate([1.0, 2.0, 3.0, 4.0]):
+        history.record("build", finished_run(100 + i, wall_time, i % 2, wall_time / 2, 1000 * i))
+    history.record("lint", finished_run(50, 0.5))
+    # A typed-in command is in the runs but not in the stats, a queued one in neither
+    history.record(None, finished_run(200, 9.0))
+    history.record("queued", SimpleNamespace(started_wall=None, exit_code=None))
+    build, lint = history.stats()
+    assert build == {
+        "name": "build", "runs": 4, "failure_rate": 0.5, "p50": 2.0, "p95": 4.0,
+        "mean_cpu_time": 1.25, "peak_rss_kb": 3000, "last_run": 103
+    }
+    assert (lint["runs"], lint["mean_cpu_time"], lint["peak_rss_kb"]) == (1, None, None)
+    assert [run["wall_time"] for run in history.runs("build")] == [1.0, 2.0, 3.0, 4.0]
+    assert len(history.runs()) == 6
+
+
+def test_records_are_written_behind(db_path, history):
+    history.record("build", finished_run(100, 1.0))
+    other = HistoryStore(db_path, flush_delay=NO_AUTO_FLUSH)
+    try:
+        assert other.runs() == []
+        history.flush()
+        assert [run["name"] for run in other.runs()] == ["build"]
+    finally:
+        other.close()
+
+
+def test_oldest_runs_are_pruned(db_path):
+    history = HistoryStore(db_path, flush_delay=NO_AUTO_FLUSH, max_runs=3)
+    try:
+        for started in range(5):
+            history.record("build", finished_run(started, 1.0))
+        assert [run["started"] for run in history.runs()] == [2, 3, 4]
+    finally:
+        history.close()
+
+
+def test_export_runs_and_summary(history, tmp_path):
+    history.record("build", finished_run(100, 2.0, exit_code=1))
+    history.record("lint", finished_run(101, 1.0))
+    assert history.export(str(tmp_path / "runs.csv")) == 2
+    with open(tmp_path / "runs.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["name"], row["wall_time"], row["exit_code"]) for row in rows] == [
+        ("build", "2.0", "1"), ("lint", "1.0", "0")
+    ]
+    assert history.export(str(tmp_path / "stats.json"), summary=True) == 2
+    summary = json.loads((tmp_path / "stats.json").read_text(encoding="utf-8"))
+    assert [(item["name"], item["runs"], item["failure_rate"]) for item in summary] == [
+        ("build", 1, 1.0), ("lint", 1, 0.0)
+    ]
@@ -0,0 +1,32 @@
+from cmdies.outputsearch import OutputSearch, compile_pattern
+
+
+def search(pattern, chunks, path=None, size=None):
+    results = []
+    search = OutputSearch(path, compile_pattern(pattern), lambda *result: results.append(result), size)
+    search.start()
+    for chunk in chunks:
+        search.feed(chunk)
+        search.notify()
+    search.notify(complete=True)
+    search._thread.join(10)
+    lines = [line for result in results for line in result[0]]
+    texts = [text for result in results for text in result[1]]
+    return lines, texts, results[-1][2], results[-1][3]
+
+
+def test_fed_lines_split_across_chunks():
+    assert search("ab", ["xa", "b ab\nno\n", "ab"]) == ([0, 2], ["xab ab", "ab"], 3, True)
+
+
+def test_file_part_is_read_up_to_size_before_the_fed_text(tmp_path):
+    path = tmp_path / "transcript.log"
+    path.write_bytes("héllo 1\nskip\nhéllo 2\nwritten later\n".encode())
+    size = len("héllo 1\nskip\n".encode())
+    assert search("héllo", ["héllo 2\nend"], str(path), size) == ([0, 2], ["héllo 1", "héllo 2"], 2, True)
+
+
+def test_whole_file_when_size_is_none(tmp_path):
+    path = tmp_path / "transcript.log"
+    path.write_text("a\nb\na")
+    assert search("a", [], str(path)) == ([0, 2], ["a", "a"], 2, True)
@@ -0,0 +1,145 @@
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from cmdies.processes import LIMITS_SUPPORTED
+from cmdies.runner import CommandRun, JobPool, run_saved_command
+from cmdies.sessions import SessionPool
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+limits_only = pytest.mark.skipif(not LIMITS_SUPPORTED, reason="needs rlimits")
+posix_only = pytest.mark.skipif(not hasattr(os, "wait4"), reason="needs os.wait4")
+
+
+def run(command, **options):
+    output = []
+    command_run = CommandRun(command, "Bash", on_output=output.append, **options)
+    return command_run, command_run.run(), "".join(output)
+
+
+def test_output_and_exit_code():
+    _, exit_code, output = run("echo out; echo err >&2; exit 3")
+    assert (exit_code, output) == (3, "out\nerr\n")
+
+
+def test_timeout_kills_the_whole_tree(tmp_path):
+    marker = tmp_path / "late"
+    started = time.monotonic()
+    command_run, exit_code, _ = run(f"(sleep 1; touch {marker}) & sleep 30", timeout=0.3)
+    assert command_run.timed_out and exit_code < 0
+    assert time.monotonic() - started < 5
+    time.sleep(1.5)
+    assert not marker.exists()
+
+
+def test_stop_from_another_thread():
+    command_run = CommandRun("sleep 30", "Bash")
+    command_run.start()
+    command_run.stop()
+    assert command_run.wait(10) < 0
+    assert command_run.stopped and not command_run.timed_out
+
+
+def test_saved_command_reports_its_timeout():
+    output = []
+    assert run_saved_command({"command": "sleep 30", "env": "Bash", "timeout": 0.3}, output.append) < 0
+    assert output[-1] == "\nTimed out after 0.3s\n"
+
+
+@limits_only
+def test_limits_apply_to_the_child():
+    limits = {"cpu_limit": 5, "memory_limit": 512, "file_limit": 64}
+    _, exit_code, output = run("ulimit -t; ulimit -v; ulimit -n", limits=limits)
+    assert (exit_code, output.split()) == (0, ["5", str(512 * 1024), "64"])
+
+
+@limits_only
+def test_cpu_limit_ends_a_busy_command():
+    command_run, exit_code, _ = run("while :; do :; done", limits={"cpu_limit": 1}, timeout=30)
+    assert exit_code < 0 and not command_run.timed_out
+
+
+@limits_only
+def test_limited_commands_skip_warm_sessions():
+    pool = SessionPool(max_idle=1)
+    try:
+        command_run, exit_code, output = run("ulimit -n", sessions=pool, limits={"file_limit": 64})
+        assert (exit_code, output) == (0, "64\n")
+        assert command_run.session is None and command_run.process is not None
+    finally:
+        pool.close()
+
+
+def test_plain_commands_start_without_the_shell():
+    command_run, exit_code, output = run("ls -d /")
+    assert (exit_code, output, command_run.direct) == (0, "/\n", True)
+    command_run, exit_code, output = run("ls -d / | cat")
+    assert (exit_code, output, command_run.direct) == (0, "/\n", False)
+    command_run, _, _ = run("ls -d /", direct_exec="never")
+    assert not command_run.direct
+
+
+def test_removed_program_is_reported_by_the_shell(tmp_path, monkeypatch):
+    tool = tmp_path / "cmdies-test-tool"
+    tool.write_text("#!/bin/sh\necho tool\n", encoding="utf-8")
+    tool.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    command_run, exit_code, output = run("cmdies-test-tool")
+    assert (exit_code, output, command_run.direct) == (0, "tool\n", True)
+    tool.unlink()
+    _, exit_code, output = run("cmdies-test-tool")
+    assert exit_code == 127 and "not found" in output
+
+
+def test_files_that_fail_to_start_directly_go_through_the_shell(tmp_path, monkeypatch):
+    script = tmp_path / "cmdies-no-shebang"
+    script.write_text("echo from bash\n", encoding="utf-8")
+    script.chmod(0o755)
+    locked = tmp_path / "cmdies-locked"
+    locked.write_text("#!/bin/sh\necho locked\n", encoding="utf-8")
+    locked.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    assert run("cmdies-no-shebang")[1:] == (0, "from bash\n")
+    assert run("cmdies-locked")[1:] == (0, "locked\n")
+    # Still resolved to the same file, which is no longer executable
+    locked.chmod(0o644)
+    _, exit_code, output = run("cmdies-locked")
+    assert exit_code == 126 and "Permission denied" in output
+
+
+@posix_only
+def test_peak_rss_is_the_childs_own():
+    # In a process of its own, so the memory held here does not stay in this
+    # process's peak RSS for the other tests
+    script = textwrap.dedent("""
+        from cmdies.runner import CommandRun
+        big = CommandRun(f"{sys.executable} -c \\"x = b'1' * (150 * 1024 * 1024)\\"", "Bash", direct_exec="always")
+        big.run()
+        ballast = b"1" * (300 * 1024 * 1024)
+        small = CommandRun("true", "Bash", direct_exec="always")
+        small.run()
+        print(big.peak_rss_kb, small.peak_rss_kb)
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys\n" + script], cwd=root, capture_output=True, text=True, check=True
+    )
+    big, small = result.stdout.split()
+    assert int(big) >= 150 * 1024
+    assert small == "None"
+
+
+def test_job_pool_forgets_finished_jobs():
+    pool = JobPool(2)
+    recorded = []
+    runs = [CommandRun(f"{sys.executable} -c pass", "Bash", direct_exec="always") for _ in range(3)]
+    futures = [pool.submit(run, recorded.append) for run in runs]
+    assert [future.result() for future in futures] == [0, 0, 0]
+    pool.shutdown(wait=True)
+    assert sorted(map(id, recorded)) == sorted(map(id, runs))
+    assert not pool._futures
@@ -0,0 +1,268 @@
+import datetime
+import shutil
+import threading
+import time
+
+import pytest
+
+from cmdies import schedule as schedule_module
+from cmdies.history import HistoryStore
+from cmdies.runner import CommandRun
+from cmdies.schedule import (
+    MISSED_GRACE, CronSchedule, IntervalSchedule, ScheduleError, Scheduler, format_delay, last_result, parse_schedule
+)
+
+
+def local(*args):
+    return datetime.datetime(*args).timestamp()
+
+
+def next_fire(text, *start):
+    return datetime.datetime.fromtimestamp(parse_schedule(text).next_after(local(*start)))
+
+
+def test_intervals():
+    schedule = parse_schedule("every  10m")
+    assert isinstance(schedule, IntervalSchedule)
+    assert schedule.text == "every 10m"
+    assert schedule.next_after(100) == 700
+    assert parse_schedule("every 30").seconds == 30
+    assert parse_schedule("Every 2H").seconds == 7200
+    assert parse_schedule("every 1d").seconds == 86400
+
+
+def test_cron_next_fire():
+    assert next_fire("*/15 * * * *", 2026, 3, 2, 10, 7, 30) == datetime.datetime(2026, 3, 2, 10, 15)
+    # Strictly after the start, even on a match
+    assert next_fire("*/15 * * * *", 2026, 3, 2, 10, 15) == datetime.datetime(2026, 3, 2, 10, 30)
+    assert next_fire("30 9 * * mon-fri", 2026, 3, 6, 10, 0) == datetime.datetime(2026, 3, 9, 9, 30)
+    assert next_fire("0 0 1 jan *", 2026, 3, 2, 0, 0) == datetime.datetime(2027, 1, 1, 0, 0)
+    assert next_fire("0 12 29 2 *", 2026, 3, 1, 0, 0) == datetime.datetime(2028, 2, 29, 12, 0)
+
+
+def test_cron_day_fields_match_either_when_both_are_set():
+    # The 15th, or any Sunday
+    assert next_fire("0 0 15 * sun", 2026, 3, 2, 0, 0) == datetime.datetime(2026, 3, 8, 0, 0)
+    assert next_fire("0 0 15 * sun", 2026, 3, 9, 0, 0) == datetime.datetime(2026, 3, 15, 0, 0)
+    assert next_fire("0 0 * * 7", 2026, 3, 2, 0, 0) == datetime.datetime(2026, 3, 8, 0, 0)
+
+
+def test_cron_macros():
+    assert isinstance(parse_schedule("@daily"), CronSchedule)
+    assert next_fire("@hourly", 2026, 3, 2, 10, 7) == datetime.datetime(2026, 3, 2, 11, 0)
+    assert next_fire("@weekly", 2026, 3, 2, 10, 7) == datetime.datetime(2026, 3, 8, 0, 0)
+
+
+@pytest.mark.parametrize("text", [
+    "every 10x", "every 0s", "* * * *", "61 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *", "0 0 30 2 *",
+    "@often",
+])
+def test_invalid_schedules(text):
+    with pytest.raises(ScheduleError):
+        parse_schedule(text)
+
+
+def test_format_delay():
+    assert format_delay(-3) == "0s"
+    assert format_delay(45) == "45s"
+    assert format_delay(250) == "4m 10s"
+    assert format_delay(3 * 3600 + 300) == "3h 5m"
+    assert format_delay(2 * 86400 + 4 * 3600) == "2d 4h"
+
+
+class BlockingJobs:
+    # run_job for a Scheduler: every run waits until release() and is counted
+    def __init__(self):
+        self.started = []
+        self.release_event = threading.Event()
+
+    def __call__(self, job, on_run):
+        self.started.append(job.name)
+        self.release_event.wait(5)
+        return 0
+
+    def release(self):
+        self.release_event.set()
+
+
+def make_scheduler(names, max_running=4):
+    jobs = BlockingJobs()
+    scheduler = Scheduler(jobs, max_running=max_running, jitter=0)
+    scheduler.update({name: {"command": "true", "env": "Bash", "schedule": "every 1h"} for name in names})
+    return scheduler, jobs
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_update_follows_the_library():
+    scheduler, _ = make_scheduler(["a", "b"])
+    assert [job.name for job in scheduler.jobs_by_next_run()] == ["a", "b"]
+    scheduler.update({
+        "a": {"command": "true", "env": "Bash", "schedule": "every 1m"},
+        "c": {"command": "true", "env": "Bash", "schedule": "every 10x"},
+        "d": {"command": "true", "env": "Bash"},
+    })
+    jobs = scheduler.jobs_by_next_run()
+    assert [job.name for job in jobs] == ["a", "c"]
+    assert jobs[0].schedule.seconds == 60
+    assert jobs[1].schedule is None and jobs[1].last_error
+
+
+def test_overlapping_occurrences_are_coalesced():
+    scheduler, jobs = make_scheduler(["a"])
+    job = scheduler.jobs["a"]
+    now = time.time()
+    with scheduler._changed:
+        scheduler._due(job, now, now)
+        scheduler._start_ready()
+    wait_until(lambda: jobs.started == ["a"])
+    with scheduler._changed:
+        # Due again while running, and once more: folded into the running run
+        scheduler._due(job, now + 1, now + 1)
+        scheduler._due(job, now + 2, now + 2)
+        scheduler._start_ready()
+    assert job.running and job.coalesced == 2
+    jobs.release()
+    wait_until(lambda: not job.running)
+    assert jobs.started == ["a"] and job.runs == 1 and job.last_exit_code == 0
+    assert last_result(job).startswith("exit 0 in ")
+
+
+def test_concurrency_cap_queues_in_due_order():
+    scheduler, jobs = make_scheduler(["a", "b", "c"], max_running=2)
+    now = time.time()
+    with scheduler._changed:
+        for name in ("c", "a", "b"):
+            scheduler._due(scheduler.jobs[name], now, now)
+        scheduler._start_ready()
+    wait_until(lambda: len(jobs.started) == 2)
+    assert sorted(jobs.started) == ["a", "c"]
+    assert scheduler.jobs["b"].queued and last_result(scheduler.jobs["b"]) == "waiting for a free slot"
+    # The loop thread is not running; start the queued job as it would
+    jobs.release()
+    wait_until(lambda: scheduler._running == 0)
+    with scheduler._changed:
+        scheduler._start_ready()
+    wait_until(lambda: len(jobs.started) == 3 and scheduler._running == 0)
+
+
+def test_missed_occurrences_become_one_catch_up_run():
+    scheduler, _ = make_scheduler(["a"])
+    job = scheduler.jobs["a"]
+    now = time.time()
+    missed = now - MISSED_GRACE - 3 * 3600
+    with scheduler._changed:
+        scheduler._queue.clear()
+        scheduler._due(job, missed, now)
+        entries = list(scheduler._queue)
+    # The next regular occurrence is in the future, plus a catch-up run due now
+    assert job.coalesced == 1 and not job.queued
+    regular = [entry for entry in entries if entry[4] is not None]
+    catch_up = [entry for entry in entries if entry[4] is None]
+    assert len(regular) == 1 and regular[0][0] > now
+    assert len(catch_up) == 1 and catch_up[0][0] <= time.time()
+
+
+def test_failed_runs_are_reported():
+    def fail(job, on_run):
+        raise OSError("no shell")
+
+    scheduler = Scheduler(fail, jitter=0)
+    scheduler.update({"a": {"command": "true", "env": "Bash", "schedule": "every 1h"}})
+    job = scheduler.jobs["a"]
+    now = time.time()
+    with scheduler._changed:
+        scheduler._due(job, now, now)
+        scheduler._start_ready()
+    wait_until(lambda: job.runs == 1)
+    assert last_result(job) == "error: no shell"
+
+
+def test_scheduler_thread_runs_due_jobs_and_stops():
+    runs = []
+    scheduler = Scheduler(lambda job, on_run: runs.append(job.name) or 0, jitter=0)
+    scheduler.update({"a": {"command": "true", "env": "Bash", "schedule": "every 1s"}})
+    scheduler.start()
+    try:
+        wait_until(lambda: runs)
+    finally:
+        scheduler.stop()
+    scheduler._thread.join(5)
+    assert not scheduler._thread.is_alive()
+
+
+@pytest.fixture
+def history_path(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+def test_next_run_counts_from_the_saved_last_start(history_path):
+    history = HistoryStore(history_path)
+    try:
+        last = time.time() - MISSED_GRACE - 3 * 3600
+        history.schedule_started("a", last)
+        scheduler = Scheduler(None, jitter=0, history=history)
+        scheduler.update({
+            "a": {"command": "true", "env": "Bash", "schedule": "every 1h"},
+            "b": {"command": "true", "env": "Bash", "schedule": "every 1h"},
+        })
+        assert scheduler.jobs["a"].last_started == last
+        # Overdue since the previous instance stopped, so the loop catches it up
+        assert scheduler.jobs["a"].next_run == last + 3600
+        assert scheduler.jobs["b"].last_started is None and scheduler.jobs["b"].next_run > time.time()
+    finally:
+        history.close()
+
+
+def test_only_the_lease_owner_runs_jobs(history_path, monkeypatch):
+    monkeypatch.setattr(schedule_module, "LEASE_RENEW", 0.1)
+    histories = [HistoryStore(history_path), HistoryStore(history_path)]
+    runs = {0: [], 1: []}
+    schedulers = [
+        Scheduler(lambda job, on_run, i=i: runs[i].append(job.name) or 0, jitter=0, history=history)
+        for i, history in enumerate(histories)
+    ]
+    try:
+        for scheduler in schedulers:
+            scheduler.update({"a": {"command": "true", "env": "Bash", "schedule": "every 1s"}})
+        schedulers[0].start()
+        wait_until(lambda: schedulers[0].owner)
+        schedulers[1].start()
+        wait_until(lambda: len(runs[0]) >= 2)
+        assert schedulers[0].owner and not schedulers[1].owner and runs[1] == []
+        # The other instance takes over once the owner stops
+        schedulers[0].stop()
+        wait_until(lambda: runs[1])
+        assert schedulers[1].owner
+        assert histories[1].schedule_starts()["a"] == schedulers[1].jobs["a"].last_started
+    finally:
+        for scheduler in schedulers:
+            scheduler.stop()
+        for history in histories:
+            history.close()
+
+
+@pytest.mark.skipif(shutil.which("sleep") is None, reason="needs sleep")
+def test_stop_kills_running_jobs():
+    def run_job(job, on_run):
+        run = CommandRun("sleep 30", "Bash")
+        on_run(run)
+        return run.run()
+
+    scheduler = Scheduler(run_job, jitter=0)
+    scheduler.update({"a": {"command": "sleep 30", "env": "Bash", "schedule": "every 1h"}})
+    job = scheduler.jobs["a"]
+    now = time.time()
+    with scheduler._changed:
+        scheduler._due(job, now, now)
+        scheduler._start_ready()
+    wait_until(lambda: scheduler._active)
+    started = time.monotonic()
+    scheduler.stop()
+    assert time.monotonic() - started < 5
+    assert not job.running and job.last_exit_code < 0
@@ -0,0 +1,95 @@
+from cmdies.frecency import FrecencyRanking
+from cmdies.search import CommandIndex
+
+COMMANDS = {
+    "git-status": {"command": "git status -sb", "env": "Bash"},
+    "git-log": {"command": "git log --oneline", "env": "Bash"},
+    "show-branches": {"command": "git branch -a", "env": "Bash"},
+    "disk": {"command": "df -h", "env": "Bash"},
+    "list-processes": {"command": "Get-Process", "env": "PowerShell"},
+}
+
+
+def test_empty_query_finds_nothing():
+    assert CommandIndex(COMMANDS).search("  ") == []
+
+
+def test_prefix_matches_are_alphabetical_without_usage():
+    assert CommandIndex(COMMANDS).search("git", 2) == ["git-log", "git-status"]
+
+
+def test_prefix_matches_put_frecent_names_first():
+    ranking = FrecencyRanking()
+    ranking.bump("git-status", when=1000)
+    assert CommandIndex(COMMANDS, ranking).search("git", 2) == ["git-status", "git-log"]
+
+
+def test_later_tiers_fill_up_the_results():
+    assert CommandIndex(COMMANDS).search("git") == ["git-log", "git-status", "show-branches"]
+
+
+def test_tiers_come_in_order():
+    # Name prefix, then name containing the query, then command body
+    index = CommandIndex(dict(COMMANDS, **{"branch-tool": {"command": "tig", "env": "Bash"}}))
+    assert index.search("branch") == ["branch-tool", "show-branches"]
+    assert index.search("process", 1) == ["list-processes"]
+    assert index.search("oneline") == ["git-log"]
+
+
+def test_fuzzy_pass_tolerates_typos():
+    assert CommandIndex(COMMANDS).search("git statsu")[0] == "git-status"
+
+
+def test_result_count_is_limited():
+    assert len(CommandIndex(COMMANDS).search("git", 1)) == 1
+
+
+def test_add_and_remove_update_every_tier():
+    index = CommandIndex(COMMANDS)
+    index.remove("git-log")
+    assert index.search("git") == ["git-status", "show-branches"]
+    assert index.search("oneline") == []
+    index.add("git-log", {"command": "git log --graph", "env": "Bash"})
+    assert index.search("graph") == ["git-log"]
+    assert len(index) == len(COMMANDS)
+
+
+def test_removed_names_keep_no_prefix_rank():
+    ranking = FrecencyRanking()
+    ranking.bump("git-log", when=1000)
+    index = CommandIndex(COMMANDS, ranking)
+    index.remove("git-log")
+    assert index.search("git", 2) == ["git-status", "show-branches"]
+
+
+def test_frecency_prefers_recent_uses():
+    ranking = FrecencyRanking()
+    ranking.reset(["Never", "old", "new", "another"])
+    ranking.bump("old", when=0)
+    ranking.bump("old", when=1)
+    ranking.bump("new", when=30 * 24 * 3600)
+    assert list(ranking.names()) == ["new", "old", "another", "Never"]
+    assert ranking.row("old") == 1 and ranking.name_at(1) == "old"
+
+
+def test_removed_names_keep_their_score():
+    ranking = FrecencyRanking({"a": 1.0, "gone": 2.0})
+    ranking.reset(["a", "b"])
+    assert list(ranking.names()) == ["a", "b"] and ranking.row("gone") is None
+    ranking.add("gone")
+    ranking.discard("a")
+    assert list(ranking.names()) == ["gone", "b"]
+    ranking.bump("b", when=0)
+    assert ranking.score("a") == 1.0 and list(ranking.names(1)) == ["b"]
+
+
+def test_prefix_matches_with_many_names():
+    # More matches than results, found by walking the ranking or by sorting them
+    commands = {f"job-{i:03}": {"command": "true", "env": "Bash"} for i in range(300)}
+    ranking = FrecencyRanking()
+    index = CommandIndex(commands, ranking)
+    ranking.bump("job-250", when=1000)
+    ranking.bump("job-007", when=500)
+    assert index.search("job", 4) == ["job-250", "job-007", "job-000", "job-001"]
+    assert index.search("job-2", 3) == ["job-250", "job-200", "job-201"]
+    assert index.search("job-25", 20)[:3] == ["job-250", "job-251", "job-252"]
@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pytest
+
+from cmdies.runner import CommandRun
+from cmdies.sessions import SessionPool
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+
+
+@pytest.fixture
+def pool():
+    pool = SessionPool(max_idle=1)
+    yield pool
+    pool.close()
+
+
+def run(command, pool):
+    output = []
+    run = CommandRun(command, "Bash", on_output=output.append, sessions=pool, direct_exec="never")
+    return run.run(), "".join(output)
+
+
+def test_session_keeps_state_out_of_later_commands(pool):
+    assert run("cd / && FOO=1 && exit 3", pool) == (3, "")
+    assert run("pwd; echo ${FOO:-unset}", pool)[1].splitlines()[1] == "unset"
+
+
+def test_syntax_errors_do_not_break_the_session(pool):
+    for command in ['echo "unterminated', "echo )", "fi"]:
+        exit_code, output = run(command, pool)
+        assert exit_code == 2
+        assert "__CMDIES_" not in output
+    assert run("echo still here", pool) == (0, "still here\n")
+
+
+def test_session_dying_mid_command_does_not_run_it_again(pool, tmp_path):
+    log = tmp_path / "runs.log"
+    exit_code, output = run(f"echo ran >> {log} ; kill -9 $$", pool)
+    assert exit_code == -1
+    assert "exited unexpectedly" in output and "new process" not in output
+    assert log.read_text() == "ran\n"
+    assert run("echo fine", pool) == (0, "fine\n")
+
+
+def test_command_not_sent_falls_back_to_a_fresh_process(pool):
+    session = pool.acquire("Bash")
+    # Writing to it fails as it would on a dead interpreter's stdin
+    session.process.stdin = open(os.devnull, "r")
+    pool.release(session)
+    exit_code, output = run("echo fresh", pool)
+    assert exit_code == 0
+    assert output.startswith("Bash session is not accepting commands")
+    assert output.endswith("; running the command in a new process\nfresh\n")
+
+
+def test_multi_line_commands_and_quotes(pool):
+    assert run("printf '%s\\n' 'a b'\necho \"$((1 + 2))\"", pool) == (0, "a b\n3\n")
@@ -0,0 +1,63 @@
+import bisect
+import random
+
+import pytest
+
+from cmdies import sortedlist
+from cmdies.sortedlist import SortedList
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Splits and empty blocks happen after a few changes instead of thousands
+    monkeypatch.setattr(sortedlist, "BLOCK_SIZE", 4)
+
+
+def check(values, expected):
+    assert list(values) == expected
+    assert len(values) == len(expected)
+    for position, value in enumerate(expected):
+        assert values[position] == value
+        assert values.bisect_left(value) == bisect.bisect_left(expected, value)
+        assert list(values.islice(position)) == expected[position:]
+    assert list(values.islice(len(expected))) == []
+
+
+def test_matches_a_sorted_python_list():
+    rng = random.Random(7)
+    values = SortedList(rng.randrange(50) for _ in range(30))
+    expected = sorted(values)
+    for _ in range(600):
+        value = rng.randrange(50)
+        if rng.random() < 0.5:
+            values.add(value)
+            bisect.insort(expected, value)
+        elif value in expected:
+            assert value in values
+            values.remove(value)
+            expected.remove(value)
+        else:
+            assert value not in values
+            with pytest.raises(ValueError):
+                values.remove(value)
+        check(values, expected)
+
+
+def test_empty_list():
+    values = SortedList()
+    assert len(values) == 0 and list(values) == [] and 1 not in values
+    assert values.bisect_left(1) == 0
+    with pytest.raises(IndexError):
+        values[0]
+    values.discard(1)
+    values.add(1)
+    values.remove(1)
+    check(values, [])
+
+
+def test_index_and_negative_positions():
+    values = SortedList(range(0, 40, 2))
+    assert values.index(10) == 5
+    assert values[-1] == 38
+    with pytest.raises(ValueError):
+        values.index(11)
@@ -0,0 +1,113 @@
+import pytest
+
+from cmdies.store import CommandStore, parse_legacy_line
+
+# Long enough that nothing is written until the test flushes
+NO_AUTO_FLUSH = 3600
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "commandes.db")
+
+
+def open_store(path):
+    store = CommandStore(path, flush_delay=NO_AUTO_FLUSH)
+    store.load()
+    return store
+
+
+def test_edits_are_written_behind(db_path):
+    store = open_store(db_path)
+    other = open_store(db_path)
+    try:
+        store.put("disk", {"command": "df -h", "env": "Bash", "timeout": 5})
+        # Visible to this instance at once, to others only after the flush
+        assert store.load()["disk"] == {"command": "df -h", "env": "Bash", "timeout": 5}
+        assert other.load() == {}
+        store.flush()
+        assert other.load() == {"disk": {"command": "df -h", "env": "Bash", "timeout": 5}}
+    finally:
+        store.close()
+        other.close()
+
+
+def test_pending_delete_hides_saved_command(db_path):
+    store = open_store(db_path)
+    try:
+        store.put("disk", {"command": "df -h", "env": "Bash"})
+        store.flush()
+        store.delete("disk")
+        assert "disk" not in store.load()
+    finally:
+        store.close()
+
+
+def test_tombstones_round_trip_between_instances(db_path):
+    writer = open_store(db_path)
+    reader = open_store(db_path)
+    try:
+        writer.put_many({"a": {"command": "echo a", "env": "Bash"}, "b": {"command": "echo b", "env": "Bash"}})
+        writer.flush()
+        assert reader.has_external_changes()
+        changed, deleted = reader.changes_since()
+        assert set(changed) == {"a", "b"} and deleted == []
+
+        writer.delete("a")
+        writer.flush()
+        assert reader.changes_since() == ({}, ["a"])
+
+        # Saving the name again clears its tombstone
+        writer.put("a", {"command": "echo again", "env": "Bash"})
+        writer.flush()
+        assert reader.changes_since() == ({"a": {"command": "echo again", "env": "Bash"}}, [])
+        assert reader.changes_since() == ({}, [])
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_own_writes_are_not_reported_as_changes(db_path):
+    store = open_store(db_path)
+    try:
+        store.put("a", {"command": "echo a", "env": "Bash"})
+        store.flush()
+        assert store.changes_since() == ({}, [])
+    finally:
+        store.close()
+
+
+def test_unsaved_local_edits_win_over_external_changes(db_path):
+    writer = open_store(db_path)
+    reader = open_store(db_path)
+    try:
+        reader.put("a", {"command": "mine", "env": "Bash"})
+        writer.put("a", {"command": "theirs", "env": "Bash"})
+        writer.flush()
+        assert reader.changes_since() == ({}, [])
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_legacy_file_is_imported_once(tmp_path, db_path):
+    legacy = tmp_path / "commandes.txt"
+    legacy.write_text("disk:df -h|Bash\nbroken line\n", encoding="utf-8")
+    store = CommandStore(db_path, legacy_path=str(legacy), flush_delay=NO_AUTO_FLUSH)
+    try:
+        assert store.load() == {"disk": {"command": "df -h", "env": "Bash"}}
+        store.delete("disk")
+        store.flush()
+    finally:
+        store.close()
+    store = CommandStore(db_path, legacy_path=str(legacy), flush_delay=NO_AUTO_FLUSH)
+    try:
+        assert store.load() == {}
+    finally:
+        store.close()
+
+
+def test_parse_legacy_line():
+    assert parse_legacy_line("name: echo a|b |Bash\n") == ("name", {"command": "echo a|b", "env": "Bash"})
+    assert parse_legacy_line("no separator") is None
+    assert parse_legacy_line("name:no env") is None
@@ -0,0 +1,49 @@
+import pytest
+
+from cmdies.templates import TemplateError, fill, is_template, item_label, parse_matrix, placeholders, render
+
+
+def test_placeholders_in_order_of_first_appearance():
+    command = "ssh {{ host }} 'tail -n {{lines|100}} {{path}}' # {{host}}"
+    assert is_template(command)
+    assert placeholders(command) == [("host", None), ("lines", "100"), ("path", None)]
+    assert not is_template("echo ${HOME} {not a placeholder}")
+
+
+def test_render_uses_values_then_defaults():
+    assert render("tail -n {{lines|100}} {{path}}", {"path": "log"}) == "tail -n 100 log"
+    assert render("tail -n {{lines|100}} {{path}}", {"lines": "5", "path": "log"}) == "tail -n 5 log"
+    # An empty value counts as missing
+    assert render("echo {{word| hi }}", {"word": ""}) == "echo hi"
+
+
+def test_missing_value_without_default_is_an_error():
+    with pytest.raises(TemplateError, match=r"No value for \{\{host\}\}"):
+        render("ping {{host}}", {})
+    with pytest.raises(TemplateError):
+        fill({"command": "ping {{host}}", "env": "Bash"}, {"host": ""})
+
+
+def test_fill_copies_templates_only():
+    plain = {"command": "df -h", "env": "Bash"}
+    assert fill(plain, {"unused": "x"}) is plain
+    template = {"command": "ping {{host}}", "env": "Bash", "timeout": 5}
+    assert fill(template, {"host": "web1"}) == {"command": "ping web1", "env": "Bash", "timeout": 5}
+    assert template["command"] == "ping {{host}}"
+
+
+def test_parse_matrix_formats():
+    assert parse_matrix("web1\n\nweb2\n", ["host"]) == [{"host": "web1"}, {"host": "web2"}]
+    assert parse_matrix("port, host\n80, web1\n", ["host", "port"]) == [{"port": "80", "host": "web1"}]
+    assert parse_matrix("web1, 80\nweb2\n", ["host", "port"]) == [{"host": "web1", "port": "80"}, {"host": "web2"}]
+    assert parse_matrix("  \n", ["host"]) == []
+
+
+def test_parse_matrix_rejects_extra_values():
+    with pytest.raises(TemplateError, match="Line 2: 3 values for 2 placeholders"):
+        parse_matrix("host, port\nweb1, 80, extra\n", ["host", "port"])
+
+
+def test_item_label():
+    assert item_label({"host": "web1"}) == "web1"
+    assert item_label({"host": "web1", "port": "80"}) == "host=web1, port=80"
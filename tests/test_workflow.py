@@ -0,0 +1,76 @@
+import pytest
+
+from cmdies.workflow import WorkflowError, WorkflowRun, parse_workflow
+
+
+def ids(steps):
+    return [step.id for step in steps]
+
+
+def test_steps_come_in_dependency_order():
+    steps = parse_workflow(
+        "# nightly\n"
+        "report = mail after test, lint\n"
+        "\n"
+        "test = pytest\n"
+        "lint = ruff\n"
+        "rollback = 'git revert' on-failure test\n"
+    )
+    # Ready steps in definition order as their dependencies finish
+    assert ids(steps) == ["test", "lint", "rollback", "report"]
+    by_id = {step.id: step for step in steps}
+    assert by_id["report"].after == ["test", "lint"]
+    assert by_id["report"].stage == 1
+    assert by_id["rollback"].command_name == "git revert"
+    assert by_id["rollback"].on_failure == ["test"]
+
+
+def test_piped_steps_share_a_stage():
+    steps = parse_workflow("logs = journal\ncount = wc <logs\n")
+    by_id = {step.id: step for step in steps}
+    assert by_id["count"].stdin_from == "logs"
+    assert by_id["logs"].consumer == "count"
+    assert by_id["count"].stage == by_id["logs"].stage == 0
+
+
+def test_cycles_are_reported():
+    with pytest.raises(WorkflowError, match="a, b, c depend on each other in a cycle"):
+        parse_workflow("a = x after c\nb = x after a\nc = x after b\nd = x\n")
+
+
+def test_self_dependency_is_reported():
+    with pytest.raises(WorkflowError, match="depends on itself"):
+        parse_workflow("a = x after a\n")
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "no steps"),
+    ("a = x after b", "unknown step 'b'"),
+    ("a = x\na = y", "defined twice"),
+    ("a x", "expected 'step = command"),
+    ("a = after b", "has no command"),
+    ("a = x y", "unexpected 'y'"),
+    ("a = x\nb = y < a\nc = z < a", "already goes to 'b'"),
+    ("a = x\nb = y\nc = z < a, b", "a single step"),
+    ("a = x\nb = y\nc = z < a after b", "put its dependencies on the first step"),
+    ("a = 'unterminated", "Line 1"),
+])
+def test_invalid_workflows(text, message):
+    with pytest.raises(WorkflowError, match=message):
+        parse_workflow(text)
+
+
+def test_missing_and_nested_commands_are_rejected_before_running():
+    steps = parse_workflow("a = build\n")
+    with pytest.raises(WorkflowError, match="command 'build' not found"):
+        WorkflowRun(steps, {})
+    with pytest.raises(WorkflowError, match="workflows cannot be nested"):
+        WorkflowRun(steps, {"build": {"command": "x = y", "env": "Workflow"}})
+    with pytest.raises(WorkflowError, match="No value for"):
+        WorkflowRun(steps, {"build": {"command": "make {{target}}", "env": "Bash"}})
+
+
+def test_output_lines_are_prefixed_across_chunks():
+    step = parse_workflow("build = make\n")[0]
+    assert step.prefix_lines("one\ntw") == "[build] one\n[build] tw"
+    assert step.prefix_lines("o\nthree\n") == "o\n[build] three\n"